@@ -0,0 +1,90 @@
+"""Bulk export/import benchmark on synthetic profiles (needs a PostgreSQL database).
+
+Usage (from the repository root, DATABASE_URL from .env or the environment):
+    python -m benchmarks.bulk                  # 1,000,000 profiles
+    python -m benchmarks.bulk --rows 100000 --keep
+
+Profiles are loaded into a throwaway schema (`bench_bulk`) next to the shared `games` table;
+the schema is dropped afterwards unless --keep is given. Prints rows/s for each phase and
+the peak RSS of the process, which should not grow with --rows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+from pathlib import Path
+
+from bot.config import load_settings
+from bot.db.session import create_engine, create_session_factory, init_bot_schema, init_models, session_scope
+from bot.services.bulk import BulkStats, connect, export_profiles, import_profiles
+from bot.services.games import load_catalog, seed_games
+from bot.services.hosting import peak_rss_kib
+
+ROOT = Path(__file__).resolve().parent.parent
+SCHEMA = "bench_bulk"
+LANGUAGES = ("ru", "en", "uk", "de")
+
+
+def write_profiles(path: Path, rows: int, aliases: list[str]) -> None:
+    rng = random.Random(rows)
+    with path.open("w", encoding="utf-8") as handle:
+        for index in range(rows):
+            user_id = 10_000_000 + index
+            profile = {
+                "id": user_id,
+                "username": f"user{user_id}" if index % 3 else None,
+                "roblox_nick": f"Player_{user_id}",
+                "age": rng.randint(10, 40),
+                "languages": rng.sample(LANGUAGES, rng.randint(1, 2)),
+                "description": "Play every evening, looking for a team." if index % 2 else None,
+                "photo_id": None,
+                "games": rng.sample(aliases, min(len(aliases), rng.randint(1, 4))),
+            }
+            handle.write(json.dumps(profile, ensure_ascii=False))
+            handle.write("\n")
+
+
+async def run(rows: int, keep: bool) -> None:
+    settings = load_settings()
+    engine = create_engine(settings)
+    catalog = load_catalog(ROOT / "data" / "games.json")
+    await init_models(engine)
+    async with session_scope(create_session_factory(engine)) as session:
+        await seed_games(session, catalog)
+    await init_bot_schema(engine, SCHEMA)
+
+    results: list[tuple[str, BulkStats]] = []
+    conn = await connect(settings.database_url, schema=SCHEMA)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "source.jsonl"
+            write_profiles(source, rows, [item["alias"] for item in catalog])
+            results.append(("import jsonl (new)", await import_profiles(conn, source, "jsonl")))
+            results.append(("export jsonl", await export_profiles(conn, Path(tmp) / "users.jsonl", "jsonl")))
+            results.append(("export csv", await export_profiles(conn, Path(tmp) / "users.csv", "csv")))
+            results.append(("import csv (merge)", await import_profiles(conn, Path(tmp) / "users.csv", "csv")))
+    finally:
+        if not keep:
+            await conn.execute(f'DROP SCHEMA IF EXISTS "{SCHEMA}" CASCADE')
+        await conn.close()
+        await engine.dispose()
+
+    for name, stats in results:
+        print(f"{name:<20} {stats}")
+    print(f"peak RSS: {peak_rss_kib() / 1024:.0f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--keep", action="store_true", help=f"keep the {SCHEMA} schema for inspection")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.keep))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Replay recorded updates (RECORD_UPDATES) through the real dispatcher and compare runs.
+
+Usage (from the repository root):
+    python -m benchmarks.replay run data/recordings --speed 10 --out before.json
+    python -m benchmarks.replay run data/recordings --speed max --out after.json
+    python -m benchmarks.replay compare before.json after.json
+
+`run` builds the dispatcher exactly like the bot does, but every hosted bot talks to an
+in-process fake Telegram session, so nothing is sent. DATABASE_URL and REDIS_URL must point at
+local stand-ins (e.g. `docker compose up -d postgres redis` with a scratch database): handlers
+write to them as in production. Start both runs from the same state for a fair comparison.
+
+Updates keep their recorded order per user and run concurrently across users. --speed 1 or 10
+keeps (scaled) arrival gaps, capped at --max-gap seconds; `max` feeds as fast as --concurrency
+allows. `compare` exits with status 1 when a handler's p95 latency or queries per call grew by
+more than --threshold (default 0.25, or BENCH_THRESHOLD).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+import typing
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Message, MessageId, TelegramObject, Update, User
+
+from bot.config import load_settings
+from bot.main import build_dispatcher
+from bot.services.recorder import read_recording
+from bot.utils.profiling import ProfileRecord
+
+logger = logging.getLogger(__name__)
+
+
+class FakeSession(BaseSession):
+    """Answers every Bot API call locally with a plausible result and counts calls by method."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self._message_ids = itertools.count(1)
+
+    async def close(self) -> None:
+        pass
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[Any], timeout: Optional[int] = None) -> Any:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        returning = method.__returning__
+        if typing.get_origin(returning) is typing.Union:
+            returning = next((arg for arg in typing.get_args(returning) if arg is not bool), bool)
+        if returning is User:
+            return User(id=bot.id, is_bot=True, first_name="replay", username=f"replay_{bot.id}_bot")
+        if returning is Message:
+            chat_id = getattr(method, "chat_id", None)
+            data = {
+                "message_id": next(self._message_ids),
+                "date": datetime.now(timezone.utc),
+                "chat": {"id": chat_id if isinstance(chat_id, int) else 0, "type": "private"},
+                "from": {"id": bot.id, "is_bot": True, "first_name": "replay"},
+                "text": getattr(method, "text", None) or getattr(method, "caption", None),
+            }
+            return Message.model_validate(data, context={"bot": bot})
+        if returning is MessageId:
+            return MessageId(message_id=next(self._message_ids))
+        if typing.get_origin(returning) is list:
+            return []
+        if isinstance(returning, type) and issubclass(returning, TelegramObject):
+            return returning.model_construct()
+        return True
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Optional[Dict[str, Any]] = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+
+class HandlerStats:
+    def __init__(self) -> None:
+        self.durations: dict[str, list[float]] = defaultdict(list)
+        self.queries: Counter[str] = Counter()
+
+    def add(self, record: ProfileRecord) -> None:
+        self.durations[record.name].append(record.duration)
+        self.queries[record.name] += len(record.queries)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        result = {}
+        for name, durations in sorted(self.durations.items()):
+            durations.sort()
+            result[name] = {
+                "count": len(durations),
+                "mean_ms": round(sum(durations) / len(durations) * 1000, 3),
+                "p50_ms": round(percentile(durations, 0.5) * 1000, 3),
+                "p95_ms": round(percentile(durations, 0.95) * 1000, 3),
+                "max_ms": round(durations[-1] * 1000, 3),
+                "queries_per_call": round(self.queries[name] / len(durations), 3),
+            }
+        return result
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def sender(update: dict[str, Any]) -> int:
+    """User whose updates must stay ordered; 0 for updates without one."""
+    for value in update.values():
+        if isinstance(value, dict) and isinstance(value.get("from"), dict):
+            return int(value["from"]["id"])
+    return 0
+
+
+async def replay(
+    paths: list[Path],
+    speed: float | None,
+    max_gap: float,
+    concurrency: int,
+    throttle: bool,
+    latency: float,
+) -> dict[str, Any]:
+    settings = load_settings().model_copy(
+        update={
+            "profiling_enabled": True,
+            "profiling_sample_rate": 1.0,
+            "profiling_keep_slowest": 0,
+            "throttle_enabled": throttle,
+            "record_updates": False,
+            "analytics_sink": "off",
+            "avatar_workers": 0,
+            "health_port": None,
+        }
+    )
+    session = FakeSession(latency)
+    dp = await build_dispatcher(settings, bot_session=session)
+    stats = HandlerStats()
+    profiler = dp["profiler"]
+    profiler.sample_stacks = False
+    profiler.listeners.append(stats.add)
+    bots = {item.bot_id: item.bot for item in dp["hosted_bots"]}
+    primary = dp["hosted_bots"][0].bot
+
+    fed = 0
+    errors = 0
+    slots = asyncio.Semaphore(concurrency)
+    chains: dict[int, asyncio.Task[None]] = {}
+
+    async def feed(bot: Bot, update: Update, previous: asyncio.Task[None] | None) -> None:
+        nonlocal errors
+        try:
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+            await dp.feed_update(bot, update)
+        except Exception:
+            errors += 1
+            logger.exception("Update %s failed", update.update_id)
+        finally:
+            slots.release()
+
+    await dp.emit_startup()
+    started = time.perf_counter()
+    clock = 0.0
+    previous_ts: float | None = None
+    for record in read_recording(paths):
+        if speed is not None and previous_ts is not None:
+            clock += min(max(record.ts - previous_ts, 0.0), max_gap) / speed
+            delay = started + clock - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        previous_ts = record.ts
+        bot = bots.get(record.bot_id, primary)
+        key = sender(record.update)
+        await slots.acquire()
+        task = asyncio.create_task(
+            feed(bot, Update.model_validate(record.update, context={"bot": bot}), chains.get(key))
+        )
+        chains[key] = task
+        task.add_done_callback(lambda done, key=key: chains.pop(key) if chains.get(key) is done else None)
+        fed += 1
+    await asyncio.gather(*list(chains.values()), return_exceptions=True)
+    wall = time.perf_counter() - started
+    await dp.emit_shutdown()
+
+    return {
+        "speed": "max" if speed is None else speed,
+        "updates": fed,
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "handlers": stats.summary(),
+        "telegram_calls": dict(sorted(session.calls.items())),
+    }
+
+
+def compare(before: dict[str, Any], after: dict[str, Any], threshold: float) -> int:
+    print(
+        f"updates: {before['updates']} -> {after['updates']}, "
+        f"wall: {before['wall_seconds']}s -> {after['wall_seconds']}s"
+    )
+    print(f"{'handler':40} {'calls':>13} {'p50 ms':>17} {'p95 ms':>17} {'change':>7} {'queries/call':>15}")
+    regressions = []
+    for name in sorted(set(before["handlers"]) | set(after["handlers"])):
+        old, new = before["handlers"].get(name), after["handlers"].get(name)
+        if old is None or new is None:
+            side = "after" if old is None else "before"
+            print(f"{name:40} only in {side} run")
+            continue
+        change = (new["p95_ms"] / old["p95_ms"] - 1) if old["p95_ms"] else 0.0
+        print(
+            f"{name:40} {old['count']:>6}/{new['count']:<6} {old['p50_ms']:>8.1f}/{new['p50_ms']:<8.1f}"
+            f" {old['p95_ms']:>8.1f}/{new['p95_ms']:<8.1f} {change * 100:>+6.0f}%"
+            f" {old['queries_per_call']:>7.1f}/{new['queries_per_call']:<7.1f}"
+        )
+        if change > threshold or new["queries_per_call"] > old["queries_per_call"] * (1 + threshold):
+            regressions.append(name)
+    if regressions:
+        print(f"Regressed by more than {threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def parse_speed(value: str) -> float | None:
+    if value == "max":
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="replay recordings and write per-handler results")
+    run.add_argument("paths", nargs="+", type=Path, help="recording files or directories")
+    run.add_argument("--speed", type=parse_speed, default=1.0, help="1, 10, any factor, or max")
+    run.add_argument("--max-gap", type=float, default=10.0, help="cap on idle gaps between updates, seconds")
+    run.add_argument("--concurrency", type=int, default=200, help="updates in flight at once")
+    run.add_argument("--latency", type=float, default=0.0, help="simulated Bot API latency, seconds")
+    run.add_argument("--throttle", action="store_true", help="keep the anti-flood middleware enabled")
+    run.add_argument("--label", default="")
+    run.add_argument("--out", type=Path, required=True)
+    diff = commands.add_parser("compare", help="compare two results files")
+    diff.add_argument("before", type=Path)
+    diff.add_argument("after", type=Path)
+    diff.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_THRESHOLD", "0.25")))
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        before = json.loads(args.before.read_text(encoding="utf-8"))
+        after = json.loads(args.after.read_text(encoding="utf-8"))
+        return compare(before, after, args.threshold)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    result = asyncio.run(
+        replay(args.paths, args.speed, args.max_gap, args.concurrency, args.throttle, args.latency)
+    )
+    result["label"] = args.label or args.out.stem
+    args.out.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+    print(f"{result['updates']} updates in {result['wall_seconds']}s, {result['errors']} failed; written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
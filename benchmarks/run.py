@@ -0,0 +1,142 @@
+"""Micro-benchmarks for pure per-update code paths.
+
+Usage (from the repository root):
+    python -m benchmarks.run                    # compare against benchmarks/baseline.json
+    python -m benchmarks.run --update-baseline  # record new baseline
+    python -m benchmarks.run --only search      # run a subset
+
+Exits with status 1 when any case is slower than the baseline by more than
+--threshold (default 0.25, i.e. 25%, or BENCH_THRESHOLD). Baselines are machine
+specific: regenerate them on the machine that runs the gate.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from bot.handlers.register import NICKNAME_RE
+from bot.keyboards.registration import games_keyboard
+from bot.services.analytics import CsvFileSink, FunnelTracker
+from bot.services.games import rank_games
+from bot.utils.formatting import format_profile
+from bot.utils.i18n import Translator
+from bot.utils.locale import resolve_locale
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+CATALOG_SIZES = {"10": 10, "1k": 1_000, "10k": 10_000}
+WORDS = ("blox", "tower", "hell", "doors", "arsenal", "adopt", "pet", "simulator", "murder", "mystery", "obby", "tycoon")
+
+
+def make_catalog(size: int) -> list[dict[str, Any]]:
+    rng = random.Random(size)
+    base = json.loads((ROOT / "data" / "games.json").read_text(encoding="utf-8"))
+    catalog = []
+    for index in range(size):
+        if index < len(base):
+            item = base[index]
+            name, alias = item["name"], item["alias"]
+        else:
+            words = rng.sample(WORDS, 3)
+            name = " ".join(word.title() for word in words)
+            alias = f"{'_'.join(words)}_{index}"
+        catalog.append({"id": index + 1, "name": name, "alias": alias})
+    return catalog
+
+
+def make_user(locale: str) -> SimpleNamespace:
+    bio = ("Играю каждый вечер, ищу команду для рейдов. " if locale == "ru" else "Play every evening, looking for a raid team. ")
+    return SimpleNamespace(
+        username="long_username_example",
+        roblox_nick="Player_Name-123",
+        age=17,
+        languages=[locale],
+        games=[SimpleNamespace(name=item["name"]) for item in make_catalog(5)],
+        description=(bio * 10)[:300],
+    )
+
+
+def make_event(language_code: str | None) -> SimpleNamespace:
+    return SimpleNamespace(from_user=SimpleNamespace(language_code=language_code))
+
+
+def build_cases() -> dict[str, Callable[[], Any]]:
+    translator = Translator(default_locale="ru")
+    cases: dict[str, Callable[[], Any]] = {}
+    for label, size in CATALOG_SIZES.items():
+        catalog = make_catalog(size)
+        selected = {item["id"] for item in catalog[:5]}
+        cases[f"search_games[{label}]"] = lambda catalog=catalog: rank_games("blox fru", catalog)
+        cases[f"games_keyboard[{label}]"] = lambda catalog=catalog, selected=selected: games_keyboard(
+            translator, "ru", catalog, selected
+        )
+    for locale in ("ru", "en"):
+        user = make_user(locale)
+        cases[f"format_profile[{locale}]"] = lambda user=user, locale=locale: format_profile(user, translator, locale)
+        cases[f"translator_t[{locale}]"] = lambda locale=locale: translator.t("profile_age", locale, age=17)
+    cases["translator_t[missing]"] = lambda: translator.t("no_such_key", "de")
+    for label, code in (("ru", "ru"), ("en-US", "en-US"), ("unknown", "pt-BR"), ("none", None)):
+        event = make_event(code)
+        cases[f"resolve_locale[{label}]"] = lambda event=event: resolve_locale(event, "ru")  # type: ignore[arg-type]
+    for label, nick in (("valid", "Player_Name-123"), ("invalid", "bad nick!"), ("long", "x" * 200)):
+        cases[f"nickname_re[{label}]"] = lambda nick=nick: NICKNAME_RE.match(nick)
+    funnel = FunnelTracker(CsvFileSink(ROOT / "data" / "analytics"), batch_size=10**9)
+    cases["funnel_emit"] = lambda: funnel.enter(1, 42, "age")
+    return cases
+
+
+def measure(func: Callable[[], Any], repeat: int) -> float:
+    """Best per-call time in microseconds over `repeat` auto-ranged runs."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1_000_000
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default="", help="run cases whose name contains this substring")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_THRESHOLD", "0.25")))
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    baseline: dict[str, float] = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+
+    results: dict[str, float] = {}
+    regressions = []
+    print(f"{'case':32} {'us/call':>12} {'baseline':>12} {'change':>8}")
+    for name, func in build_cases().items():
+        if args.only not in name:
+            continue
+        value = measure(func, args.repeat)
+        results[name] = value
+        reference = baseline.get(name)
+        change = "" if reference is None else f"{(value / reference - 1) * 100:+.0f}%"
+        print(f"{name:32} {value:12.2f} {reference if reference is not None else '-':>12} {change:>8}")
+        if reference is not None and value > reference * (1 + args.threshold):
+            regressions.append(name)
+
+    if args.update_baseline:
+        merged = {**baseline, **{name: round(value, 3) for name, value in results.items()}}
+        args.baseline.write_text(json.dumps(merged, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"Slower than baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Export and import of profiles for backups, analytics and migrations.
+
+Usage (from the repository root):
+    python -m bot.bulk export users.jsonl               # or users.csv
+    python -m bot.bulk import users.jsonl
+    python -m bot.bulk export users.csv --schema bot_123  # users of an extra bot
+
+The format follows the file extension unless --format is given.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from pathlib import Path
+
+from bot.config import load_settings
+from bot.services.bulk import connect, detect_format, export_profiles, import_profiles
+
+logger = logging.getLogger(__name__)
+
+
+async def run(args: argparse.Namespace) -> None:
+    settings = load_settings()
+    path = Path(args.path)
+    fmt = detect_format(path, args.format)
+    conn = await connect(settings.database_url, schema=args.schema)
+    try:
+        if args.command == "export":
+            stats = await export_profiles(conn, path, fmt, batch_size=args.batch_size)
+        else:
+            stats = await import_profiles(conn, path, fmt, batch_size=args.batch_size)
+    finally:
+        await conn.close()
+    logger.info("%s %s: %s", args.command.capitalize(), path, stats)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="default: from the file extension")
+    parser.add_argument("--schema", help="schema of an extra bot (bot_<id>); default: the primary bot's tables")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="rows per cursor fetch / COPY batch")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
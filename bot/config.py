@@ -1,17 +1,95 @@
 from __future__ import annotations
 
+import socket
+from dataclasses import dataclass
 from typing import Iterable
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+@dataclass(frozen=True)
+class BotSpec:
+    token: str
+    default_language: str
+
+    @property
+    def bot_id(self) -> int:
+        return int(self.token.split(":", 1)[0])
+
+
 class Settings(BaseSettings):
     bot_token: str = Field(..., alias="BOT_TOKEN")
+    extra_bot_tokens: str = Field("", alias="EXTRA_BOT_TOKENS")
     database_url: str = Field(..., alias="DATABASE_URL")
     redis_url: str = Field(..., alias="REDIS_URL")
+    database_replica_urls: str = Field("", alias="DATABASE_REPLICA_URLS")
+    replica_strategy: str = Field("round_robin", alias="REPLICA_STRATEGY")
+    replica_sticky_window: float = Field(5.0, alias="REPLICA_STICKY_WINDOW")
+    replica_max_lag: float = Field(10.0, alias="REPLICA_MAX_LAG")
+    replica_check_interval: float = Field(15.0, alias="REPLICA_CHECK_INTERVAL")
     default_language: str = Field("ru", alias="DEFAULT_LANGUAGE")
     admin_ids: set[int] = Field(default_factory=set, alias="ADMIN_IDS")
+    redis_ping_timeout: float = Field(5.0, alias="REDIS_PING_TIMEOUT")
+    fsm_ttl: int | None = Field(86400, alias="FSM_TTL")
+    fsm_encoding: str = Field("msgpack", alias="FSM_ENCODING")
+    fsm_compress_threshold: int = Field(512, alias="FSM_COMPRESS_THRESHOLD")
+    throttle_enabled: bool = Field(True, alias="THROTTLE_ENABLED")
+    throttle_backend: str = Field("memory", alias="THROTTLE_BACKEND")
+    throttle_message_rate: float = Field(1.0, alias="THROTTLE_MESSAGE_RATE")
+    throttle_message_burst: float = Field(5.0, alias="THROTTLE_MESSAGE_BURST")
+    throttle_callback_rate: float = Field(3.0, alias="THROTTLE_CALLBACK_RATE")
+    throttle_callback_burst: float = Field(10.0, alias="THROTTLE_CALLBACK_BURST")
+    keyboard_edit_debounce_ms: int = Field(400, alias="KEYBOARD_EDIT_DEBOUNCE_MS")
+    chat_idle_timeout: int = Field(600, alias="CHAT_IDLE_TIMEOUT")
+    chat_flush_interval: int = Field(10, alias="CHAT_FLUSH_INTERVAL")
+    match_widen_band_after: int = Field(15, alias="MATCH_WIDEN_BAND_AFTER")
+    match_widen_game_after: int = Field(45, alias="MATCH_WIDEN_GAME_AFTER")
+    match_max_wait: int = Field(600, alias="MATCH_MAX_WAIT")
+    log_level: str = Field("INFO", alias="LOG_LEVEL")
+    log_json: bool = Field(True, alias="LOG_JSON")
+    log_queue_size: int = Field(10_000, alias="LOG_QUEUE_SIZE")
+    log_exc_burst: int = Field(5, alias="LOG_EXC_BURST")
+    log_exc_window: int = Field(60, alias="LOG_EXC_WINDOW")
+    db_connect_timeout: float = Field(5.0, alias="DB_CONNECT_TIMEOUT")
+    db_statement_timeout: float = Field(5.0, alias="DB_STATEMENT_TIMEOUT")
+    db_breaker_threshold: int = Field(5, alias="DB_BREAKER_THRESHOLD")
+    db_breaker_reset: float = Field(30.0, alias="DB_BREAKER_RESET")
+    db_retry_interval: float = Field(10.0, alias="DB_RETRY_INTERVAL")
+    node_id: str = Field(default_factory=socket.gethostname, alias="NODE_ID")
+    profile_cache_ttl: int = Field(7 * 86400, alias="PROFILE_CACHE_TTL")
+    analytics_sink: str = Field("file", alias="ANALYTICS_SINK")
+    analytics_dir: str = Field("data/analytics", alias="ANALYTICS_DIR")
+    analytics_buffer_size: int = Field(10_000, alias="ANALYTICS_BUFFER_SIZE")
+    analytics_batch_size: int = Field(500, alias="ANALYTICS_BATCH_SIZE")
+    analytics_flush_interval: float = Field(5.0, alias="ANALYTICS_FLUSH_INTERVAL")
+    inline_page_size: int = Field(20, alias="INLINE_PAGE_SIZE")
+    inline_cache_ttl: int = Field(60, alias="INLINE_CACHE_TTL")
+    inline_cache_time: int = Field(300, alias="INLINE_CACHE_TIME")
+    inline_settle_ms: int = Field(300, alias="INLINE_SETTLE_MS")
+    record_updates: bool = Field(False, alias="RECORD_UPDATES")
+    record_dir: str = Field("data/recordings", alias="RECORD_DIR")
+    record_salt: str = Field("", alias="RECORD_SALT")
+    record_buffer_size: int = Field(10_000, alias="RECORD_BUFFER_SIZE")
+    stats_flush_interval: float = Field(30.0, alias="STATS_FLUSH_INTERVAL")
+    stats_like_ttl: int = Field(30 * 86400, alias="STATS_LIKE_TTL")
+    catalog_refresh_interval: float = Field(300.0, alias="CATALOG_REFRESH_INTERVAL")
+    avatar_workers: int = Field(2, alias="AVATAR_WORKERS")
+    avatar_queue_size: int = Field(1000, alias="AVATAR_QUEUE_SIZE")
+    avatar_thumbnail_size: int = Field(160, alias="AVATAR_THUMBNAIL_SIZE")
+    avatar_thumbnail_ttl: int = Field(7 * 86400, alias="AVATAR_THUMBNAIL_TTL")
+    avatar_match_distance: int = Field(6, alias="AVATAR_MATCH_DISTANCE")
+    avatar_fetch_dir: str = Field("", alias="AVATAR_FETCH_DIR")
+    change_feed_enabled: bool = Field(True, alias="CHANGE_FEED_ENABLED")
+    change_feed_keepalive: float = Field(30.0, alias="CHANGE_FEED_KEEPALIVE")
+    profile_local_cache_size: int = Field(10_000, alias="PROFILE_LOCAL_CACHE_SIZE")
+    shutdown_drain_timeout: int = Field(20, alias="SHUTDOWN_DRAIN_TIMEOUT")
+    health_host: str = Field("0.0.0.0", alias="HEALTH_HOST")
+    health_port: int | None = Field(None, alias="HEALTH_PORT")
+    profiling_enabled: bool = Field(False, alias="PROFILING_ENABLED")
+    profiling_sample_rate: float = Field(0.05, alias="PROFILING_SAMPLE_RATE")
+    profiling_keep_slowest: int = Field(20, alias="PROFILING_KEEP_SLOWEST")
+    profiling_repeat_threshold: int = Field(3, alias="PROFILING_REPEAT_THRESHOLD")
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", case_sensitive=False)
 
@@ -24,6 +102,20 @@ class Settings(BaseSettings):
             return {int(item.strip()) for item in value.split(",") if item.strip().isdigit()}
         return {int(item) for item in value}
 
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.database_replica_urls.split(",") if url.strip()]
+
+    @property
+    def bots(self) -> list[BotSpec]:
+        """BOT_TOKEN first, then EXTRA_BOT_TOKENS entries written as `token` or `token@language`."""
+        specs = [BotSpec(self.bot_token, self.default_language)]
+        for item in self.extra_bot_tokens.split(","):
+            token, _, language = item.strip().partition("@")
+            if token:
+                specs.append(BotSpec(token, language or self.default_language))
+        return specs
+
 
 def load_settings() -> Settings:
     return Settings()
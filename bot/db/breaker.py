@@ -0,0 +1,83 @@
+"""Circuit breaker that makes sessions fail fast while the database is unreachable."""
+
+from __future__ import annotations
+
+import logging
+import time
+
+from sqlalchemy import exc as sa_exc
+
+logger = logging.getLogger(__name__)
+
+# Connection exceptions (class 08), statement timeout, admin/crash shutdown, cannot connect now.
+_UNAVAILABLE_SQLSTATES = ("08", "57014", "57P01", "57P02", "57P03")
+
+
+class DatabaseUnavailable(Exception):
+    """The database did not answer in time or the breaker is open."""
+
+
+def is_unavailable(error: BaseException) -> bool:
+    if isinstance(error, (DatabaseUnavailable, OSError, TimeoutError, sa_exc.TimeoutError)):
+        return True
+    if isinstance(error, sa_exc.DBAPIError):
+        if error.connection_invalidated or isinstance(error, sa_exc.InterfaceError):
+            return True
+        sqlstate = getattr(error.orig, "sqlstate", None) or ""
+        return sqlstate.startswith(_UNAVAILABLE_SQLSTATES)
+    return False
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive unavailability errors.
+
+    While open, `check()` raises immediately; after `reset_timeout` seconds one trial session is
+    let through (half-open) and its outcome closes or re-opens the circuit. A trial that reports
+    nothing within another `reset_timeout` is replaced by a new one.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._trial_at = 0.0
+
+    @property
+    def available(self) -> bool:
+        return self.state == "closed"
+
+    def check(self) -> None:
+        if self.state == "closed":
+            return
+        now = time.monotonic()
+        if (self.state == "open" and now - self._opened_at >= self.reset_timeout) or (
+            self.state == "half_open" and now - self._trial_at >= self.reset_timeout
+        ):
+            self.state = "half_open"
+            self._trial_at = now
+            return
+        self.rejected += 1
+        raise DatabaseUnavailable(f"database circuit is {self.state}")
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.warning("Database circuit closed after %d rejected sessions", self.rejected)
+        self.state = "closed"
+        self.failures = 0
+
+    def record_cancelled(self) -> None:
+        """A session given up before it finished; only a half-open trial counts it, as a failure."""
+        if self.state == "half_open":
+            self.record_failure()
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.trips += 1
+            self._opened_at = time.monotonic()
+            logger.warning("Database circuit opened after %d failures", self.failures)
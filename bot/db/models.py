@@ -8,6 +8,7 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Table,
@@ -58,6 +59,14 @@ class User(Base):
     )
 
 
+# Serves the case-insensitive prefix search of inline mode (`lower(roblox_nick) LIKE 'q%'`).
+Index(
+    "ix_users_roblox_nick_lower",
+    func.lower(User.roblox_nick).label("roblox_nick_lower"),
+    postgresql_ops={"roblox_nick_lower": "text_pattern_ops"},
+)
+
+
 class Game(Base):
     __tablename__ = "games"
 
@@ -66,9 +75,74 @@ class Game(Base):
     alias: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
     category: Mapped[str | None] = mapped_column(String(50), nullable=True)
 
+    # Never loaded implicitly: popular games have most users. Player counts live in `game_players`.
     users: Mapped[list["User"]] = relationship(
         "User",
         secondary=user_games_table,
         back_populates="games",
-        lazy="selectin",
+        lazy="raise",
     )
+
+
+class GamePlayers(Base):
+    # Maintained by statement-level triggers on user_games (see init_game_counters)
+    __tablename__ = "game_players"
+
+    game_id: Mapped[int] = mapped_column(Integer, ForeignKey("games.id", ondelete="CASCADE"), primary_key=True)
+    players: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class ChatSession(Base):
+    __tablename__ = "chat_sessions"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    user_a: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
+    user_b: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    ended_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    messages: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    end_reason: Mapped[str] = mapped_column(String(20), nullable=False)
+
+
+class FunnelEvent(Base):
+    __tablename__ = "funnel_events"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    bot_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    event: Mapped[str] = mapped_column(String(20), nullable=False)
+    step: Mapped[str] = mapped_column(String(20), nullable=False, default="")
+    value: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+
+class ProfileStats(Base):
+    __tablename__ = "profile_stats"
+
+    profile_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    views: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    likes: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    unique_viewers: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class CounterBatch(Base):
+    # Drained counter batches, so a drain retried after a crash is not applied twice
+    __tablename__ = "counter_batches"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    drained_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class AvatarHash(Base):
+    # 64-bit difference hash of the profile photo (stored signed); band0..band3 are its unsigned
+    # 16-bit quarters, indexed for near-duplicate lookup (see bot.services.avatars)
+    __tablename__ = "avatar_hashes"
+
+    profile_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    phash: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    band0: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    band1: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    band2: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    band3: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
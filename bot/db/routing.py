@@ -0,0 +1,147 @@
+"""Routing of read-only sessions to replicas with read-your-writes stickiness."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from bot.db.breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    # Shared by every schema's factory on this replica; an open one takes it out of rotation.
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    healthy: bool = True
+    lag: float = 0.0
+
+    @property
+    def load(self) -> int:
+        checkedout = getattr(self.engine.pool, "checkedout", None)
+        return checkedout() if callable(checkedout) else 0
+
+
+class SessionRouter:
+    """Hands out the primary session factory for writes and a replica one for reads.
+
+    Users who wrote within `sticky_window` seconds keep reading from the primary; replicas
+    lagging more than `max_lag` seconds, failing the health query or with an open circuit
+    breaker leave the rotation.
+    """
+
+    def __init__(
+        self,
+        primary: async_sessionmaker[AsyncSession],
+        replicas: list[Replica] | None = None,
+        strategy: str = "round_robin",
+        sticky_window: float = 5.0,
+        max_lag: float = 10.0,
+        check_interval: float = 15.0,
+    ) -> None:
+        self.primary = primary
+        self.replicas = replicas or []
+        self.strategy = strategy
+        self.sticky_window = sticky_window
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._counter = itertools.count()
+        self._recent_writers: dict[int, float] = {}
+        self._all_pinned_until = 0.0
+        self._task: asyncio.Task[None] | None = None
+
+    def for_read(self, user_id: int | None = None) -> async_sessionmaker[AsyncSession]:
+        if self._all_pinned_until > time.monotonic():
+            return self.primary
+        if user_id is not None:
+            written_until = self._recent_writers.get(user_id)
+            if written_until is not None and written_until > time.monotonic():
+                return self.primary
+        healthy = [replica for replica in self.replicas if replica.healthy and replica.breaker.available]
+        if not healthy:
+            return self.primary
+        if self.strategy == "least_loaded":
+            return min(healthy, key=lambda replica: replica.load).session_factory
+        return healthy[next(self._counter) % len(healthy)].session_factory
+
+    def for_write(self, user_id: int | None = None) -> async_sessionmaker[AsyncSession]:
+        """Primary factory; passing `user_id` pins that user's reads to the primary for a while."""
+        if user_id is not None:
+            self.pin(user_id)
+        return self.primary
+
+    def pin(self, user_id: int | None = None) -> None:
+        """Read `user_id` (everyone when None) from the primary for `sticky_window` seconds.
+
+        Used after a write, including one reported by another process, that replicas may not have yet.
+        """
+        if not self.replicas:
+            return
+        until = time.monotonic() + self.sticky_window
+        if user_id is None:
+            self._all_pinned_until = until
+        else:
+            self._recent_writers[user_id] = until
+
+    async def start(self) -> None:
+        if self.replicas:
+            await self.check_replicas()
+            self._task = asyncio.create_task(self._check_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.gather(*(replica.engine.dispose() for replica in self.replicas))
+
+    async def check_replicas(self) -> None:
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+        now = time.monotonic()
+        self._recent_writers = {
+            user_id: until for user_id, until in self._recent_writers.items() if until > now
+        }
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as conn:
+                replica.lag = float(await conn.scalar(_LAG_QUERY) or 0)
+            healthy = replica.lag <= self.max_lag
+            # Answering the health query is as good as a successful trial session.
+            replica.breaker.record_success()
+        except Exception:
+            logger.warning("Replica %s health check failed", replica.name, exc_info=True)
+            healthy = False
+        if healthy != replica.healthy:
+            logger.warning(
+                "Replica %s %s rotation (lag %.1fs)",
+                replica.name,
+                "back in" if healthy else "out of",
+                replica.lag,
+            )
+        replica.healthy = healthy
+
+    async def _check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check_replicas()
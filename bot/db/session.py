@@ -1,35 +1,222 @@
 from __future__ import annotations
 
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from typing import Any, AsyncIterator
 
+from sqlalchemy import MetaData, Table, event, text
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, SessionTransaction
+from sqlalchemy.pool import NullPool
 
 from bot.config import Settings
 from bot.db.base import Base
+from bot.db.breaker import CircuitBreaker, DatabaseUnavailable, is_unavailable
+from bot.db.routing import Replica
+
+# Statement-level, so a bulk insert or a cascaded profile delete updates each game row once.
+_GAME_PLAYERS_FUNCTION = """
+CREATE OR REPLACE FUNCTION {prefix}count_game_players() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO {prefix}game_players AS gp (game_id, players)
+        SELECT game_id, count(*) FROM new_rows GROUP BY game_id
+        ON CONFLICT (game_id) DO UPDATE SET players = gp.players + EXCLUDED.players;
+    ELSE
+        UPDATE {prefix}game_players AS gp SET players = gp.players - d.removed
+        FROM (SELECT game_id, count(*) AS removed FROM old_rows GROUP BY game_id) AS d
+        WHERE gp.game_id = d.game_id;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+# Tables every hosted bot reads from the default schema; the rest live in a per-bot schema.
+SHARED_TABLES = frozenset({"games", "funnel_events"})
 
 
 def create_engine(settings: Settings) -> AsyncEngine:
-    return create_async_engine(settings.database_url, echo=False, future=True)
+    return create_async_engine(settings.database_url, echo=False, future=True, **_engine_options(settings))
+
+
+def create_replicas(settings: Settings) -> list[Replica]:
+    replicas = []
+    for url in settings.replica_urls:
+        engine = create_async_engine(url, echo=False, future=True, **_engine_options(settings))
+        breaker = CircuitBreaker(settings.db_breaker_threshold, settings.db_breaker_reset)
+        replicas.append(
+            Replica(
+                name=engine.url.render_as_string(hide_password=True),
+                engine=engine,
+                session_factory=create_session_factory(engine, breaker=breaker),
+                breaker=breaker,
+            )
+        )
+    return replicas
+
+
+def _engine_options(settings: Settings) -> dict[str, Any]:
+    """Bound connect, pool checkout and per-statement time so an outage fails instead of hanging."""
+    return {
+        "pool_timeout": settings.db_connect_timeout,
+        "connect_args": {
+            "timeout": settings.db_connect_timeout,
+            "command_timeout": settings.db_statement_timeout,
+            "server_settings": {"statement_timeout": str(int(settings.db_statement_timeout * 1000))},
+        },
+    }
+
+
+class GuardedSessionmaker(async_sessionmaker[AsyncSession]):
+    """Refuses to create sessions while its circuit breaker is open."""
 
+    def __init__(self, *args: Any, breaker: CircuitBreaker, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
 
-def create_session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
-    return async_sessionmaker(engine, expire_on_commit=False)
+    def __call__(self, **local_kw: Any) -> AsyncSession:
+        self.breaker.check()
+        return super().__call__(**local_kw)
+
+
+def create_session_factory(
+    engine: AsyncEngine,
+    schema: str | None = None,
+    breaker: CircuitBreaker | None = None,
+) -> async_sessionmaker[AsyncSession]:
+    """Session factory on a (shared) engine; with `schema`, unqualified tables resolve there first."""
+    options: dict[str, Any] = {"expire_on_commit": False}
+    if schema is not None:
+        options["sync_session_class"] = _search_path_session(schema)
+    if breaker is not None:
+        return GuardedSessionmaker(engine, breaker=breaker, **options)
+    return async_sessionmaker(engine, **options)
+
+
+def _search_path_session(schema: str) -> type[Session]:
+    session_class = type(f"Session_{schema}", (Session,), {})
+    search_path = f'SET LOCAL search_path TO "{schema}", public'
+
+    @event.listens_for(session_class, "after_begin")
+    def set_search_path(session: Session, transaction: SessionTransaction, connection: Connection) -> None:
+        connection.exec_driver_sql(search_path)
+
+    return session_class
 
 
 async def init_models(engine: AsyncEngine) -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes, list(Base.metadata.sorted_tables))
+
+
+async def init_bot_schema(engine: AsyncEngine, schema: str) -> None:
+    """Create the per-bot tables in `schema`; shared tables stay in the default schema."""
+    metadata = MetaData()
+    tables = []
+    for table in Base.metadata.sorted_tables:
+        if table.name in SHARED_TABLES:
+            table.to_metadata(metadata)
+            continue
+        tables.append(
+            table.to_metadata(
+                metadata,
+                schema=schema,
+                referred_schema_fn=lambda _table, to_schema, constraint, _referred: (
+                    None if constraint.referred_table.name in SHARED_TABLES else to_schema
+                ),
+            )
+        )
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+        await conn.run_sync(metadata.create_all, tables=tables)
+        await conn.run_sync(_create_missing_indexes, tables)
+
+
+def _create_missing_indexes(connection: Connection, tables: list[Table]) -> None:
+    """`create_all` skips tables that already exist, including indexes added to them later."""
+    for table in tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+async def init_game_counters(engine: AsyncEngine, schema: str | None = None) -> None:
+    """Install the triggers that keep `game_players` in step with `user_games`, backfilling on first install.
+
+    The backfill counts the whole `user_games` table, so it runs on its own connection without the
+    per-statement limits of `engine` (like the bulk tool).
+    """
+    prefix = f'"{schema}".' if schema else ""
+    async with engine.connect() as conn:
+        installed = await conn.scalar(
+            text(
+                "SELECT count(*) FROM pg_trigger "
+                "WHERE tgrelid = CAST(:table AS regclass) AND tgname LIKE 'user_games_players_%'"
+            ),
+            {"table": f"{prefix}user_games"},
+        )
+    if installed == 2:
+        return
+    backfill_engine = create_async_engine(engine.url, poolclass=NullPool)
+    try:
+        await _install_game_counters(backfill_engine, prefix)
+    finally:
+        await backfill_engine.dispose()
+
+
+async def _install_game_counters(engine: AsyncEngine, prefix: str) -> None:
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("SET LOCAL statement_timeout = 0")
+        # Blocks profile writes (and other processes installing the same triggers) until the backfill commits.
+        await conn.exec_driver_sql(f"LOCK TABLE {prefix}user_games IN SHARE ROW EXCLUSIVE MODE")
+        await conn.exec_driver_sql(_GAME_PLAYERS_FUNCTION.format(prefix=prefix))
+        for operation, transition in (("insert", "NEW TABLE AS new_rows"), ("delete", "OLD TABLE AS old_rows")):
+            await conn.exec_driver_sql(
+                f"CREATE OR REPLACE TRIGGER user_games_players_{operation} "
+                f"AFTER {operation.upper()} ON {prefix}user_games REFERENCING {transition} "
+                f"FOR EACH STATEMENT EXECUTE FUNCTION {prefix}count_game_players()"
+            )
+        await conn.exec_driver_sql(f"DELETE FROM {prefix}game_players")
+        await conn.exec_driver_sql(
+            f"INSERT INTO {prefix}game_players (game_id, players) "
+            f"SELECT game_id, count(*) FROM {prefix}user_games GROUP BY game_id"
+        )
 
 
 @asynccontextmanager
 async def session_scope(session_factory: async_sessionmaker[AsyncSession]) -> AsyncIterator[AsyncSession]:
+    """Commit on success, roll back on error.
+
+    Connectivity failures and timeouts are re-raised as `DatabaseUnavailable` and counted by the
+    factory's circuit breaker, if it has one.
+    """
+    breaker: CircuitBreaker | None = getattr(session_factory, "breaker", None)
     session = session_factory()
     try:
         yield session
         await session.commit()
-    except Exception:
-        await session.rollback()
+    except Exception as error:
+        unavailable = is_unavailable(error)
+        if breaker is not None and unavailable:
+            breaker.record_failure()
+        elif breaker is not None:
+            breaker.record_success()
+        try:
+            await session.rollback()
+        except Exception:
+            if not unavailable:
+                raise
+        if unavailable and not isinstance(error, DatabaseUnavailable):
+            raise DatabaseUnavailable(str(error)) from error
+        raise
+    except BaseException:
+        # Cancelled (handler timeout, shutdown): the half-open trial must not stay pending forever.
+        if breaker is not None:
+            breaker.record_cancelled()
         raise
+    else:
+        if breaker is not None:
+            breaker.record_success()
     finally:
         await session.close()
@@ -1,2 +1,22 @@
 """Handlers package."""
 
+from __future__ import annotations
+
+from importlib import import_module
+
+from aiogram import Router
+
+ROUTER_MODULES = (
+    "bot.handlers.admin",
+    "bot.handlers.common",
+    "bot.handlers.register",
+    "bot.handlers.profile",
+    "bot.handlers.edit",
+    "bot.handlers.chat",
+    "bot.handlers.inline",
+)
+
+
+def load_routers() -> list[Router]:
+    """Import handler modules on demand; order matters for routing priority."""
+    return [import_module(name).router for name in ROUTER_MODULES]
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+from html import escape
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.types import BufferedInputFile, Message
+
+from bot.config import Settings
+from bot.services.analytics import FunnelTracker
+from bot.services.avatars import AvatarIndex, AvatarPipeline
+from bot.services.hosting import HostedBot, peak_rss_kib, usage_report
+from bot.services.matchmaking import MatchQueue
+from bot.utils.debounce import EditDebouncer
+from bot.utils.i18n import Translator
+from bot.utils.locale import resolve_locale
+from bot.utils.profiling import UpdateProfiler
+from bot.utils.storage import fsm_memory_report
+
+router = Router(name="admin")
+
+
+def is_admin(message: Message, settings: Settings) -> bool:
+    return bool(message.from_user) and message.from_user.id in settings.admin_ids  # type: ignore[union-attr]
+
+
+@router.message(Command("slow"))
+async def slow_updates(
+    message: Message,
+    command: CommandObject,
+    translator: Translator,
+    settings: Settings,
+    profiler: UpdateProfiler,
+) -> None:
+    if not is_admin(message, settings):
+        return
+    locale = resolve_locale(message, settings.default_language)
+    if not profiler.enabled:
+        await message.answer(translator.t("admin_slow_disabled", locale))
+        return
+    records = profiler.slowest()
+    if not records:
+        await message.answer(translator.t("admin_slow_empty", locale))
+        return
+
+    args = (command.args or "").strip()
+    if args.isdigit():
+        index = int(args) - 1
+        if index < 0 or index >= len(records):
+            await message.answer(translator.t("admin_slow_missing", locale))
+            return
+        record = records[index]
+        await message.answer_document(
+            BufferedInputFile(record.report().encode("utf-8"), filename=f"update-{record.update_id}.txt"),
+            caption=escape(f"{record.name} {record.duration * 1000:.1f} ms"),
+        )
+        return
+
+    lines = [f"sampled={profiler.sampled} flagged={profiler.flagged}"]
+    for number, record in enumerate(records, start=1):
+        flag = " ⚠️" if record.repeats else ""
+        lines.append(
+            f"{number}. {record.duration * 1000:.1f} ms — {record.name} — {len(record.queries)} SQL{flag}"
+        )
+    await message.answer(escape("\n".join(lines)))
+
+
+@router.message(Command("fsm"))
+async def fsm_usage(
+    message: Message,
+    state: FSMContext,
+    translator: Translator,
+    settings: Settings,
+    hosted_bot: HostedBot,
+) -> None:
+    if not is_admin(message, settings):
+        return
+    locale = resolve_locale(message, settings.default_language)
+    redis = getattr(state.storage, "redis", None)
+    report = await fsm_memory_report(redis, prefix=f"{hosted_bot.namespace}fsm") if redis is not None else {}
+    if not report:
+        await message.answer(translator.t("admin_fsm_empty", locale))
+        return
+
+    total_keys = sum(usage.keys for usage in report.values())
+    total_bytes = sum(usage.bytes for usage in report.values())
+    lines = [f"FSM keys: {total_keys}, {total_bytes / 1024:.1f} KiB"]
+    for state_name, usage in sorted(report.items(), key=lambda item: item[1].bytes, reverse=True):
+        lines.append(f"{state_name}: {usage.keys} keys, {usage.bytes / 1024:.1f} KiB")
+    await message.answer(escape("\n".join(lines)))
+
+
+@router.message(Command("edits"))
+async def edit_stats(
+    message: Message,
+    settings: Settings,
+    edit_debouncer: EditDebouncer,
+) -> None:
+    if not is_admin(message, settings):
+        return
+    await message.answer(
+        f"Keyboard edits: requested={edit_debouncer.requested} sent={edit_debouncer.executed} "
+        f"saved={edit_debouncer.saved} failed={edit_debouncer.failed}"
+    )
+
+
+@router.message(Command("queues"))
+async def queue_stats(
+    message: Message,
+    translator: Translator,
+    settings: Settings,
+    match_queue: MatchQueue,
+) -> None:
+    if not is_admin(message, settings):
+        return
+    stats = await match_queue.report()
+    if not stats:
+        await message.answer(translator.t("admin_queues_empty", resolve_locale(message, settings.default_language)))
+        return
+
+    def seconds(value: float | None) -> str:
+        return "-" if value is None else f"{value:.1f}s"
+
+    lines = ["bucket depth matches p50 p90 p99"]
+    for item in stats:
+        lines.append(
+            f"{item.bucket} {item.depth} {item.matches} "
+            f"{seconds(item.p50)} {seconds(item.p90)} {seconds(item.p99)}"
+        )
+    await message.answer(escape("\n".join(lines)))
+
+
+@router.message(Command("bots"))
+async def bot_usage(
+    message: Message,
+    state: FSMContext,
+    settings: Settings,
+    hosted_bots: list[HostedBot],
+) -> None:
+    if not is_admin(message, settings):
+        return
+    redis = getattr(state.storage, "redis", None)
+    if redis is None:
+        return
+    lines = [f"process peak RSS: {peak_rss_kib() / 1024:.1f} MiB, bots: {len(hosted_bots)}"]
+    for item in await usage_report(hosted_bots, redis):
+        lines.append(
+            f"{item.bot_id} [{item.language}]: updates={item.updates} errors={item.errors} "
+            f"busy={item.busy:.1f}s avg={item.avg_ms:.1f}ms in_flight={item.in_flight}/{item.peak_in_flight} "
+            f"chats={item.chat_pairs} waiting={item.waiting} fsm={item.fsm_keys} keys/{item.fsm_bytes / 1024:.1f} KiB "
+            f"queued_writes={item.queued_writes}"
+        )
+    await message.answer(escape("\n".join(lines)))
+
+
+@router.message(Command("funnel"))
+async def funnel_stats(
+    message: Message,
+    translator: Translator,
+    settings: Settings,
+    funnel: FunnelTracker,
+) -> None:
+    if not is_admin(message, settings):
+        return
+    report = funnel.report()
+    if not report.started:
+        await message.answer(translator.t("admin_funnel_empty", resolve_locale(message, settings.default_language)))
+        return
+
+    def seconds(value: float | None) -> str:
+        return "-" if value is None else f"{value:.1f}s"
+
+    lines = [
+        f"started={report.started} completed={report.completed} cancelled={report.cancelled} "
+        f"({report.completed / report.started:.0%})",
+        "step entered invalid waiting dropped p50 p90",
+    ]
+    for step in report.steps:
+        lines.append(
+            f"{step.step} {step.entered} {step.invalid} {step.in_progress} {step.abandoned} "
+            f"{seconds(step.p50)} {seconds(step.p90)}"
+        )
+    lines.append(f"game searches={report.searches} empty={report.empty_searches}")
+    if report.dropped:
+        lines.append(f"events dropped from buffer: {report.dropped}")
+    await message.answer(escape("\n".join(lines)))
+
+
+@router.message(Command("avatars"))
+async def avatar_stats(
+    message: Message,
+    translator: Translator,
+    settings: Settings,
+    avatar_pipeline: AvatarPipeline,
+    avatar_index: AvatarIndex,
+) -> None:
+    if not is_admin(message, settings):
+        return
+    if not avatar_pipeline.enabled:
+        await message.answer(translator.t("admin_avatars_disabled", resolve_locale(message, settings.default_language)))
+        return
+    report = avatar_pipeline.report()
+
+    def ms(value: float | None) -> str:
+        return "-" if value is None else f"{value * 1000:.0f}ms"
+
+    lines = [
+        f"queue={report.depth}/{report.capacity} in_progress={report.in_progress} processed={report.processed} "
+        f"failed={report.failed} dropped={report.dropped} duplicates={report.duplicates}",
+        f"wait p50={ms(report.wait_p50)} p95={ms(report.wait_p95)}, "
+        f"processing p50={ms(report.work_p50)} p95={ms(report.work_p95)}",
+    ]
+    for match in reversed(avatar_index.recent):
+        lines.append(f"{match.profile_id} ~ {match.other_id} (distance {match.distance})")
+    await message.answer(escape("\n".join(lines)))
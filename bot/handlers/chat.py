@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message
+
+from bot.config import Settings
+from bot.db.routing import SessionRouter
+from bot.handlers.states import ChatState
+from bot.services.chat import ChatRelay
+from bot.services.matchmaking import MatchQueue, QueueEntry
+from bot.services.profile_cache import ProfileCache, load_profile
+from bot.utils.i18n import Translator
+from bot.utils.locale import resolve_locale
+from bot.utils.telegram import safe_delete
+
+router = Router(name="chat")
+
+
+def not_command(message: Message) -> bool:
+    return not (message.text or "").startswith("/")
+
+
+@router.message(Command("chat"))
+async def start_chat(
+    message: Message,
+    state: FSMContext,
+    session_router: SessionRouter,
+    profile_cache: ProfileCache,
+    translator: Translator,
+    settings: Settings,
+    match_queue: MatchQueue,
+) -> None:
+    if not message.from_user or message.from_user.is_bot:
+        return
+    await safe_delete(message)
+    locale = resolve_locale(message, settings.default_language)
+    current = await state.get_state()
+    if current == ChatState.active.state:
+        await message.answer(translator.t("chat_already_active", locale))
+        return
+
+    user, degraded = await load_profile(session_router, profile_cache, message.from_user.id)
+    if not user:
+        await message.answer(translator.t("degraded_unavailable" if degraded else "profile_missing", locale))
+        return
+
+    locale = user.languages[0] if user.languages else locale
+    await state.set_state(ChatState.searching)
+    entry = QueueEntry(
+        user_id=user.id,
+        game_ids=[game.id for game in user.games],
+        languages=list(user.languages) or [locale],
+        age=user.age,
+        locale=locale,
+    )
+    if not await match_queue.join(entry):
+        await message.answer(translator.t("chat_searching", locale))
+
+
+@router.message(Command("stop"))
+async def stop_chat(
+    message: Message,
+    state: FSMContext,
+    translator: Translator,
+    settings: Settings,
+    chat_relay: ChatRelay,
+    match_queue: MatchQueue,
+) -> None:
+    await safe_delete(message)
+    locale = resolve_locale(message, settings.default_language)
+    current = await state.get_state()
+    if current == ChatState.searching.state:
+        await match_queue.leave(message.from_user.id)  # type: ignore[union-attr]
+        await state.clear()
+        await message.answer(translator.t("chat_search_cancelled", locale))
+        return
+    if current == ChatState.active.state and await chat_relay.end(message.from_user.id):  # type: ignore[union-attr]
+        return
+    await state.clear()
+    await message.answer(translator.t("chat_not_active", locale))
+
+
+@router.message(ChatState.active, not_command)
+async def relay_message(
+    message: Message,
+    state: FSMContext,
+    translator: Translator,
+    settings: Settings,
+    chat_relay: ChatRelay,
+) -> None:
+    if await chat_relay.relay(message.from_user.id, message.chat.id, message.message_id):  # type: ignore[union-attr]
+        return
+    await state.clear()
+    await message.answer(translator.t("chat_not_active", resolve_locale(message, settings.default_language)))
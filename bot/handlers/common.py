@@ -6,6 +6,7 @@ from aiogram.types import Message
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from bot.config import Settings
+from bot.db.breaker import DatabaseUnavailable
 from bot.services.users import touch_user
 from bot.utils.i18n import Translator
 from bot.utils.locale import resolve_locale
@@ -23,8 +24,11 @@ async def help_command(
     session_factory: async_sessionmaker[AsyncSession],
 ) -> None:
     locale = resolve_locale(message, settings.default_language)
-    async with session_scope(session_factory) as session:
-        await touch_user(session, message.from_user.id)  # type: ignore[arg-type]
+    try:
+        async with session_scope(session_factory) as session:
+            await touch_user(session, message.from_user.id)  # type: ignore[arg-type]
+    except DatabaseUnavailable:
+        pass
     if message.text and message.text.startswith("/"):
         await safe_delete(message)
     await message.answer(translator.t("help", locale))
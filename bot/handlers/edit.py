@@ -0,0 +1,382 @@
+from __future__ import annotations
+
+from typing import Any
+
+from aiogram import F, Router
+from aiogram.filters import StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery, Message
+from aiogram.types import User as TelegramUser
+from sqlalchemy.exc import IntegrityError
+
+from bot.config import Settings
+from bot.db.breaker import DatabaseUnavailable
+from bot.db.models import User
+from bot.db.routing import SessionRouter
+from bot.handlers.register import MAX_BIO_LENGTH, MAX_GAMES, NICKNAME_RE
+from bot.handlers.states import EditState
+from bot.keyboards.profile import EDIT_FIELDS, edit_fields_keyboard
+from bot.keyboards.registration import games_keyboard, language_keyboard, skip_keyboard
+from bot.services.games import GameCatalog, rank_games
+from bot.services.profile_cache import ProfileCache, ProfileSnapshot, load_profile
+from bot.services.profile_edit import ProfileEditor
+from bot.services.profile_messages import send_profile_message
+from bot.utils.debounce import EditDebouncer
+from bot.utils.i18n import AVAILABLE_LOCALES, Translator
+from bot.utils.locale import resolve_locale
+
+router = Router(name="edit")
+
+EDIT_STATES = {
+    "nick": EditState.nick,
+    "age": EditState.age,
+    "language": EditState.language,
+    "games": EditState.games,
+    "bio": EditState.bio,
+    "photo": EditState.photo,
+}
+
+
+@router.callback_query(F.data == "profile:edit")
+async def choose_field(
+    callback: CallbackQuery,
+    translator: Translator,
+    settings: Settings,
+) -> None:
+    locale = resolve_locale(callback, settings.default_language)
+    await callback.answer()
+    if callback.message:
+        await callback.message.answer(
+            translator.t("edit_choose", locale),
+            reply_markup=edit_fields_keyboard(translator, locale),
+        )
+
+
+@router.callback_query(F.data.startswith("edit:"))
+async def start_edit(
+    callback: CallbackQuery,
+    state: FSMContext,
+    session_router: SessionRouter,
+    profile_cache: ProfileCache,
+    game_catalog: GameCatalog,
+    translator: Translator,
+    settings: Settings,
+) -> None:
+    base_locale = resolve_locale(callback, settings.default_language)
+    field = callback.data.split(":", 1)[1]  # type: ignore[union-attr]
+    if field not in EDIT_FIELDS or not callback.message:
+        await callback.answer()
+        return
+    current = await state.get_state()
+    if current is not None and current not in EditState.__all_states_names__:
+        # A chat or onboarding in progress keeps its state.
+        await callback.answer(translator.t("edit_busy", base_locale), show_alert=True)
+        return
+
+    user, degraded = await load_profile(session_router, profile_cache, callback.from_user.id)
+    await callback.answer()
+    if user is None or degraded:
+        await callback.message.answer(
+            translator.t("degraded_unavailable" if degraded else "profile_missing", base_locale)
+        )
+        return
+
+    locale = user.languages[0] if user.languages else base_locale
+    games = [game.id for game in user.games]
+    await state.set_state(EDIT_STATES[field])
+    # The current nick and games are what the edit diffs against and which cached pages it drops.
+    await state.set_data(
+        {"locale": locale, "edit_nick": user.roblox_nick, "edit_games": games, "selected_games": games}
+    )
+
+    message = callback.message
+    if field == "nick":
+        await message.answer(translator.t("ask_nick", locale))
+    elif field == "age":
+        await message.answer(translator.t("ask_age", locale))
+    elif field == "language":
+        await message.answer(translator.t("ask_language", locale), reply_markup=language_keyboard(translator, locale))
+    elif field == "games":
+        await message.answer(
+            translator.t("ask_games", locale),
+            reply_markup=games_keyboard(translator, locale, game_catalog.items, set(games)),
+        )
+    else:
+        await message.answer(
+            translator.t(f"edit_ask_{field}", locale),
+            reply_markup=skip_keyboard(translator.t("edit_remove", locale)),
+        )
+
+
+@router.message(EditState.nick)
+async def edit_nick(
+    message: Message,
+    state: FSMContext,
+    profile_editor: ProfileEditor,
+    translator: Translator,
+) -> None:
+    data = await state.get_data()
+    nick = (message.text or "").strip()
+    if not NICKNAME_RE.match(nick):
+        await message.answer(translator.t("invalid_nick", data["locale"]))
+        return
+    if nick == data["edit_nick"]:
+        await state.clear()
+        await message.answer(translator.t("edit_saved", data["locale"]))
+        return
+    await save_field(
+        message,
+        message.from_user,  # type: ignore[arg-type]
+        state,
+        profile_editor,
+        translator,
+        "nick",
+        nick,
+    )
+
+
+@router.message(EditState.age)
+async def edit_age(
+    message: Message,
+    state: FSMContext,
+    profile_editor: ProfileEditor,
+    translator: Translator,
+) -> None:
+    data = await state.get_data()
+    text = (message.text or "").strip()
+    if not text.isdigit() or not 8 <= int(text) <= 99:
+        await message.answer(translator.t("invalid_age", data["locale"]))
+        return
+    await save_field(
+        message,
+        message.from_user,  # type: ignore[arg-type]
+        state,
+        profile_editor,
+        translator,
+        "age",
+        int(text),
+    )
+
+
+@router.callback_query(EditState.language, F.data.startswith("lang:"))
+async def edit_language(
+    callback: CallbackQuery,
+    state: FSMContext,
+    profile_editor: ProfileEditor,
+    translator: Translator,
+) -> None:
+    locale = callback.data.split(":", 1)[1]  # type: ignore[union-attr]
+    await callback.answer()
+    if locale not in AVAILABLE_LOCALES or not callback.message:
+        return
+    await state.update_data(locale=locale)
+    await save_field(
+        callback.message,  # type: ignore[arg-type]
+        callback.from_user,
+        state,
+        profile_editor,
+        translator,
+        "language",
+        [locale],
+    )
+
+
+@router.message(EditState.games)
+async def edit_games_search(
+    message: Message,
+    state: FSMContext,
+    game_catalog: GameCatalog,
+    translator: Translator,
+) -> None:
+    data = await state.get_data()
+    locale = data["locale"]
+    matches = rank_games(message.text or "", game_catalog.items) if message.text else []
+    if not matches:
+        await message.answer(translator.t("games_search_none" if message.text else "ask_games", locale))
+        return
+    await message.answer(
+        translator.t("games_search_found", locale, count=len(matches)),
+        reply_markup=games_keyboard(translator, locale, matches, set(data["selected_games"])),
+    )
+
+
+@router.callback_query(EditState.games, F.data.startswith("game:"))
+async def edit_games_toggle(
+    callback: CallbackQuery,
+    state: FSMContext,
+    game_catalog: GameCatalog,
+    edit_debouncer: EditDebouncer,
+    translator: Translator,
+) -> None:
+    data = await state.get_data()
+    locale = data["locale"]
+    selected = list(data["selected_games"])
+    try:
+        game_id = int(callback.data.split(":")[1])  # type: ignore[union-attr]
+    except (IndexError, ValueError):
+        await callback.answer()
+        return
+    if game_id in selected:
+        selected.remove(game_id)
+    elif len(selected) >= MAX_GAMES:
+        await callback.answer(translator.t("games_limit", locale), show_alert=True)
+        return
+    else:
+        selected.append(game_id)
+    await state.update_data(selected_games=selected)
+    await callback.answer()
+
+    message = callback.message
+
+    async def render_selection() -> None:
+        if await state.get_state() != EditState.games.state:
+            return
+        current = await state.get_data()
+        await message.edit_reply_markup(  # type: ignore[union-attr]
+            reply_markup=games_keyboard(translator, locale, game_catalog.items, set(current["selected_games"]))
+        )
+
+    edit_debouncer.schedule(
+        (callback.bot.id, message.chat.id, message.message_id),  # type: ignore[union-attr]
+        render_selection,
+    )
+
+
+@router.callback_query(EditState.games, F.data == "games:done")
+async def edit_games_done(
+    callback: CallbackQuery,
+    state: FSMContext,
+    profile_editor: ProfileEditor,
+    translator: Translator,
+) -> None:
+    data = await state.get_data()
+    locale = data["locale"]
+    if not data["selected_games"]:
+        await callback.answer(translator.t("games_need_one", locale), show_alert=True)
+        return
+    await callback.answer()
+    if not callback.message:
+        return
+    try:
+        user = await profile_editor.set_games(
+            callback.from_user.id, data["edit_games"], data["selected_games"], data["edit_nick"]
+        )
+    except DatabaseUnavailable:
+        await state.clear()
+        await callback.message.answer(translator.t("degraded_unavailable", locale))
+        return
+    await finish_edit(callback.message, state, translator, locale, user)  # type: ignore[arg-type]
+
+
+@router.message(EditState.bio)
+async def edit_bio(
+    message: Message,
+    state: FSMContext,
+    profile_editor: ProfileEditor,
+    translator: Translator,
+) -> None:
+    data = await state.get_data()
+    bio = (message.text or "").strip()
+    if not bio or len(bio) > MAX_BIO_LENGTH:
+        await message.answer(translator.t("bio_too_long" if bio else "edit_ask_bio", data["locale"]))
+        return
+    await save_field(
+        message,
+        message.from_user,  # type: ignore[arg-type]
+        state,
+        profile_editor,
+        translator,
+        "bio",
+        bio,
+    )
+
+
+@router.message(EditState.photo, F.photo)
+async def edit_photo(
+    message: Message,
+    state: FSMContext,
+    profile_editor: ProfileEditor,
+    translator: Translator,
+) -> None:
+    photo_id = message.photo[-1].file_id  # type: ignore[index]
+    await save_field(
+        message,
+        message.from_user,  # type: ignore[arg-type]
+        state,
+        profile_editor,
+        translator,
+        "photo",
+        photo_id,
+    )
+
+
+@router.message(EditState.photo)
+async def edit_photo_expected(message: Message, state: FSMContext, translator: Translator) -> None:
+    data = await state.get_data()
+    await message.answer(
+        translator.t("edit_ask_photo", data["locale"]),
+        reply_markup=skip_keyboard(translator.t("edit_remove", data["locale"])),
+    )
+
+
+@router.callback_query(StateFilter(EditState.bio, EditState.photo), F.data == "skip")
+async def edit_remove(
+    callback: CallbackQuery,
+    state: FSMContext,
+    profile_editor: ProfileEditor,
+    translator: Translator,
+) -> None:
+    await callback.answer()
+    if not callback.message:
+        return
+    field = "bio" if await state.get_state() == EditState.bio.state else "photo"
+    await save_field(
+        callback.message,  # type: ignore[arg-type]
+        callback.from_user,
+        state,
+        profile_editor,
+        translator,
+        field,
+        None,
+    )
+
+
+async def save_field(
+    message: Message,
+    from_user: TelegramUser,
+    state: FSMContext,
+    profile_editor: ProfileEditor,
+    translator: Translator,
+    field: str,
+    value: Any,
+) -> None:
+    # `message` may be the bot's own message (buttons), so the editor comes separately.
+    data = await state.get_data()
+    locale = data["locale"]
+    try:
+        user = await profile_editor.set_field(
+            message.bot, from_user.id, field, value, data["edit_nick"]  # type: ignore[arg-type]
+        )
+    except IntegrityError:
+        await message.answer(translator.t("nick_taken", locale))
+        return
+    except DatabaseUnavailable:
+        await state.clear()
+        await message.answer(translator.t("degraded_unavailable", locale))
+        return
+    await finish_edit(message, state, translator, locale, user)
+
+
+async def finish_edit(
+    message: Message,
+    state: FSMContext,
+    translator: Translator,
+    locale: str,
+    user: User | ProfileSnapshot | None,
+) -> None:
+    await state.clear()
+    if user is None:
+        await message.answer(translator.t("profile_missing", locale))
+        return
+    await message.answer(translator.t("edit_saved", locale))
+    await send_profile_message(message, user, translator, locale)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from html import escape
+
+from aiogram import Router
+from aiogram.types import (
+    InlineQuery,
+    InlineQueryResultArticle,
+    InlineQueryResultCachedPhoto,
+    InlineQueryResultsButton,
+    InputTextMessageContent,
+)
+
+from bot.config import Settings
+from bot.db.breaker import DatabaseUnavailable
+from bot.db.routing import SessionRouter
+from bot.keyboards.profile import like_keyboard
+from bot.services.counters import ProfileCounters
+from bot.services.inline_search import InlinePage, InlineSearch, normalize_query
+from bot.services.profile_cache import ProfileCache, ProfileSnapshot, load_profile
+from bot.utils.formatting import format_profile
+from bot.utils.i18n import Translator
+from bot.utils.locale import resolve_locale
+
+router = Router(name="inline")
+
+InlineResult = InlineQueryResultArticle | InlineQueryResultCachedPhoto
+
+
+@router.inline_query()
+async def inline_lookup(
+    inline_query: InlineQuery,
+    session_router: SessionRouter,
+    profile_cache: ProfileCache,
+    inline_search: InlineSearch,
+    profile_counters: ProfileCounters,
+    translator: Translator,
+    settings: Settings,
+) -> None:
+    locale = resolve_locale(inline_query, settings.default_language)
+    query = normalize_query(inline_query.query)
+    if not query:
+        await share_own_profile(inline_query, session_router, profile_cache, translator, locale)
+        return
+
+    page = await inline_search.cached(query, inline_query.offset)
+    if page is None:
+        # Every keystroke is a separate inline query; only the last one of a burst is looked up.
+        if not await inline_search.settle(inline_query.from_user.id):
+            return
+        try:
+            page = await inline_search.search(session_router, inline_query.from_user.id, query, inline_query.offset)
+        except DatabaseUnavailable:
+            await inline_query.answer([], cache_time=0, is_personal=True)
+            return
+
+    await profile_counters.record_views((player.id for player in page.players), inline_query.from_user.id)
+    # Cards are rendered in the requester's language, so Telegram must not share them across users.
+    await inline_query.answer(
+        render_page(page, translator, locale),
+        cache_time=settings.inline_cache_time,
+        is_personal=True,
+        next_offset=page.next_offset,
+    )
+
+
+async def share_own_profile(
+    inline_query: InlineQuery,
+    session_router: SessionRouter,
+    profile_cache: ProfileCache,
+    translator: Translator,
+    locale: str,
+) -> None:
+    user, _degraded = await load_profile(session_router, profile_cache, inline_query.from_user.id)
+    if user is None:
+        await inline_query.answer(
+            [],
+            cache_time=0,
+            is_personal=True,
+            button=InlineQueryResultsButton(text=translator.t("inline_register", locale), start_parameter="inline"),
+        )
+        return
+    snapshot = user if isinstance(user, ProfileSnapshot) else ProfileSnapshot.from_user(user)
+    result = player_result(snapshot, translator, locale, title=translator.t("inline_share_profile", locale))
+    await inline_query.answer([result], cache_time=30, is_personal=True)
+
+
+def render_page(page: InlinePage, translator: Translator, locale: str) -> list[InlineResult]:
+    results: list[InlineResult] = [
+        InlineQueryResultArticle(
+            id=f"g{game['id']}",
+            title=game["name"],
+            description=translator.t("inline_game_description", locale),
+            input_message_content=InputTextMessageContent(
+                message_text=translator.t("inline_game_message", locale, name=escape(game["name"]))
+            ),
+        )
+        for game in page.games
+    ]
+    results.extend(player_result(player, translator, locale) for player in page.players)
+    return results
+
+
+def player_result(
+    player: ProfileSnapshot,
+    translator: Translator,
+    locale: str,
+    title: str | None = None,
+) -> InlineResult:
+    text = format_profile(player, translator, locale, title_key="inline_profile_title")
+    description = translator.t(
+        "inline_player_description",
+        locale,
+        age=player.age,
+        games=", ".join(game.name for game in player.games) or "-",
+    )
+    markup = like_keyboard(translator, locale, player.id)
+    if player.photo_id:
+        return InlineQueryResultCachedPhoto(
+            id=f"u{player.id}",
+            photo_file_id=player.photo_id,
+            title=title or player.roblox_nick,
+            description=description,
+            caption=text,
+            reply_markup=markup,
+        )
+    return InlineQueryResultArticle(
+        id=f"u{player.id}",
+        title=title or player.roblox_nick,
+        description=description,
+        input_message_content=InputTextMessageContent(message_text=text),
+        reply_markup=markup,
+    )
@@ -7,9 +7,15 @@ from aiogram.types import CallbackQuery, Message
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from bot.config import Settings
+from bot.db.breaker import DatabaseUnavailable
+from bot.db.routing import SessionRouter
 from bot.db.session import session_scope
+from bot.services.counters import ProfileCounters
+from bot.services.matchmaking import MatchQueue
+from bot.services.profile_cache import ProfileCache, load_profile
 from bot.services.profile_messages import send_profile_message
-from bot.services.users import delete_user, get_user, touch_user
+from bot.services.retry_queue import WriteRetryQueue
+from bot.services.users import delete_user, touch_user
 from bot.utils.i18n import Translator
 from bot.utils.locale import resolve_locale
 from bot.utils.telegram import safe_delete
@@ -21,6 +27,9 @@ router = Router(name="profile")
 async def profile(
     message: Message,
     session_factory: async_sessionmaker[AsyncSession],
+    session_router: SessionRouter,
+    profile_cache: ProfileCache,
+    profile_counters: ProfileCounters,
     translator: Translator,
     settings: Settings,
     state: FSMContext,
@@ -28,45 +37,65 @@ async def profile(
     base_locale = resolve_locale(message, settings.default_language)
     if message.text and message.text.startswith("/"):
         await safe_delete(message)
-    async with session_scope(session_factory) as session:
-        user = await get_user(session, message.from_user.id)  # type: ignore[arg-type]
-        if user:
-            await touch_user(session, message.from_user.id)  # type: ignore[arg-type]
+    user, degraded = await load_profile(session_router, profile_cache, message.from_user.id)  # type: ignore[union-attr]
+    if user and not degraded:
+        try:
+            async with session_scope(session_factory) as session:
+                await touch_user(session, message.from_user.id)  # type: ignore[arg-type]
+        except DatabaseUnavailable:
+            pass
 
     if not user:
-        await message.answer(translator.t("profile_missing", base_locale))
+        await message.answer(translator.t("degraded_unavailable" if degraded else "profile_missing", base_locale))
         return
 
     locale = user.languages[0] if user.languages else base_locale
-    await send_profile_message(message, user, translator, locale)
+    if degraded:
+        await message.answer(translator.t("degraded_profile", locale))
+    try:
+        stats = await profile_counters.get(user.id)
+    except DatabaseUnavailable:
+        stats = None
+    await send_profile_message(message, user, translator, locale, stats=stats)
 
 
-@router.callback_query(F.data == "profile:edit")
-async def edit_placeholder(
+@router.callback_query(F.data.startswith("like:"))
+async def like_profile(
     callback: CallbackQuery,
+    profile_counters: ProfileCounters,
     translator: Translator,
     settings: Settings,
 ) -> None:
     locale = resolve_locale(callback, settings.default_language)
-    await callback.answer()
-    if callback.message:
-        await callback.message.answer(translator.t("edit_coming_soon", locale))
+    profile_id = int(callback.data.split(":", 1)[1])  # type: ignore[union-attr]
+    counted = await profile_counters.record_like(profile_id, callback.from_user.id)
+    await callback.answer(translator.t("profile_liked" if counted else "profile_like_repeat", locale))
 
 
 @router.callback_query(F.data == "profile:delete")
 async def delete_profile(
     callback: CallbackQuery,
-    session_factory: async_sessionmaker[AsyncSession],
+    session_router: SessionRouter,
+    profile_cache: ProfileCache,
+    write_queue: WriteRetryQueue,
+    match_queue: MatchQueue,
     translator: Translator,
     settings: Settings,
     state: FSMContext,
 ) -> None:
     locale = resolve_locale(callback, settings.default_language)
-    async with session_scope(session_factory) as session:
-        deleted = await delete_user(session, callback.from_user.id)  # type: ignore[arg-type]
+    await match_queue.leave(callback.from_user.id)
+    queued = False
+    try:
+        async with session_scope(session_router.for_write(callback.from_user.id)) as session:
+            deleted = await delete_user(session, callback.from_user.id)  # type: ignore[arg-type]
+    except DatabaseUnavailable:
+        await write_queue.delete_user(callback.from_user.id)
+        deleted = queued = True
+    await profile_cache.delete(callback.from_user.id)
     await callback.answer()
     if deleted and callback.message:
         await state.clear()
-        await callback.message.answer(translator.t("profile_deleted", locale))
+        await callback.message.answer(translator.t("degraded_saved" if queued else "profile_deleted", locale))
     elif callback.message:
         await callback.message.answer(translator.t("profile_missing", locale))
@@ -1,23 +1,31 @@
 from __future__ import annotations
 
 import re
-from difflib import SequenceMatcher
 
 from aiogram import F, Router
 from aiogram.filters import Command, CommandStart, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
+from aiogram.types import User as TelegramUser
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
 from bot.config import Settings
+from bot.db.breaker import DatabaseUnavailable
+from bot.db.models import User
+from bot.db.routing import SessionRouter
 from bot.db.session import session_scope
 from bot.handlers.states import RegisterState
 from bot.keyboards.registration import games_keyboard, language_keyboard, skip_keyboard
-from bot.services.games import list_games
+from bot.services.analytics import FunnelTracker
+from bot.services.avatars import AvatarIndex, AvatarPipeline
+from bot.services.games import GameCatalog, rank_games
+from bot.services.matchmaking import MatchQueue
+from bot.services.profile_cache import ProfileCache, ProfileSnapshot, load_profile
+from bot.services.retry_queue import WriteRetryQueue
 from bot.services.schemas import RegistrationData
 from bot.services.profile_messages import send_profile_message
-from bot.services.users import get_user, upsert_user
+from bot.services.users import upsert_user
+from bot.utils.debounce import EditDebouncer
 from bot.utils.i18n import AVAILABLE_LOCALES, Translator
 from bot.utils.locale import resolve_locale
 from bot.utils.telegram import safe_delete
@@ -43,24 +51,29 @@ MAX_GAMES = 5
 async def command_during_onboarding(
     message: Message,
     state: FSMContext,
-    session_factory: async_sessionmaker[AsyncSession],
+    session_router: SessionRouter,
+    profile_cache: ProfileCache,
     translator: Translator,
     settings: Settings,
+    funnel: FunnelTracker,
+    match_queue: MatchQueue,
 ) -> None:
     if not message.from_user or message.from_user.is_bot:
         return
     locale = resolve_locale(message, settings.default_language)
     text = (message.text or "").strip()
     await state.clear()
+    funnel.cancel(message.bot.id, message.from_user.id)  # type: ignore[union-attr]
     await safe_delete(message)
 
     if text.startswith("/start"):
-        await cmd_start(message, state, session_factory, translator, settings)
+        await cmd_start(message, state, session_router, profile_cache, translator, settings, funnel, match_queue)
         return
     if text.startswith("/profile"):
-        async with session_scope(session_factory) as session:
-            user = await get_user(session, message.from_user.id)  # type: ignore[arg-type]
+        user, degraded = await load_profile(session_router, profile_cache, message.from_user.id)
         if user:
+            if degraded:
+                await message.answer(translator.t("degraded_profile", locale))
             await send_profile_message(
                 message,
                 user,
@@ -68,7 +81,7 @@ async def command_during_onboarding(
                 user.languages[0] if user.languages else locale,
             )
         else:
-            await message.answer(translator.t("profile_missing", locale))
+            await message.answer(translator.t("degraded_unavailable" if degraded else "profile_missing", locale))
         return
 
     await message.answer(translator.t("cancel", locale))
@@ -78,21 +91,30 @@ async def command_during_onboarding(
 async def cmd_start(
     message: Message,
     state: FSMContext,
-    session_factory: async_sessionmaker[AsyncSession],
+    session_router: SessionRouter,
+    profile_cache: ProfileCache,
     translator: Translator,
     settings: Settings,
+    funnel: FunnelTracker,
+    match_queue: MatchQueue,
 ) -> None:
     if not message.from_user or message.from_user.is_bot:
         return
     if message.text and message.text.startswith("/"):
         await safe_delete(message)
     await state.clear()
+    await match_queue.leave(message.from_user.id)
     locale = resolve_locale(message, default=settings.default_language)
 
-    async with session_scope(session_factory) as session:
-        existing = await get_user(session, message.from_user.id)  # type: ignore[arg-type]
+    existing, degraded = await load_profile(session_router, profile_cache, message.from_user.id)
+    if degraded and not existing:
+        # Unknown whether the user is registered; do not push them into onboarding again.
+        await message.answer(translator.t("degraded_unavailable", locale))
+        return
     if existing:
         await message.answer(translator.t("already_registered", locale))
+        if degraded:
+            await message.answer(translator.t("degraded_profile", locale))
         await send_profile_message(
             message,
             existing,
@@ -112,6 +134,7 @@ async def cmd_start(
     )
     await message.answer(translator.t("ask_nick", locale))
     await state.set_state(RegisterState.wait_nick)
+    funnel.enter(message.bot.id, message.from_user.id, "nick")  # type: ignore[union-attr]
 
 
 @router.message(Command("cancel"))
@@ -120,11 +143,17 @@ async def cancel(
     state: FSMContext,
     translator: Translator,
     settings: Settings,
+    funnel: FunnelTracker,
+    match_queue: MatchQueue,
 ) -> None:
     if message.text and message.text.startswith("/"):
         await safe_delete(message)
     locale = resolve_locale(message, settings.default_language)
+    if message.from_user and await state.get_state() in RegisterState.__all_states_names__:
+        funnel.cancel(message.bot.id, message.from_user.id)  # type: ignore[union-attr]
     await state.clear()
+    if message.from_user:
+        await match_queue.leave(message.from_user.id)
     await message.answer(translator.t("cancel", locale))
 
 
@@ -134,15 +163,18 @@ async def process_nick(
     state: FSMContext,
     translator: Translator,
     settings: Settings,
+    funnel: FunnelTracker,
 ) -> None:
     data = await state.get_data()
     locale = data.get("locale") or resolve_locale(message, settings.default_language)
     nick = (message.text or "").strip()
     if not NICKNAME_RE.match(nick):
+        funnel.invalid(message.bot.id, message.from_user.id, "nick")  # type: ignore[union-attr]
         await message.answer(translator.t("invalid_nick", locale))
         return
     await state.update_data(roblox_nick=nick)
     await state.set_state(RegisterState.wait_age)
+    funnel.enter(message.bot.id, message.from_user.id, "age")  # type: ignore[union-attr]
     await message.answer(translator.t("ask_age", locale))
 
 
@@ -152,20 +184,20 @@ async def process_age(
     state: FSMContext,
     translator: Translator,
     settings: Settings,
+    funnel: FunnelTracker,
 ) -> None:
     data = await state.get_data()
     locale = data.get("locale") or resolve_locale(message, settings.default_language)
     text = (message.text or "").strip()
-    if not text.isdigit():
+    if not text.isdigit() or not 8 <= int(text) <= 99:
+        funnel.invalid(message.bot.id, message.from_user.id, "age")  # type: ignore[union-attr]
         await message.answer(translator.t("invalid_age", locale))
         return
     age = int(text)
-    if age < 8 or age > 99:
-        await message.answer(translator.t("invalid_age", locale))
-        return
 
     await state.update_data(age=age)
     await state.set_state(RegisterState.wait_language)
+    funnel.enter(message.bot.id, message.from_user.id, "language")  # type: ignore[union-attr]
     await message.answer(
         translator.t("ask_language", locale),
         reply_markup=language_keyboard(translator, locale),
@@ -176,9 +208,10 @@ async def process_age(
 async def process_language(
     callback: CallbackQuery,
     state: FSMContext,
-    session_factory: async_sessionmaker[AsyncSession],
+    game_catalog: GameCatalog,
     translator: Translator,
     settings: Settings,
+    funnel: FunnelTracker,
 ) -> None:
     parts = callback.data.split(":")
     if len(parts) < 2:
@@ -190,19 +223,16 @@ async def process_language(
         locale = settings.default_language
     await state.update_data(language=locale, locale=locale)
 
-    async with session_scope(session_factory) as session:
-        games = await list_games(session)
-
-    if not games:
+    if not game_catalog.items:
         await callback.message.answer(translator.t("games_empty", locale))
         return
 
-    game_payload = [{"id": game.id, "name": game.name, "alias": game.alias} for game in games]
-    await state.update_data(selected_games=[], games_catalog=game_payload)
+    await state.update_data(selected_games=[])
     await state.set_state(RegisterState.wait_games)
+    funnel.enter(callback.bot.id, callback.from_user.id, "games")  # type: ignore[union-attr]
     await callback.message.answer(
         translator.t("ask_games", locale),
-        reply_markup=games_keyboard(translator, locale, game_payload, set()),
+        reply_markup=games_keyboard(translator, locale, game_catalog.items, set()),
     )
 
 
@@ -210,8 +240,10 @@ async def process_language(
 async def search_games(
     message: Message,
     state: FSMContext,
+    game_catalog: GameCatalog,
     translator: Translator,
     settings: Settings,
+    funnel: FunnelTracker,
 ) -> None:
     data = await state.get_data()
     locale = data.get("language") or data.get("locale") or resolve_locale(message, settings.default_language)
@@ -219,33 +251,9 @@ async def search_games(
         await message.answer(translator.t("ask_games", locale))
         return
 
-    query = message.text.strip().lower()
-    games_catalog = data.get("games_catalog", [])
     selected = set(data.get("selected_games", []))
-
-    def similarity(value: str) -> float:
-        if not value:
-            return 0.0
-        return SequenceMatcher(None, query, value).ratio()
-
-    scored = []
-    for game in games_catalog:
-        name = str(game.get("name", "")).lower()
-        alias = str(game.get("alias", "")).lower()
-        score = max(similarity(name), similarity(alias))
-        if query in name:
-            score += 0.35
-        if alias and query in alias:
-            score += 0.25
-        if name.startswith(query):
-            score += 0.2
-        if alias and alias.startswith(query):
-            score += 0.1
-        scored.append((score, game))
-
-    scored = [item for item in scored if item[0] >= 0.2]
-    scored.sort(key=lambda x: x[0], reverse=True)
-    matches = [game for _, game in scored[:20]]
+    matches = rank_games(message.text, game_catalog.items)
+    funnel.search(message.bot.id, message.from_user.id, len(matches))  # type: ignore[union-attr]
 
     if not matches:
         await message.answer(translator.t("games_search_none", locale))
@@ -261,6 +269,8 @@ async def search_games(
 async def toggle_game(
     callback: CallbackQuery,
     state: FSMContext,
+    game_catalog: GameCatalog,
+    edit_debouncer: EditDebouncer,
     translator: Translator,
     settings: Settings,
 ) -> None:
@@ -282,12 +292,25 @@ async def toggle_game(
         selected.add(game_id)
 
     await state.update_data(selected_games=list(selected))
-    games_catalog = data.get("games_catalog", [])
-    await callback.message.edit_reply_markup(
-        reply_markup=games_keyboard(translator, locale, games_catalog, selected)
-    )
     await callback.answer()
 
+    message = callback.message
+
+    async def render_selection() -> None:
+        if await state.get_state() != RegisterState.wait_games.state:
+            return
+        current = await state.get_data()
+        await message.edit_reply_markup(
+            reply_markup=games_keyboard(
+                translator, locale, game_catalog.items, set(current.get("selected_games", []))
+            )
+        )
+
+    edit_debouncer.schedule(
+        (callback.bot.id, message.chat.id, message.message_id),  # type: ignore[union-attr]
+        render_selection,
+    )
+
 
 @router.callback_query(RegisterState.wait_games, F.data == "games:done")
 async def games_done(
@@ -295,15 +318,18 @@ async def games_done(
     state: FSMContext,
     translator: Translator,
     settings: Settings,
+    funnel: FunnelTracker,
 ) -> None:
     data = await state.get_data()
     locale = data.get("language") or data.get("locale") or resolve_locale(callback, settings.default_language)
     selected = data.get("selected_games", [])
     if not selected:
+        funnel.invalid(callback.bot.id, callback.from_user.id, "games")  # type: ignore[union-attr]
         await callback.answer(translator.t("games_need_one", locale), show_alert=True)
         return
 
     await state.set_state(RegisterState.wait_bio)
+    funnel.enter(callback.bot.id, callback.from_user.id, "bio")  # type: ignore[union-attr]
     await callback.message.answer(
         translator.t("ask_bio", locale),
         reply_markup=skip_keyboard(translator.t("skip", locale)),
@@ -317,16 +343,19 @@ async def process_bio(
     state: FSMContext,
     translator: Translator,
     settings: Settings,
+    funnel: FunnelTracker,
 ) -> None:
     data = await state.get_data()
     locale = data.get("language") or data.get("locale") or resolve_locale(message, settings.default_language)
     bio = (message.text or "").strip()
     if len(bio) > MAX_BIO_LENGTH:
+        funnel.invalid(message.bot.id, message.from_user.id, "bio")  # type: ignore[union-attr]
         await message.answer(translator.t("bio_too_long", locale))
         return
     await state.update_data(description=bio)
     await message.answer(translator.t("bio_saved", locale))
     await prompt_photo(message, state, translator, locale)
+    funnel.enter(message.bot.id, message.from_user.id, "photo")  # type: ignore[union-attr]
 
 
 @router.callback_query(RegisterState.wait_bio, F.data == "skip")
@@ -335,6 +364,7 @@ async def skip_bio(
     state: FSMContext,
     translator: Translator,
     settings: Settings,
+    funnel: FunnelTracker,
 ) -> None:
     data = await state.get_data()
     locale = data.get("language") or data.get("locale") or resolve_locale(callback, settings.default_language)
@@ -342,6 +372,7 @@ async def skip_bio(
     await callback.message.answer(translator.t("bio_skipped", locale))
     await callback.answer()
     await prompt_photo(callback.message, state, translator, locale)
+    funnel.enter(callback.bot.id, callback.from_user.id, "photo")  # type: ignore[union-attr]
 
 
 async def prompt_photo(message: Message, state: FSMContext, translator: Translator, locale: str) -> None:
@@ -356,31 +387,68 @@ async def prompt_photo(message: Message, state: FSMContext, translator: Translat
 async def process_photo(
     message: Message,
     state: FSMContext,
-    session_factory: async_sessionmaker[AsyncSession],
+    session_router: SessionRouter,
+    profile_cache: ProfileCache,
+    write_queue: WriteRetryQueue,
+    game_catalog: GameCatalog,
     translator: Translator,
     settings: Settings,
+    funnel: FunnelTracker,
+    avatar_pipeline: AvatarPipeline,
+    avatar_index: AvatarIndex,
 ) -> None:
     data = await state.get_data()
     locale = data.get("language") or data.get("locale") or resolve_locale(message, settings.default_language)
     photo = message.photo[-1]
     await state.update_data(photo_id=photo.file_id)
     await message.answer(translator.t("photo_saved", locale))
-    await finalize_registration(message, state, session_factory, translator, settings)
+    saved = await finalize_registration(
+        message,
+        message.from_user,  # type: ignore[arg-type]
+        state,
+        session_router,
+        profile_cache,
+        write_queue,
+        game_catalog,
+        translator,
+        settings,
+        funnel,
+    )
+    if saved:
+        # Hashing needs the profile row; queued registrations are not indexed.
+        avatar_pipeline.submit(
+            avatar_index, message.bot, message.from_user.id, photo.file_id  # type: ignore[arg-type, union-attr]
+        )
 
 
 @router.callback_query(RegisterState.wait_photo, F.data == "skip")
 async def skip_photo(
     callback: CallbackQuery,
     state: FSMContext,
-    session_factory: async_sessionmaker[AsyncSession],
+    session_router: SessionRouter,
+    profile_cache: ProfileCache,
+    write_queue: WriteRetryQueue,
+    game_catalog: GameCatalog,
     translator: Translator,
     settings: Settings,
+    funnel: FunnelTracker,
 ) -> None:
     data = await state.get_data()
     locale = data.get("language") or data.get("locale") or resolve_locale(callback, settings.default_language)
     await state.update_data(photo_id=None)
     await callback.answer(translator.t("photo_skipped", locale))
-    await finalize_registration(callback.message, state, session_factory, translator, settings)
+    await finalize_registration(
+        callback.message,  # type: ignore[arg-type]
+        callback.from_user,
+        state,
+        session_router,
+        profile_cache,
+        write_queue,
+        game_catalog,
+        translator,
+        settings,
+        funnel,
+    )
 
 
 @router.message(RegisterState.wait_photo)
@@ -389,9 +457,11 @@ async def photo_expected(
     state: FSMContext,
     translator: Translator,
     settings: Settings,
+    funnel: FunnelTracker,
 ) -> None:
     data = await state.get_data()
     locale = data.get("language") or data.get("locale") or resolve_locale(message, settings.default_language)
+    funnel.invalid(message.bot.id, message.from_user.id, "photo")  # type: ignore[union-attr]
     await message.answer(
         translator.t("ask_photo", locale),
         reply_markup=skip_keyboard(translator.t("skip", locale)),
@@ -400,17 +470,24 @@ async def photo_expected(
 
 async def finalize_registration(
     message: Message,
+    from_user: TelegramUser,
     state: FSMContext,
-    session_factory: async_sessionmaker[AsyncSession],
+    session_router: SessionRouter,
+    profile_cache: ProfileCache,
+    write_queue: WriteRetryQueue,
+    game_catalog: GameCatalog,
     translator: Translator,
     settings: Settings,
-) -> None:
+    funnel: FunnelTracker,
+) -> bool:
+    # `message` may be the bot's own message (skip button), so the registrant comes separately.
+    # True when the profile was written to the database now rather than queued or rejected.
     data = await state.get_data()
     locale = data.get("language") or data.get("locale") or resolve_locale(message, settings.default_language)
 
     payload = RegistrationData(
-        tg_id=message.from_user.id,  # type: ignore[arg-type]
-        username=message.from_user.username if message.from_user else None,
+        tg_id=from_user.id,
+        username=from_user.username,
         roblox_nick=data["roblox_nick"],
         age=data["age"],
         languages=[locale],
@@ -419,17 +496,35 @@ async def finalize_registration(
         photo_id=data.get("photo_id"),
     )
 
+    queued = False
     try:
-        async with session_scope(session_factory) as session:
-            user = await upsert_user(session, payload)
+        async with session_scope(session_router.for_write(payload.tg_id)) as session:
+            user: User | ProfileSnapshot = await upsert_user(session, payload)
+    except DatabaseUnavailable:
+        # Nickname uniqueness is checked when the queued write is replayed.
+        await write_queue.upsert_user(payload)
+        names = {
+            game_id: game_catalog.by_id[game_id]["name"]
+            for game_id in payload.game_ids
+            if game_id in game_catalog.by_id
+        }
+        user = ProfileSnapshot.from_registration(payload, names)
+        queued = True
     except IntegrityError:
         await state.set_state(RegisterState.wait_nick)
         await state.update_data(locale=locale)
+        funnel.invalid(message.bot.id, from_user.id, "nick")  # type: ignore[union-attr]
+        funnel.enter(message.bot.id, from_user.id, "nick")  # type: ignore[union-attr]
         await message.answer(translator.t("nick_taken", locale))
         await message.answer(translator.t("ask_nick", locale))
-        return
+        return False
 
+    await profile_cache.put(user)
     await state.clear()
+    funnel.complete(message.bot.id, from_user.id)  # type: ignore[union-attr]
+    if queued:
+        await message.answer(translator.t("degraded_saved", locale))
     await message.answer(translator.t("registration_complete", locale))
     await message.answer(translator.t("main_menu_hint", locale))
     await send_profile_message(message, user, translator, locale)
+    return not queued
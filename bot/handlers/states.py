@@ -8,3 +8,17 @@ class RegisterState(StatesGroup):
     wait_games = State()
     wait_bio = State()
     wait_photo = State()
+
+
+class EditState(StatesGroup):
+    nick = State()
+    age = State()
+    language = State()
+    games = State()
+    bio = State()
+    photo = State()
+
+
+class ChatState(StatesGroup):
+    searching = State()
+    active = State()
@@ -10,3 +10,20 @@ def profile_actions_keyboard(tr: Translator, locale: str) -> InlineKeyboardMarku
     builder.button(text=tr.t("profile_buttons_delete", locale), callback_data="profile:delete")
     builder.adjust(2)
     return builder.as_markup()
+
+
+EDIT_FIELDS = ("nick", "age", "language", "games", "bio", "photo")
+
+
+def edit_fields_keyboard(tr: Translator, locale: str) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    for field in EDIT_FIELDS:
+        builder.button(text=tr.t(f"edit_field_{field}", locale), callback_data=f"edit:{field}")
+    builder.adjust(2)
+    return builder.as_markup()
+
+
+def like_keyboard(tr: Translator, locale: str, profile_id: int) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(text=tr.t("profile_buttons_like", locale), callback_data=f"like:{profile_id}")
+    return builder.as_markup()
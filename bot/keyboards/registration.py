@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Iterable, Mapping, Set, Any
 
-from aiogram.types import InlineKeyboardMarkup
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from bot.utils.i18n import Translator
@@ -22,7 +22,7 @@ def games_keyboard(
     games: Iterable[Any],
     selected_ids: Set[int],
 ) -> InlineKeyboardMarkup:
-    builder = InlineKeyboardBuilder()
+    buttons = []
     for game in games:
         if isinstance(game, Mapping):
             game_id = int(game["id"])
@@ -31,11 +31,11 @@ def games_keyboard(
             game_id = getattr(game, "id")
             name = getattr(game, "name")
         marker = "✅ " if game_id in selected_ids else ""
-        builder.button(text=f"{marker}{name}", callback_data=f"game:{game_id}")
-    builder.adjust(2)
-    builder.button(text=f"✔️ {tr.t('done', locale)}", callback_data="games:done")
-    builder.adjust(2, 1)
-    return builder.as_markup()
+        buttons.append(InlineKeyboardButton(text=f"{marker}{name}", callback_data=f"game:{game_id}"))
+    buttons.append(InlineKeyboardButton(text=f"✔️ {tr.t('done', locale)}", callback_data="games:done"))
+    # Same rows as InlineKeyboardBuilder.adjust(2, 1): two buttons first, then one per row.
+    # The builder deep-copies its markup on every added button, which is quadratic in catalog size.
+    return InlineKeyboardMarkup(inline_keyboard=[buttons[:2], *([button] for button in buttons[2:])])
 
 
 def skip_keyboard(text: str) -> InlineKeyboardMarkup:
@@ -1,50 +1,404 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 from pathlib import Path
 
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.redis import RedisStorage
 from redis.asyncio import from_url as redis_from_url
 
-from bot.config import load_settings
-from bot.db.session import create_engine, create_session_factory, init_models, session_scope
-from bot.handlers.common import router as common_router
-from bot.handlers.profile import router as profile_router
-from bot.handlers.register import router as register_router
+from bot.config import BotSpec, Settings, load_settings
+from bot.db.breaker import CircuitBreaker
+from bot.db.routing import Replica, SessionRouter
+from bot.db.session import (
+    create_engine,
+    create_replicas,
+    create_session_factory,
+    init_bot_schema,
+    init_game_counters,
+    init_models,
+    session_scope,
+)
+from bot.handlers import load_routers
 from bot.middlewares.context import ContextMiddleware
-from bot.services.games import seed_games
+from bot.middlewares.drain import InFlightMiddleware
+from bot.middlewares.edit_cancel import EditCancelMiddleware
+from bot.middlewares.log_context import LogContextMiddleware
+from bot.middlewares.profiling import ProfilingMiddleware
+from bot.middlewares.recorder import RecorderMiddleware
+from bot.middlewares.throttling import ThrottlingMiddleware
+from bot.middlewares.usage import UsageMiddleware
+from bot.services.analytics import CsvFileSink, FunnelTracker, PostgresCopySink
+from bot.services.avatars import AvatarFetcher, AvatarIndex, AvatarPipeline, BotApiFetcher, DirectoryFetcher
+from bot.services.bulk import asyncpg_dsn
+from bot.services.changes import ChangeEvent, ChangeFeed
+from bot.services.chat import ChatRelay
+from bot.services.counters import ProfileCounters
+from bot.services.games import GameCatalog, load_catalog, seed_games
+from bot.services.hosting import HostedBot, bot_namespace, bot_schema
+from bot.services.inline_search import InlineSearch
+from bot.services.matchmaking import MatchQueue
+from bot.services.profile_cache import ProfileCache
+from bot.services.profile_edit import ProfileEditor
+from bot.services.recorder import UpdateRecorder
+from bot.services.retry_queue import WriteRetryQueue
+from bot.utils.debounce import EditDebouncer
 from bot.utils.i18n import Translator
 from bot.utils.logging import setup_logging
+from bot.utils.profiling import UpdateProfiler
+from bot.utils.shutdown import ShutdownCoordinator
+from bot.utils.startup import ReadinessProbe, StartupTimer
+from bot.utils.storage import CompactRedisStorage, HostedKeyBuilder
+from bot.utils.throttling import RedisTokenBucketLimiter, TokenBucketLimiter
+
+logger = logging.getLogger(__name__)
 
 
 async def main() -> None:
-    setup_logging()
+    timer = StartupTimer()
     settings = load_settings()
+    log_listener = setup_logging(
+        level=logging.getLevelName(settings.log_level.upper()),
+        json_format=settings.log_json,
+        queue_size=settings.log_queue_size,
+        exc_burst=settings.log_exc_burst,
+        exc_window=settings.log_exc_window,
+    )
+
+    readiness = ReadinessProbe()
+    if settings.health_port:
+        await readiness.serve(settings.health_host, settings.health_port)
+
+    dp = await build_dispatcher(settings, timer, readiness)
+    try:
+        await dp.start_polling(*(item.bot for item in dp["hosted_bots"]))
+    finally:
+        await readiness.close()
+        log_listener.stop()
+
+
+async def build_dispatcher(
+    settings: Settings,
+    timer: StartupTimer | None = None,
+    readiness: ReadinessProbe | None = None,
+    bot_session: BaseSession | None = None,
+) -> Dispatcher:
+    """Connect pools, host every bot and wire middlewares and routers; running it is up to the caller.
+
+    `bot_session` replaces the Telegram HTTP session of every hosted bot (used by the replay tool).
+    """
+    timer = timer or StartupTimer()
+    readiness = readiness or ReadinessProbe()
     translator = Translator(default_locale=settings.default_language)
 
     engine = create_engine(settings)
-    session_factory = create_session_factory(engine)
-    await init_models(engine)
+    breaker = CircuitBreaker(settings.db_breaker_threshold, settings.db_breaker_reset)
+    session_factory = create_session_factory(engine, breaker=breaker)
+    replicas = create_replicas(settings)
+    profiler = UpdateProfiler(
+        enabled=settings.profiling_enabled,
+        sample_rate=settings.profiling_sample_rate,
+        keep_slowest=settings.profiling_keep_slowest,
+        repeat_threshold=settings.profiling_repeat_threshold,
+    )
+    if profiler.enabled:
+        profiler.attach(engine)
+    redis = redis_from_url(settings.redis_url)
 
     data_path = Path(__file__).resolve().parent.parent / "data" / "games.json"
-    async with session_scope(session_factory) as session:
-        await seed_games(session, data_path)
+    _, catalog_items, _, routers = await asyncio.gather(
+        timer.measure("db_schema", init_models(engine)),
+        timer.measure("catalog_load", asyncio.to_thread(load_catalog, data_path)),
+        timer.measure("redis_ping", asyncio.wait_for(redis.ping(), settings.redis_ping_timeout)),
+        timer.measure("routers_import", asyncio.to_thread(load_routers)),
+    )
+
+    async def seed() -> None:
+        async with profiler.track("startup:seed_games"):
+            async with session_scope(session_factory) as session:
+                await seed_games(session, catalog_items)
+
+    await asyncio.gather(
+        timer.measure("catalog_seed", seed()),
+        timer.measure("game_counters", init_game_counters(engine)),
+    )
 
-    storage = RedisStorage(redis=redis_from_url(settings.redis_url))
-    bot = Bot(settings.bot_token, parse_mode=ParseMode.HTML)
+    if settings.avatar_fetch_dir:
+        avatar_fetcher: AvatarFetcher = DirectoryFetcher(Path(settings.avatar_fetch_dir))
+    else:
+        avatar_fetcher = BotApiFetcher()
+    avatar_pipeline = AvatarPipeline(
+        avatar_fetcher,
+        workers=settings.avatar_workers,
+        capacity=settings.avatar_queue_size,
+        thumbnail_size=settings.avatar_thumbnail_size,
+    )
+
+    specs = settings.bots
+    primary_id = specs[0].bot_id
+
+    def host(spec: BotSpec) -> HostedBot:
+        primary = spec.bot_id == primary_id
+        namespace, schema = bot_namespace(spec, primary), bot_schema(spec, primary)
+        bot_settings = settings.model_copy(update={"default_language": spec.default_language})
+        bot_session_factory = session_factory if primary else create_session_factory(engine, schema, breaker)
+        session_router = SessionRouter(
+            bot_session_factory,
+            [
+                Replica(
+                    replica.name,
+                    replica.engine,
+                    create_session_factory(replica.engine, schema, replica.breaker),
+                    replica.breaker,
+                )
+                for replica in replicas
+            ],
+            strategy=settings.replica_strategy,
+            sticky_window=settings.replica_sticky_window,
+            max_lag=settings.replica_max_lag,
+            check_interval=settings.replica_check_interval,
+        )
+        chat_relay = ChatRelay(
+            redis,
+            bot_session_factory,
+            translator,
+            idle_timeout=settings.chat_idle_timeout,
+            flush_interval=settings.chat_flush_interval,
+            namespace=namespace,
+        )
+        match_queue = MatchQueue(
+            redis,
+            chat_relay,
+            widen_band_after=settings.match_widen_band_after,
+            widen_game_after=settings.match_widen_game_after,
+            max_wait=settings.match_max_wait,
+            namespace=namespace,
+        )
+        profile_cache = ProfileCache(
+            redis,
+            ttl=settings.profile_cache_ttl,
+            namespace=namespace,
+            local_size=settings.profile_local_cache_size if settings.change_feed_enabled else 0,
+        )
+        write_queue = WriteRetryQueue(
+            redis,
+            bot_session_factory,
+            profile_cache,
+            interval=settings.db_retry_interval,
+            namespace=namespace,
+            node_id=settings.node_id,
+        )
+        game_catalog = GameCatalog()
+        avatar_index = AvatarIndex(
+            bot_session_factory,
+            redis,
+            max_distance=settings.avatar_match_distance,
+            thumbnail_ttl=settings.avatar_thumbnail_ttl,
+            namespace=namespace,
+        )
+        inline_search = InlineSearch(
+            redis,
+            game_catalog,
+            page_size=settings.inline_page_size,
+            ttl=settings.inline_cache_ttl,
+            settle_delay=settings.inline_settle_ms / 1000,
+            namespace=namespace,
+        )
+        profile_counters = ProfileCounters(
+            redis,
+            bot_session_factory,
+            interval=settings.stats_flush_interval,
+            like_ttl=settings.stats_like_ttl,
+            namespace=namespace,
+        )
+        return HostedBot(
+            spec=spec,
+            bot=Bot(spec.token, session=bot_session, parse_mode=ParseMode.HTML),
+            settings=bot_settings,
+            namespace=namespace,
+            schema=schema,
+            session_factory=bot_session_factory,
+            session_router=session_router,
+            chat_relay=chat_relay,
+            match_queue=match_queue,
+            profile_cache=profile_cache,
+            write_queue=write_queue,
+            inline_search=inline_search,
+            profile_counters=profile_counters,
+            game_catalog=game_catalog,
+            avatar_index=avatar_index,
+            profile_editor=ProfileEditor(
+                session_router, profile_cache, inline_search, game_catalog, avatar_pipeline, avatar_index
+            ),
+        )
+
+    hosted = [host(spec) for spec in specs]
+    hosted_by_id = {item.bot_id: item for item in hosted}
+    schemas = [item.schema for item in hosted if item.schema]
+    if schemas:
+        await timer.measure("bot_schemas", asyncio.gather(*(init_bot_schema(engine, schema) for schema in schemas)))
+        await timer.measure(
+            "bot_game_counters", asyncio.gather(*(init_game_counters(engine, schema) for schema in schemas))
+        )
+
+    async def refresh_catalog(item: HostedBot) -> None:
+        async with session_scope(item.session_factory) as session:
+            await item.game_catalog.refresh(session)
+
+    await timer.measure("catalog_refresh", asyncio.gather(*(refresh_catalog(item) for item in hosted)))
+
+    change_feed = None
+    if settings.change_feed_enabled:
+        change_feed = ChangeFeed(asyncpg_dsn(settings.database_url), keepalive=settings.change_feed_keepalive)
+        for item in hosted:
+            watch_changes(change_feed, item)
+
+    storage = CompactRedisStorage(
+        redis,
+        ttl=settings.fsm_ttl,
+        encoding=settings.fsm_encoding,
+        compress_threshold=settings.fsm_compress_threshold,
+        key_builder=HostedKeyBuilder(primary_id),
+    )
     dp = Dispatcher(storage=storage)
+    dp["profiler"] = profiler
+    dp["hosted_bots"] = hosted
+    edit_debouncer = EditDebouncer(settings.keyboard_edit_debounce_ms / 1000)
+    dp["edit_debouncer"] = edit_debouncer
+    if settings.analytics_sink == "postgres":
+        funnel_sink: CsvFileSink | PostgresCopySink | None = PostgresCopySink(engine)
+    elif settings.analytics_sink == "file":
+        funnel_sink = CsvFileSink(Path(settings.analytics_dir))
+    else:
+        funnel_sink = None
+    funnel = FunnelTracker(
+        funnel_sink,
+        capacity=settings.analytics_buffer_size,
+        batch_size=settings.analytics_batch_size,
+        flush_interval=settings.analytics_flush_interval,
+        abandon_after=settings.fsm_ttl or 86400,
+    )
+    dp["funnel"] = funnel
+    dp["avatar_pipeline"] = avatar_pipeline
+
+    recorder = None
+    if settings.record_updates:
+        recorder = UpdateRecorder(
+            Path(settings.record_dir),
+            salt=settings.record_salt.encode() or None,
+            capacity=settings.record_buffer_size,
+        )
+        dp.update.outer_middleware(RecorderMiddleware(recorder))
 
-    context_middleware = ContextMiddleware(settings, session_factory, translator)
+    shutdown = ShutdownCoordinator(drain_timeout=settings.shutdown_drain_timeout)
+    dp.update.outer_middleware(InFlightMiddleware(shutdown))
+    dp.update.outer_middleware(UsageMiddleware(hosted_by_id))
+
+    if settings.throttle_enabled:
+        if settings.throttle_backend == "redis":
+            message_limiter = RedisTokenBucketLimiter(
+                redis, "message", settings.throttle_message_rate, settings.throttle_message_burst
+            )
+            callback_limiter = RedisTokenBucketLimiter(
+                redis, "callback", settings.throttle_callback_rate, settings.throttle_callback_burst
+            )
+        else:
+            message_limiter = TokenBucketLimiter(settings.throttle_message_rate, settings.throttle_message_burst)
+            callback_limiter = TokenBucketLimiter(settings.throttle_callback_rate, settings.throttle_callback_burst)
+        dp.message.outer_middleware(ThrottlingMiddleware(message_limiter, hosted_by_id))
+        dp.callback_query.outer_middleware(ThrottlingMiddleware(callback_limiter, hosted_by_id))
+
+    dp.message.outer_middleware(EditCancelMiddleware())
+
+    log_context_middleware = LogContextMiddleware()
+    dp.message.middleware(log_context_middleware)
+    dp.callback_query.middleware(log_context_middleware)
+    dp.inline_query.middleware(log_context_middleware)
+
+    if profiler.enabled:
+        profiling_middleware = ProfilingMiddleware(profiler)
+        dp.message.middleware(profiling_middleware)
+        dp.callback_query.middleware(profiling_middleware)
+        dp.inline_query.middleware(profiling_middleware)
+
+    context_middleware = ContextMiddleware(hosted_by_id, translator)
     dp.message.middleware(context_middleware)
     dp.callback_query.middleware(context_middleware)
+    dp.inline_query.middleware(context_middleware)
+
+    dp.include_routers(*routers)
+
+    async def on_startup() -> None:
+        for item in hosted:
+            await item.session_router.start()
+            await item.chat_relay.start(item.bot, storage)
+            await item.match_queue.start()
+            await item.write_queue.start()
+            await item.profile_counters.start()
+            await item.game_catalog.start(item.session_factory, settings.catalog_refresh_interval)
+        if change_feed is not None:
+            await change_feed.start()
+        await funnel.start()
+        await avatar_pipeline.start()
+        if recorder is not None:
+            await recorder.start()
+        logger.info("Startup finished for %d bot(s): %s", len(hosted), timer.summary())
+        readiness.set_ready(True)
+
+    for item in hosted:
+        shutdown.add_step(f"matchmaking[{item.bot_id}]", item.match_queue.close)
+        shutdown.add_step(f"write_queue[{item.bot_id}]", item.write_queue.close)
+        shutdown.add_step(f"profile_stats[{item.bot_id}]", item.profile_counters.close)
+        shutdown.add_step(f"game_catalog[{item.bot_id}]", item.game_catalog.close)
+    shutdown.add_step("keyboard_edits", edit_debouncer.flush)
+    shutdown.add_step("funnel_events", funnel.close)
+    shutdown.add_step("avatars", avatar_pipeline.close)
+    if recorder is not None:
+        shutdown.add_step("update_recording", recorder.close)
+    for item in hosted:
+        shutdown.add_step(f"chat_relay[{item.bot_id}]", item.chat_relay.close)
+        shutdown.add_step(f"db_replicas[{item.bot_id}]", item.session_router.close)
+    if change_feed is not None:
+        shutdown.add_step("change_feed", change_feed.close)
+    shutdown.add_step("db_pool", engine.dispose)
+    shutdown.add_step("redis", lambda: redis.aclose(close_connection_pool=True))
+
+    async def on_shutdown() -> None:
+        # Polling has stopped; the bot session is closed by aiogram after this returns.
+        readiness.set_ready(False)
+        await shutdown.run()
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    return dp
+
+
+def watch_changes(feed: ChangeFeed, item: HostedBot) -> None:
+    """Keep the in-process caches of one hosted bot in step with writes made by any process."""
+
+    async def user_changed(event: ChangeEvent) -> None:
+        item.profile_cache.forget_local(event.key)
+        # Replicas may not have the write yet; the next read must not cache their older copy.
+        item.session_router.pin(event.key)
+
+    async def games_changed(_event: ChangeEvent) -> None:
+        await item.game_catalog.reload(item.session_factory)
+
+    async def resync() -> None:
+        item.profile_cache.set_local(True)
+        await item.game_catalog.reload(item.session_factory)
 
-    dp.include_router(common_router)
-    dp.include_router(register_router)
-    dp.include_router(profile_router)
+    async def lost() -> None:
+        item.profile_cache.set_local(False)
 
-    await dp.start_polling(bot)
+    feed.subscribe("user", user_changed, item.schema)
+    feed.subscribe("users", user_changed, item.schema)
+    # The game list is shared by all schemas and seeded through the default one.
+    feed.subscribe("games", games_changed)
+    feed.on_resync(resync)
+    feed.on_lost(lost)
 
 
 if __name__ == "__main__":
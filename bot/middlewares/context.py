@@ -4,24 +4,21 @@ from typing import Any, Callable, Dict, Awaitable
 
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
-from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
-from bot.config import Settings
+from bot.services.hosting import HostedBot
 from bot.utils.i18n import Translator
 
 
 class ContextMiddleware(BaseMiddleware):
-    """Injects common dependencies into handler data."""
+    """Injects common dependencies of the bot that received the update into handler data."""
 
     def __init__(
         self,
-        settings: Settings,
-        session_factory: async_sessionmaker[AsyncSession],
+        hosted: dict[int, HostedBot],
         translator: Translator,
     ) -> None:
         super().__init__()
-        self.settings = settings
-        self.session_factory = session_factory
+        self.hosted = hosted
         self.translator = translator
 
     async def __call__(
@@ -30,7 +27,19 @@ class ContextMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        data["settings"] = self.settings
-        data["session_factory"] = self.session_factory
+        hosted_bot = self.hosted[data["bot"].id]
+        data["hosted_bot"] = hosted_bot
+        data["settings"] = hosted_bot.settings
+        data["session_factory"] = hosted_bot.session_factory
+        data["session_router"] = hosted_bot.session_router
+        data["chat_relay"] = hosted_bot.chat_relay
+        data["match_queue"] = hosted_bot.match_queue
+        data["profile_cache"] = hosted_bot.profile_cache
+        data["write_queue"] = hosted_bot.write_queue
+        data["inline_search"] = hosted_bot.inline_search
+        data["profile_counters"] = hosted_bot.profile_counters
+        data["game_catalog"] = hosted_bot.game_catalog
+        data["avatar_index"] = hosted_bot.avatar_index
+        data["profile_editor"] = hosted_bot.profile_editor
         data["translator"] = self.translator
         return await handler(event, data)
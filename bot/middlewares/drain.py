@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.utils.shutdown import ShutdownCoordinator
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """Counts updates being handled so shutdown can wait for them."""
+
+    def __init__(self, coordinator: ShutdownCoordinator) -> None:
+        super().__init__()
+        self.coordinator = coordinator
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self.coordinator.track():
+            return await handler(event, data)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message, TelegramObject
+
+from bot.handlers.states import EditState
+
+
+class EditCancelMiddleware(BaseMiddleware):
+    """Ends a pending profile edit when a command arrives, then lets the command run as usual.
+
+    Outer, so state filters of every router already see the cleared state; /cancel itself is
+    answered by its own handler.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        state: FSMContext | None = data.get("state")
+        if (
+            isinstance(event, Message)
+            and (event.text or "").startswith("/")
+            and state is not None
+            and data.get("raw_state") in EditState.__all_states_names__
+        ):
+            await state.clear()
+            data["raw_state"] = None
+        return await handler(event, data)
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.middlewares.profiling import handler_name
+from bot.utils.logging import handler_var, update_id_var, user_id_var
+
+
+class LogContextMiddleware(BaseMiddleware):
+    """Exposes update id, user id and handler name to log records emitted while handling."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = getattr(event, "from_user", None)
+        tokens = (
+            update_id_var.set(getattr(data.get("event_update"), "update_id", None)),
+            user_id_var.set(user.id if user else None),
+            handler_var.set(handler_name(data)),
+        )
+        try:
+            return await handler(event, data)
+        finally:
+            handler_var.reset(tokens[2])
+            user_id_var.reset(tokens[1])
+            update_id_var.reset(tokens[0])
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.utils.profiling import UpdateProfiler
+
+
+def handler_name(data: Dict[str, Any]) -> str:
+    handler_object = data.get("handler")
+    callback = getattr(handler_object, "callback", None)
+    if callback is None:
+        return "unknown"
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    """Profiles a sampled fraction of handled updates."""
+
+    def __init__(self, profiler: UpdateProfiler) -> None:
+        super().__init__()
+        self.profiler = profiler
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not self.profiler.should_sample():
+            return await handler(event, data)
+        update = data.get("event_update")
+        async with self.profiler.track(handler_name(data), getattr(update, "update_id", None)):
+            return await handler(event, data)
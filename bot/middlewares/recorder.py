@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from bot.services.recorder import UpdateRecorder
+
+
+class RecorderMiddleware(BaseMiddleware):
+    """Hands every incoming update to the recorder before it is processed."""
+
+    def __init__(self, recorder: UpdateRecorder) -> None:
+        super().__init__()
+        self.recorder = recorder
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if isinstance(event, Update):
+            self.recorder.record(data["bot"].id, event)
+        return await handler(event, data)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, Protocol
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject
+
+from bot.services.hosting import HostedBot
+
+
+class Limiter(Protocol):
+    async def allow(self, user_id: int, namespace: str = "") -> bool: ...
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Drops updates from users over their rate before any DB work happens; limits are per hosted bot."""
+
+    def __init__(self, limiter: Limiter, hosted: dict[int, HostedBot]) -> None:
+        super().__init__()
+        self.limiter = limiter
+        self.hosted = hosted
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = getattr(event, "from_user", None)
+        if user is None or await self.limiter.allow(user.id, self.hosted[data["bot"].id].namespace):
+            return await handler(event, data)
+        if isinstance(event, CallbackQuery):
+            await event.answer()
+        return None
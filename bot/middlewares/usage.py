@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.services.hosting import HostedBot
+
+
+class UsageMiddleware(BaseMiddleware):
+    """Counts updates, errors and handler time per hosted bot."""
+
+    def __init__(self, hosted: dict[int, HostedBot]) -> None:
+        super().__init__()
+        self.hosted = hosted
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        usage = self.hosted[data["bot"].id].usage
+        usage.updates += 1
+        usage.in_flight += 1
+        usage.peak_in_flight = max(usage.peak_in_flight, usage.in_flight)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            usage.errors += 1
+            raise
+        finally:
+            usage.in_flight -= 1
+            usage.busy += time.perf_counter() - started
@@ -0,0 +1,264 @@
+"""Onboarding funnel events: non-blocking emit, ring buffer, batched flush and a running report."""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import logging
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import NamedTuple, Protocol
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+FUNNEL_STEPS = ("nick", "age", "language", "games", "bio", "photo")
+COLUMNS = ("ts", "bot_id", "user_id", "event", "step", "value")
+MAX_DURATION_SAMPLES = 500
+
+
+class AnalyticsEvent(NamedTuple):
+    ts: float
+    bot_id: int
+    user_id: int
+    event: str
+    step: str
+    value: int | None
+
+
+class EventSink(Protocol):
+    async def write(self, events: list[AnalyticsEvent]) -> None: ...
+
+
+class CsvFileSink:
+    """Appends events to one CSV file per UTC day with a fixed column set.
+
+    Daily append-only files with typed columns load directly into DuckDB, ClickHouse or pandas.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+
+    async def write(self, events: list[AnalyticsEvent]) -> None:
+        await asyncio.to_thread(self._write, events)
+
+    def _write(self, events: list[AnalyticsEvent]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        by_day: dict[str, list[AnalyticsEvent]] = defaultdict(list)
+        for event in events:
+            by_day[datetime.fromtimestamp(event.ts, timezone.utc).strftime("%Y-%m-%d")].append(event)
+        for day, rows in by_day.items():
+            path = self.directory / f"funnel-{day}.csv"
+            new_file = not path.exists()
+            with path.open("a", encoding="utf-8", newline="") as handle:
+                writer = csv.writer(handle)
+                if new_file:
+                    writer.writerow(COLUMNS)
+                writer.writerows(
+                    (f"{row.ts:.3f}", row.bot_id, row.user_id, row.event, row.step, "" if row.value is None else row.value)
+                    for row in rows
+                )
+
+
+class PostgresCopySink:
+    """Bulk-loads events into `funnel_events` with a single COPY per batch."""
+
+    def __init__(self, engine: AsyncEngine, table: str = "funnel_events") -> None:
+        self.engine = engine
+        self.table = table
+
+    async def write(self, events: list[AnalyticsEvent]) -> None:
+        records = [
+            (datetime.fromtimestamp(event.ts, timezone.utc), event.bot_id, event.user_id, event.event, event.step, event.value)
+            for event in events
+        ]
+        async with self.engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(self.table, records=records, columns=COLUMNS)
+
+
+@dataclass
+class StepStats:
+    step: str
+    entered: int
+    invalid: int
+    in_progress: int
+    abandoned: int
+    p50: float | None
+    p90: float | None
+
+
+@dataclass
+class FunnelReport:
+    steps: list[StepStats]
+    started: int
+    completed: int
+    cancelled: int
+    searches: int
+    empty_searches: int
+    dropped: int
+
+
+class FunnelTracker:
+    """Collects onboarding events without blocking handlers.
+
+    `emit` only appends to a bounded deque (the oldest events are dropped when it is full) and
+    updates in-memory counters; a background task writes batches to the sink. Users who stay on
+    a step longer than `abandon_after` seconds are counted as dropped out at that step.
+    """
+
+    def __init__(
+        self,
+        sink: EventSink | None = None,
+        capacity: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 5.0,
+        abandon_after: float = 86400.0,
+    ) -> None:
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.abandon_after = abandon_after
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self._buffer: deque[AnalyticsEvent] = deque(maxlen=capacity)
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._current: dict[tuple[int, int], tuple[str, float]] = {}
+        self._entered: dict[str, int] = defaultdict(int)
+        self._invalid: dict[str, int] = defaultdict(int)
+        self._abandoned: dict[str, int] = defaultdict(int)
+        self._durations: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=MAX_DURATION_SAMPLES))
+        self._completed = 0
+        self._cancelled = 0
+        self._searches = 0
+        self._empty_searches = 0
+
+    def emit(self, bot_id: int, user_id: int, event: str, step: str = "", value: int | None = None) -> None:
+        record = AnalyticsEvent(time.time(), bot_id, user_id, event, step, value)
+        if self.sink is not None:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(record)
+            if len(self._buffer) >= self.batch_size:
+                self._wake.set()
+        self._observe(record)
+
+    def enter(self, bot_id: int, user_id: int, step: str) -> None:
+        self.emit(bot_id, user_id, "enter", step)
+
+    def invalid(self, bot_id: int, user_id: int, step: str) -> None:
+        self.emit(bot_id, user_id, "invalid", step)
+
+    def search(self, bot_id: int, user_id: int, results: int) -> None:
+        self.emit(bot_id, user_id, "search", "games", results)
+
+    def complete(self, bot_id: int, user_id: int) -> None:
+        self.emit(bot_id, user_id, "complete")
+
+    def cancel(self, bot_id: int, user_id: int) -> None:
+        self.emit(bot_id, user_id, "cancel")
+
+    async def start(self) -> None:
+        if self.sink is not None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        while self._buffer and self.sink is not None:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            try:
+                await self.sink.write(batch)
+                self.written += len(batch)
+            except Exception:
+                self.failed += len(batch)
+                logger.exception("Failed to write %d funnel events", len(batch))
+                return
+
+    def report(self) -> FunnelReport:
+        self._sweep()
+        in_progress: dict[str, int] = defaultdict(int)
+        for step, _ in self._current.values():
+            in_progress[step] += 1
+        steps = []
+        for step in FUNNEL_STEPS:
+            durations = sorted(self._durations.get(step, ()))
+            steps.append(
+                StepStats(
+                    step=step,
+                    entered=self._entered[step],
+                    invalid=self._invalid[step],
+                    in_progress=in_progress[step],
+                    abandoned=self._abandoned[step],
+                    p50=_percentile(durations, 0.5),
+                    p90=_percentile(durations, 0.9),
+                )
+            )
+        return FunnelReport(
+            steps=steps,
+            started=self._entered[FUNNEL_STEPS[0]],
+            completed=self._completed,
+            cancelled=self._cancelled,
+            searches=self._searches,
+            empty_searches=self._empty_searches,
+            dropped=self.dropped,
+        )
+
+    def _sweep(self) -> None:
+        cutoff = time.time() - self.abandon_after
+        for key, (step, since) in list(self._current.items()):
+            if since <= cutoff:
+                self._abandoned[step] += 1
+                del self._current[key]
+
+    def _observe(self, record: AnalyticsEvent) -> None:
+        key = (record.bot_id, record.user_id)
+        if record.event == "invalid":
+            self._invalid[record.step] += 1
+            return
+        if record.event == "search":
+            self._searches += 1
+            if not record.value:
+                self._empty_searches += 1
+            return
+        previous = self._current.pop(key, None)
+        if previous is not None:
+            step, since = previous
+            if record.event == "cancel":
+                self._abandoned[step] += 1
+            else:
+                self._durations[step].append(record.ts - since)
+        if record.event == "enter":
+            self._entered[record.step] += 1
+            self._current[key] = (record.step, record.ts)
+        elif record.event == "complete":
+            self._completed += 1
+        elif record.event == "cancel":
+            self._cancelled += 1
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+            self._sweep()
+
+
+def _percentile(values: list[float], quantile: float) -> float | None:
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(quantile * len(values)))]
@@ -0,0 +1,325 @@
+"""Avatar pipeline: download, thumbnail and perceptual hash of profile photos, off the event loop.
+
+Jobs go to a bounded in-memory queue; a few consumer tasks download photos through a pluggable
+fetcher and hand the decoding, resizing and hashing to a process pool, so neither the event loop
+nor the GIL is held by image work. Each bot keeps its hashes in `avatar_hashes` and its
+thumbnails in Redis.
+
+Near-duplicates are found by multi-index hashing: the 64-bit hash is split into four 16-bit
+bands and, by pigeonhole, a hash within Hamming distance `d` of another matches it in at least
+one band to within `d // 4` bits. Lookups probe each indexed band with every value that close
+and check the full distance of the few candidates in Python.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Protocol
+
+from aiogram import Bot
+from redis.asyncio import Redis
+from sqlalchemy import Integer, any_, bindparam, delete, func, or_, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.db.breaker import DatabaseUnavailable
+from bot.db.models import AvatarHash, User
+from bot.db.session import session_scope
+from bot.utils.imaging import HASH_BITS, imaging_available, process_avatar
+
+logger = logging.getLogger(__name__)
+
+BANDS = 4
+BAND_BITS = HASH_BITS // BANDS
+_BAND_MASK = (1 << BAND_BITS) - 1
+_SIGN = 1 << (HASH_BITS - 1)
+
+
+class AvatarFetcher(Protocol):
+    async def fetch(self, bot: Bot, file_id: str) -> bytes: ...
+
+
+class BotApiFetcher:
+    """Downloads through the Bot API (`getFile` and the file endpoint) of the bot that received the photo."""
+
+    def __init__(self, timeout: int = 30) -> None:
+        self.timeout = timeout
+
+    async def fetch(self, bot: Bot, file_id: str) -> bytes:
+        buffer = await bot.download(file_id, timeout=self.timeout)
+        return buffer.read()  # type: ignore[union-attr]
+
+
+class DirectoryFetcher:
+    """Reads `<directory>/<file_id>` instead of calling Telegram; a local stand-in for tests and replays."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+
+    async def fetch(self, bot: Bot, file_id: str) -> bytes:
+        return await asyncio.to_thread((self.directory / file_id).read_bytes)
+
+
+@dataclass
+class AvatarMatch:
+    profile_id: int
+    other_id: int
+    distance: int
+
+
+@dataclass
+class AvatarReport:
+    depth: int
+    capacity: int
+    in_progress: int
+    processed: int
+    failed: int
+    dropped: int
+    duplicates: int
+    wait_p50: float | None
+    wait_p95: float | None
+    work_p50: float | None
+    work_p95: float | None
+
+
+def hamming(left: int, right: int) -> int:
+    return ((left ^ right) & ((1 << HASH_BITS) - 1)).bit_count()
+
+
+def bands(value: int) -> list[int]:
+    value &= (1 << HASH_BITS) - 1
+    return [(value >> (BAND_BITS * index)) & _BAND_MASK for index in range(BANDS)]
+
+
+def band_probes(band: int, radius: int) -> list[int]:
+    """Every band value within `radius` bits of `band`, `band` itself first."""
+    probes = [band]
+    for flips in range(1, radius + 1):
+        for bits in itertools.combinations(range(BAND_BITS), flips):
+            value = band
+            for bit in bits:
+                value ^= 1 << bit
+            probes.append(value)
+    return probes
+
+
+def _signed(value: int) -> int:
+    return value - (1 << HASH_BITS) if value & _SIGN else value
+
+
+class AvatarIndex:
+    """Per-bot hash index and thumbnail cache."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        max_distance: int = 6,
+        thumbnail_ttl: int = 7 * 86400,
+        namespace: str = "",
+    ) -> None:
+        self.session_factory = session_factory
+        self.redis = redis
+        self.max_distance = max_distance
+        self.thumbnail_ttl = thumbnail_ttl
+        self.namespace = namespace
+        self.recent: deque[AvatarMatch] = deque(maxlen=50)
+
+    async def store(self, profile_id: int, phash: int, thumbnail: bytes) -> list[AvatarMatch]:
+        """Index the profile's hash and cache its thumbnail; returns other profiles with a near-identical avatar."""
+        values = {"phash": _signed(phash), **{f"band{index}": band for index, band in enumerate(bands(phash))}}
+        async with session_scope(self.session_factory) as session:
+            matches = await self.near(session, phash, exclude=profile_id)
+            stmt = insert(AvatarHash).values(profile_id=profile_id, **values)
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[AvatarHash.profile_id], set_={**values, "updated_at": func.now()}
+                )
+            )
+        await self.redis.set(self._thumbnail_key(profile_id), thumbnail, ex=self.thumbnail_ttl)
+        found = [AvatarMatch(profile_id, other_id, distance) for other_id, distance in matches]
+        self.recent.extend(found)
+        return found
+
+    async def near(self, session: AsyncSession, phash: int, exclude: int | None = None) -> list[tuple[int, int]]:
+        """(profile id, distance) of live profiles within `max_distance` of `phash`, closest first."""
+        radius = self.max_distance // BANDS
+        conditions = [
+            getattr(AvatarHash, f"band{index}")
+            == any_(bindparam(f"probes{index}", band_probes(band, radius), type_=ARRAY(Integer)))
+            for index, band in enumerate(bands(phash))
+        ]
+        stmt = (
+            select(AvatarHash.profile_id, AvatarHash.phash)
+            .join(User, User.id == AvatarHash.profile_id)
+            .where(or_(*conditions), User.is_deleted.is_(False))
+        )
+        if exclude is not None:
+            stmt = stmt.where(AvatarHash.profile_id != exclude)
+        matches = []
+        for row in await session.execute(stmt):
+            distance = hamming(row.phash, phash)
+            if distance <= self.max_distance:
+                matches.append((row.profile_id, distance))
+        return sorted(matches, key=lambda item: item[1])
+
+    async def forget(self, profile_id: int) -> None:
+        async with session_scope(self.session_factory) as session:
+            await session.execute(delete(AvatarHash).where(AvatarHash.profile_id == profile_id))
+        await self.redis.delete(self._thumbnail_key(profile_id))
+
+    async def thumbnail(self, profile_id: int) -> bytes | None:
+        return await self.redis.get(self._thumbnail_key(profile_id))
+
+    def _thumbnail_key(self, profile_id: int) -> str:
+        return f"{self.namespace}avatar:thumb:{profile_id}"
+
+
+@dataclass
+class _Job:
+    index: AvatarIndex
+    bot: Bot
+    profile_id: int
+    file_id: str
+    enqueued: float
+
+
+class AvatarPipeline:
+    """Process-wide queue and worker pool shared by all hosted bots."""
+
+    def __init__(
+        self,
+        fetcher: AvatarFetcher,
+        workers: int = 2,
+        capacity: int = 1000,
+        thumbnail_size: int = 160,
+        drain_timeout: float = 10.0,
+    ) -> None:
+        self.fetcher = fetcher
+        self.workers = workers
+        self.thumbnail_size = thumbnail_size
+        self.drain_timeout = drain_timeout
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.in_progress = 0
+        self.duplicates = 0
+        self._queue: asyncio.Queue[_Job] = asyncio.Queue(maxsize=capacity)
+        self._waits: deque[float] = deque(maxlen=1000)
+        self._work: deque[float] = deque(maxlen=1000)
+        self._pool: ProcessPoolExecutor | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self._pool is not None
+
+    def submit(self, index: AvatarIndex, bot: Bot, profile_id: int, file_id: str) -> bool:
+        """Queue a photo for processing without waiting; False when disabled or the queue is full."""
+        if not self.enabled:
+            return False
+        try:
+            self._queue.put_nowait(_Job(index, bot, profile_id, file_id, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    async def start(self) -> None:
+        if self.workers <= 0:
+            return
+        if not imaging_available():
+            logger.warning("Pillow is not installed, avatar processing is disabled")
+            return
+        self._pool = self._new_pool()
+        # Twice the pool size, so downloads of the next photos overlap hashing of the current ones.
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.workers * 2)]
+
+    async def close(self) -> None:
+        if self._pool is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Dropping %d queued avatars on shutdown", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # forkserver: forking the running bot (with its executor threads) could copy a held lock.
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("forkserver"))
+
+    def report(self) -> AvatarReport:
+        waits, work = sorted(self._waits), sorted(self._work)
+        return AvatarReport(
+            depth=self._queue.qsize(),
+            capacity=self._queue.maxsize,
+            in_progress=self.in_progress,
+            processed=self.processed,
+            failed=self.failed,
+            dropped=self.dropped,
+            duplicates=self.duplicates,
+            wait_p50=_percentile(waits, 0.5),
+            wait_p95=_percentile(waits, 0.95),
+            work_p50=_percentile(work, 0.5),
+            work_p95=_percentile(work, 0.95),
+        )
+
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            started = time.perf_counter()
+            self._waits.append(started - job.enqueued)
+            self.in_progress += 1
+            pool = self._pool
+            try:
+                data = await self.fetcher.fetch(job.bot, job.file_id)
+                phash, thumbnail = await loop.run_in_executor(pool, process_avatar, data, self.thumbnail_size)
+                matches = await job.index.store(job.profile_id, phash, thumbnail)
+            except IntegrityError:
+                logger.debug("Profile %s was deleted before its avatar was indexed", job.profile_id)
+            except DatabaseUnavailable:
+                self.failed += 1
+                logger.warning("Database unavailable, avatar of %s was not indexed", job.profile_id)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); every pending future of that pool failed with it.
+                self.failed += 1
+                if self._pool is pool and pool is not None:
+                    logger.error("Avatar worker pool broke, restarting it")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = self._new_pool()
+            except Exception:
+                self.failed += 1
+                logger.exception("Avatar processing failed for %s", job.profile_id)
+            else:
+                self.processed += 1
+                self._work.append(time.perf_counter() - started)
+                self.duplicates += len(matches)
+                for match in matches:
+                    logger.info(
+                        "Avatar of %s matches %s (distance %d)", match.profile_id, match.other_id, match.distance
+                    )
+            finally:
+                self.in_progress -= 1
+                self._queue.task_done()
+
+
+def _percentile(values: list[float], quantile: float) -> float | None:
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(quantile * len(values)))]
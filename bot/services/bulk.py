@@ -0,0 +1,259 @@
+"""Streaming export and COPY-based import of profiles with their games.
+
+Works on a plain asyncpg connection: export reads through a server-side cursor (JSONL) or
+`COPY ... TO STDOUT` (CSV), import loads a temporary staging table with COPY and merges it
+into `users`/`user_games` in one statement. Memory use does not grow with the table size.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from bot.services.changes import CHANNEL
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    "id",
+    "username",
+    "roblox_nick",
+    "age",
+    "languages",
+    "description",
+    "photo_id",
+    "created_at",
+    "last_active",
+    "games",
+)
+
+# Games are exported by alias: ids differ between databases, aliases do not.
+_EXPORT_QUERY = """
+SELECT u.id, u.username, u.roblox_nick, u.age, u.languages, u.description, u.photo_id,
+       u.created_at, u.last_active,
+       ARRAY(
+           SELECT g.alias FROM user_games ug JOIN games g ON g.id = ug.game_id
+           WHERE ug.user_id = u.id ORDER BY g.alias
+       ) AS games
+FROM users u
+WHERE NOT u.is_deleted
+ORDER BY u.id
+"""
+
+_STAGING_DDL = """
+CREATE TEMP TABLE profiles_staging (
+    id bigint NOT NULL,
+    username text,
+    roblox_nick text NOT NULL,
+    age integer NOT NULL,
+    languages text[] NOT NULL DEFAULT '{}',
+    description text,
+    photo_id text,
+    created_at timestamptz,
+    last_active timestamptz,
+    games text[] NOT NULL DEFAULT '{}'
+) ON COMMIT DROP
+"""
+
+# The last row wins for duplicate ids; rows whose nickname belongs to another user (in the
+# table or earlier in the file) are skipped. Stale game links are deleted and new ones
+# inserted, so no row is touched twice.
+_MERGE = """
+WITH latest AS (
+    SELECT DISTINCT ON (s.id) s.*
+    FROM profiles_staging s
+    ORDER BY s.id, s.ctid DESC
+),
+source AS (
+    SELECT DISTINCT ON (l.roblox_nick) l.*
+    FROM latest l
+    WHERE NOT EXISTS (
+        SELECT 1 FROM users u WHERE u.roblox_nick = l.roblox_nick AND u.id <> l.id
+    )
+    ORDER BY l.roblox_nick, l.id
+),
+upserted AS (
+    INSERT INTO users (
+        id, username, roblox_nick, age, languages, description, photo_id, is_deleted, created_at, last_active
+    )
+    SELECT id, username, roblox_nick, age, languages, description, photo_id, false,
+           coalesce(created_at, now()), coalesce(last_active, now())
+    FROM source
+    ON CONFLICT (id) DO UPDATE SET
+        username = EXCLUDED.username,
+        roblox_nick = EXCLUDED.roblox_nick,
+        age = EXCLUDED.age,
+        languages = EXCLUDED.languages,
+        description = EXCLUDED.description,
+        photo_id = EXCLUDED.photo_id,
+        is_deleted = false,
+        last_active = greatest(users.last_active, EXCLUDED.last_active)
+    RETURNING id
+),
+links AS (
+    SELECT s.id AS user_id, g.id AS game_id
+    FROM source s
+    CROSS JOIN LATERAL unnest(s.games) AS a(alias)
+    JOIN games g ON g.alias = a.alias
+),
+removed AS (
+    DELETE FROM user_games ug
+    USING source s
+    WHERE ug.user_id = s.id
+      AND NOT EXISTS (SELECT 1 FROM links l WHERE l.user_id = ug.user_id AND l.game_id = ug.game_id)
+    RETURNING 1
+),
+linked AS (
+    INSERT INTO user_games (user_id, game_id)
+    SELECT l.user_id, l.game_id FROM links l JOIN upserted u ON u.id = l.user_id
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+)
+SELECT (SELECT count(*) FROM profiles_staging) AS staged,
+       (SELECT count(*) FROM upserted) AS merged,
+       (SELECT count(*) FROM linked) AS linked,
+       (SELECT count(*) FROM removed) AS unlinked
+"""
+
+
+@dataclass
+class BulkStats:
+    rows: int
+    seconds: float
+    skipped: int = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        text = f"{self.rows} rows in {self.seconds:.1f}s ({self.rows_per_second:,.0f} rows/s)"
+        return f"{text}, {self.skipped} skipped" if self.skipped else text
+
+
+def asyncpg_dsn(database_url: str) -> str:
+    """SQLAlchemy URL (`postgresql+asyncpg://...`) to a DSN asyncpg understands."""
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+async def connect(database_url: str, schema: str | None = None) -> asyncpg.Connection:
+    server_settings = {"search_path": f'"{schema}", public'} if schema else None
+    return await asyncpg.connect(asyncpg_dsn(database_url), server_settings=server_settings)
+
+
+def detect_format(path: Path, explicit: str | None = None) -> str:
+    fmt = explicit or path.suffix.lstrip(".").lower()
+    if fmt not in ("jsonl", "csv"):
+        raise ValueError(f"Unsupported format {fmt!r}: use jsonl or csv")
+    return fmt
+
+
+async def export_profiles(
+    conn: asyncpg.Connection,
+    path: Path,
+    fmt: str = "jsonl",
+    batch_size: int = 5000,
+    progress_every: int = 100_000,
+) -> BulkStats:
+    started = time.perf_counter()
+    if fmt == "csv":
+        result = await conn.copy_from_query(_EXPORT_QUERY, output=str(path), format="csv", header=True)
+        rows = int(result.split()[-1])
+        return BulkStats(rows, time.perf_counter() - started)
+
+    rows = 0
+    with path.open("w", encoding="utf-8") as handle:
+        async with conn.transaction(readonly=True):
+            async for record in conn.cursor(_EXPORT_QUERY, prefetch=batch_size):
+                handle.write(json.dumps(_json_row(record), ensure_ascii=False))
+                handle.write("\n")
+                rows += 1
+                if progress_every and rows % progress_every == 0:
+                    _log_progress("Exported", rows, started)
+    return BulkStats(rows, time.perf_counter() - started)
+
+
+async def import_profiles(
+    conn: asyncpg.Connection,
+    path: Path,
+    fmt: str = "jsonl",
+    batch_size: int = 10_000,
+    progress_every: int = 100_000,
+) -> BulkStats:
+    started = time.perf_counter()
+    async with conn.transaction():
+        await conn.execute(_STAGING_DDL)
+        if fmt == "csv":
+            await conn.copy_to_table(
+                "profiles_staging", source=str(path), columns=COLUMNS, format="csv", header=True
+            )
+        else:
+            staged = 0
+            for batch in _jsonl_batches(path, batch_size):
+                await conn.copy_records_to_table("profiles_staging", records=batch, columns=COLUMNS)
+                staged += len(batch)
+                if progress_every and staged % progress_every < len(batch):
+                    _log_progress("Staged", staged, started)
+        await conn.execute("ANALYZE profiles_staging")
+        result = await conn.fetchrow(_MERGE)
+        if result["merged"]:
+            # Too many rows for one event per profile: replicas drop every cached profile of the schema.
+            await conn.execute("SELECT pg_notify($1, 'users:' || current_schema() || ':')", CHANNEL)
+    stats = BulkStats(result["merged"], time.perf_counter() - started, skipped=result["staged"] - result["merged"])
+    logger.info(
+        "Merged %d profiles (%d game links added, %d removed)", result["merged"], result["linked"], result["unlinked"]
+    )
+    return stats
+
+
+def _jsonl_batches(path: Path, batch_size: int) -> Iterator[list[tuple[Any, ...]]]:
+    batch: list[tuple[Any, ...]] = []
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            batch.append(
+                (
+                    int(item["id"]),
+                    item.get("username"),
+                    item["roblox_nick"],
+                    int(item["age"]),
+                    list(item.get("languages") or []),
+                    item.get("description"),
+                    item.get("photo_id"),
+                    _timestamp(item.get("created_at")),
+                    _timestamp(item.get("last_active")),
+                    list(item.get("games") or []),
+                )
+            )
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def _timestamp(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _json_row(record: asyncpg.Record) -> dict[str, Any]:
+    row = dict(record)
+    for key, value in row.items():
+        if isinstance(value, datetime):
+            row[key] = value.isoformat()
+    return row
+
+
+def _log_progress(action: str, rows: int, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    logger.info("%s %d rows (%.0f rows/s)", action, rows, rows / elapsed if elapsed else 0.0)
@@ -0,0 +1,158 @@
+"""Change feed over Postgres LISTEN/NOTIFY for in-process caches.
+
+Writers call `record_change` inside their transaction; Postgres delivers the notification on
+commit only, so a rolled back write invalidates nothing. Payloads are `kind:schema:key`, where
+the schema is the writer's `current_schema()` (it tells hosted bots apart) and the key is empty
+when the whole kind changed.
+
+Every process keeps one dedicated listener connection (`ChangeFeed`) and fans each event out to
+the handlers subscribed to its kind and schema. Notifications sent while the listener is
+disconnected are lost, so on every reconnect the resync handlers run (caches drop everything),
+and while disconnected the lost handlers tell caches not to trust what they hold.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "bot_changes"
+
+
+@dataclass
+class ChangeEvent:
+    kind: str
+    # None for the default schema (the primary bot and shared tables)
+    schema: str | None
+    key: int | None
+
+
+ChangeHandler = Callable[[ChangeEvent], Awaitable[None]]
+FeedHandler = Callable[[], Awaitable[None]]
+
+
+async def record_change(session: AsyncSession, kind: str, key: int | None = None) -> None:
+    """Queue a change notification that is sent when the session's transaction commits."""
+    payload = func.concat(kind, ":", func.current_schema(), ":", "" if key is None else str(key))
+    await session.execute(select(func.pg_notify(CHANNEL, payload)))
+
+
+def parse_event(payload: str, default_schema: str) -> ChangeEvent:
+    kind, schema, key = payload.split(":", 2)
+    return ChangeEvent(kind, None if schema == default_schema else schema, int(key) if key else None)
+
+
+class ChangeFeed:
+    """One LISTEN connection per process; `dsn` is a plain asyncpg DSN (see `bulk.asyncpg_dsn`)."""
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str = CHANNEL,
+        keepalive: float = 30.0,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self.dsn = dsn
+        self.channel = channel
+        self.keepalive = keepalive
+        self.max_backoff = max_backoff
+        self.received = 0
+        self.resyncs = 0
+        self.connected = False
+        self.default_schema = "public"
+        self._handlers: dict[tuple[str, str | None], list[ChangeHandler]] = defaultdict(list)
+        self._resync_handlers: list[FeedHandler] = []
+        self._lost_handlers: list[FeedHandler] = []
+        self._pending: set[asyncio.Task[None]] = set()
+        self._task: asyncio.Task[None] | None = None
+
+    def subscribe(self, kind: str, handler: ChangeHandler, schema: str | None = None) -> None:
+        self._handlers[(kind, schema)].append(handler)
+
+    def on_resync(self, handler: FeedHandler) -> None:
+        """Run after every (re)connect: whatever changed while not listening is unknown."""
+        self._resync_handlers.append(handler)
+
+    def on_lost(self, handler: FeedHandler) -> None:
+        self._lost_handlers.append(handler)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                conn = await asyncpg.connect(self.dsn)
+            except (OSError, asyncpg.PostgresError, asyncio.TimeoutError) as exc:
+                logger.warning("Change feed cannot connect (%s), retrying in %.0fs", exc, backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            backoff = 1.0
+            try:
+                await self._listen(conn)
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError, asyncio.TimeoutError) as exc:
+                logger.warning("Change feed connection lost (%s)", exc)
+            finally:
+                if self.connected:
+                    self.connected = False
+                    await self._call(self._lost_handlers)
+                if not conn.is_closed():
+                    conn.terminate()
+
+    async def _listen(self, conn: asyncpg.Connection) -> None:
+        lost = asyncio.Event()
+        conn.add_termination_listener(lambda _conn: lost.set())
+        self.default_schema = await conn.fetchval("SELECT current_schema()")
+        await conn.add_listener(self.channel, self._on_notify)
+        self.connected = True
+        self.resyncs += 1
+        logger.info("Change feed listening on %r", self.channel)
+        await self._call(self._resync_handlers)
+        while not lost.is_set():
+            try:
+                await asyncio.wait_for(lost.wait(), timeout=self.keepalive)
+            except asyncio.TimeoutError:
+                # A half-open TCP connection never reports termination; a ping does.
+                await asyncio.wait_for(conn.fetchval("SELECT 1"), timeout=self.keepalive)
+
+    def _on_notify(self, _conn: asyncpg.Connection, _pid: int, _channel: str, payload: str) -> None:
+        try:
+            event = parse_event(payload, self.default_schema)
+        except ValueError:
+            logger.warning("Ignoring malformed change event %r", payload)
+            return
+        self.received += 1
+        for handler in self._handlers.get((event.kind, event.schema), ()):
+            task = asyncio.create_task(handler(event))
+            self._pending.add(task)
+            task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task[None]) -> None:
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Change handler failed", exc_info=task.exception())
+
+    async def _call(self, handlers: list[FeedHandler]) -> None:
+        for handler in handlers:
+            try:
+                await handler()
+            except Exception:
+                logger.exception("Change feed handler failed")
@@ -0,0 +1,286 @@
+"""Anonymous chat relay between matched players."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from redis.asyncio import Redis
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.db.models import ChatSession
+from bot.db.session import session_scope
+from bot.handlers.states import ChatState
+from bot.utils.i18n import Translator
+
+logger = logging.getLogger(__name__)
+
+MAX_BUFFERED_SESSIONS = 10_000
+
+
+@dataclass
+class ChatPair:
+    user_a: int
+    user_b: int
+    locales: dict[int, str]
+    started_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    last_activity: float = field(default_factory=time.monotonic)
+    messages: int = 0
+
+    def partner(self, user_id: int) -> int:
+        return self.user_b if user_id == self.user_a else self.user_a
+
+
+class ChatRelay:
+    """Keeps pairs owned by this process in memory and routes the rest through Redis pub/sub.
+
+    A pair is owned by the process that opened it; other processes publish forwards and
+    stop requests to the owner's channel. If nobody listens there, the pair is adopted.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        session_factory: async_sessionmaker[AsyncSession],
+        translator: Translator,
+        idle_timeout: float = 600.0,
+        flush_interval: float = 10.0,
+        node_id: str | None = None,
+        namespace: str = "",
+    ) -> None:
+        self.redis = redis
+        self.session_factory = session_factory
+        self.translator = translator
+        self.idle_timeout = idle_timeout
+        self.flush_interval = flush_interval
+        self.node_id = node_id or uuid.uuid4().hex[:12]
+        self.namespace = namespace
+        self.forwarded = 0
+        self.forwarded_remote = 0
+        self._pairs: dict[int, ChatPair] = {}
+        self._buffer: list[dict[str, Any]] = []
+        self._bot: Bot | None = None
+        self._storage: BaseStorage | None = None
+        self._pubsub: Any = None
+        self._tasks: list[asyncio.Task[None]] = []
+
+    @property
+    def active_pairs(self) -> int:
+        return len(self._pairs) // 2
+
+    async def start(self, bot: Bot, storage: BaseStorage) -> None:
+        self._bot = bot
+        self._storage = storage
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(self._channel(self.node_id))
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._maintain()),
+        ]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pubsub is not None:
+            await self._pubsub.reset()
+            self._pubsub = None
+        await self.flush()
+
+    async def open_pair(self, user_a: int, user_b: int, locales: dict[int, str]) -> ChatPair | None:
+        """Pair two searching users; None, with nothing changed, if either has left the search since."""
+        for user_id in (user_a, user_b):
+            if not await self.searching(user_id):
+                return None
+        pair = ChatPair(user_a=user_a, user_b=user_b, locales=locales)
+        self._pairs[user_a] = self._pairs[user_b] = pair
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for user_id in (user_a, user_b):
+                key = self._pair_key(user_id)
+                pipe.hset(
+                    key,
+                    mapping={
+                        "partner": pair.partner(user_id),
+                        "node": self.node_id,
+                        "locale": locales[user_id],
+                        "started": pair.started_at.timestamp(),
+                    },
+                )
+                pipe.expire(key, int(self.idle_timeout * 2))
+            await pipe.execute()
+        for user_id in (user_a, user_b):
+            await self.state(user_id).set_state(ChatState.active)
+            await self.notify(user_id, "chat_matched", locales[user_id])
+        return pair
+
+    async def relay(self, user_id: int, chat_id: int, message_id: int) -> bool:
+        """Forward a message to the partner; False if the user has no active chat."""
+        pair = self._pairs.get(user_id)
+        if pair is None:
+            node = _text(await self.redis.hget(self._pair_key(user_id), "node"))
+            if node is None:
+                return False
+            payload = {"op": "forward", "user": user_id, "chat": chat_id, "message": message_id}
+            if node != self.node_id and await self.redis.publish(self._channel(node), json.dumps(payload)):
+                self.forwarded_remote += 1
+                return True
+            pair = await self._adopt(user_id)
+            if pair is None:
+                return False
+        await self._deliver(pair, user_id, chat_id, message_id)
+        return True
+
+    async def end(self, user_id: int, reason: str = "stopped") -> bool:
+        pair = self._pairs.get(user_id)
+        if pair is None:
+            node = _text(await self.redis.hget(self._pair_key(user_id), "node"))
+            if node is None:
+                return False
+            payload = {"op": "end", "user": user_id, "reason": reason}
+            if node != self.node_id and await self.redis.publish(self._channel(node), json.dumps(payload)):
+                return True
+            pair = await self._adopt(user_id)
+            if pair is None:
+                return False
+        await self._close_pair(pair, user_id, reason)
+        return True
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        try:
+            async with session_scope(self.session_factory) as session:
+                await session.execute(insert(ChatSession), rows)
+        except Exception:
+            logger.exception("Failed to persist %d chat sessions", len(rows))
+            self._buffer = (rows + self._buffer)[-MAX_BUFFERED_SESSIONS:]
+
+    async def _deliver(self, pair: ChatPair, user_id: int, chat_id: int, message_id: int) -> None:
+        pair.last_activity = time.monotonic()
+        pair.messages += 1
+        try:
+            await self._bot.copy_message(  # type: ignore[union-attr]
+                chat_id=pair.partner(user_id),
+                from_chat_id=chat_id,
+                message_id=message_id,
+            )
+            self.forwarded += 1
+        except TelegramForbiddenError:
+            await self._close_pair(pair, pair.partner(user_id), "blocked")
+
+    async def _close_pair(self, pair: ChatPair, initiator: int, reason: str) -> None:
+        if self._pairs.get(pair.user_a) is not pair:
+            return
+        self._pairs.pop(pair.user_a, None)
+        self._pairs.pop(pair.user_b, None)
+        await self.redis.delete(self._pair_key(pair.user_a), self._pair_key(pair.user_b))
+        self._buffer.append(
+            {
+                "user_a": pair.user_a,
+                "user_b": pair.user_b,
+                "started_at": pair.started_at,
+                "ended_at": datetime.now(timezone.utc),
+                "messages": pair.messages,
+                "end_reason": reason,
+            }
+        )
+        for user_id in (pair.user_a, pair.user_b):
+            await self.state(user_id).clear()
+            if reason == "idle":
+                key = "chat_idle_ended"
+            elif user_id == initiator:
+                key = "chat_ended"
+            else:
+                key = "chat_partner_left"
+            await self.notify(user_id, key, pair.locales.get(user_id))
+
+    async def _adopt(self, user_id: int) -> ChatPair | None:
+        own = await self.redis.hgetall(self._pair_key(user_id))
+        if not own:
+            return None
+        partner_id = int(_text(own.get(b"partner")) or 0)
+        other = await self.redis.hgetall(self._pair_key(partner_id))
+        if not partner_id or not other:
+            await self.redis.delete(self._pair_key(user_id))
+            return None
+        pair = ChatPair(
+            user_a=user_id,
+            user_b=partner_id,
+            locales={user_id: _text(own.get(b"locale")) or "", partner_id: _text(other.get(b"locale")) or ""},
+            started_at=datetime.fromtimestamp(float(_text(own.get(b"started")) or time.time()), timezone.utc),
+        )
+        self._pairs[user_id] = self._pairs[partner_id] = pair
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._pair_key(user_id), "node", self.node_id)
+            pipe.hset(self._pair_key(partner_id), "node", self.node_id)
+            await pipe.execute()
+        logger.info("Adopted chat pair %s/%s on node %s", user_id, partner_id, self.node_id)
+        return pair
+
+    async def _listen(self) -> None:
+        async for message in self._pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            try:
+                payload = json.loads(message["data"])
+                if payload["op"] == "forward":
+                    await self.relay(payload["user"], payload["chat"], payload["message"])
+                elif payload["op"] == "end":
+                    await self.end(payload["user"], payload.get("reason", "stopped"))
+            except Exception:
+                logger.exception("Failed to handle relayed chat event")
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                now = time.monotonic()
+                pairs = {id(pair): pair for pair in self._pairs.values()}.values()
+                for pair in [pair for pair in pairs if now - pair.last_activity >= self.idle_timeout]:
+                    await self._close_pair(pair, pair.user_a, "idle")
+                if self._pairs:
+                    async with self.redis.pipeline(transaction=False) as pipe:
+                        for user_id in self._pairs:
+                            pipe.expire(self._pair_key(user_id), int(self.idle_timeout * 2))
+                        await pipe.execute()
+                await self.flush()
+            except Exception:
+                logger.exception("Chat relay maintenance failed")
+
+    async def notify(self, user_id: int, key: str, locale: str | None) -> None:
+        try:
+            await self._bot.send_message(user_id, self.translator.t(key, locale))  # type: ignore[union-attr]
+        except TelegramAPIError:
+            logger.debug("Could not notify %s about %s", user_id, key)
+
+    async def searching(self, user_id: int) -> bool:
+        return await self.state(user_id).get_state() == ChatState.searching.state
+
+    def state(self, user_id: int) -> FSMContext:
+        key = StorageKey(bot_id=self._bot.id, chat_id=user_id, user_id=user_id)  # type: ignore[union-attr]
+        return FSMContext(storage=self._storage, key=key)  # type: ignore[arg-type]
+
+    def _pair_key(self, user_id: int) -> str:
+        return f"{self.namespace}chat:pair:{user_id}"
+
+    def _channel(self, node_id: str) -> str:
+        return f"{self.namespace}chat:relay:{node_id}"
+
+
+def _text(value: bytes | str | None) -> str | None:
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value
@@ -0,0 +1,255 @@
+"""Profile view and like counters buffered in Redis and drained into `profile_stats`.
+
+Increments are HINCRBY on one pending hash (`{profile_id}:views`, `{profile_id}:likes`) and
+PFADD on a per-profile HyperLogLog of viewers, so a view never touches Postgres. A periodic
+drain renames the pending hash away, applies it with one bulk upsert and then publishes the new
+totals to a Redis hash that reads add pending deltas to. Everything in flight lives in Redis,
+so a restarted process loses nothing; each batch is recorded in `counter_batches` in the same
+transaction, so a drain retried after a crash is not applied twice.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Iterable
+
+from redis.asyncio import Redis
+from sqlalchemy import BigInteger, Integer, any_, bindparam, delete, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.db.breaker import DatabaseUnavailable
+from bot.db.models import CounterBatch, ProfileStats, User
+from bot.db.session import session_scope
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("views", "likes")
+
+# Moves the pending hash aside under a new batch id unless an earlier batch is still draining.
+_CLAIM_LUA = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return false
+    end
+    redis.call('RENAME', KEYS[1], KEYS[2])
+    redis.call('SET', KEYS[3], ARGV[1])
+end
+return redis.call('GET', KEYS[3])
+"""
+
+# Releases the drain lock only if it still holds this drain's token (it may have expired and
+# been taken by another node meanwhile).
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass
+class ProfileStatsView:
+    views: int = 0
+    likes: int = 0
+    unique_viewers: int = 0
+
+
+class ProfileCounters:
+    def __init__(
+        self,
+        redis: Redis,
+        session_factory: async_sessionmaker[AsyncSession],
+        interval: float = 30.0,
+        like_ttl: int = 30 * 86400,
+        namespace: str = "",
+    ) -> None:
+        self.redis = redis
+        self.session_factory = session_factory
+        self.interval = interval
+        self.like_ttl = like_ttl
+        self.namespace = namespace
+        self.drained = 0
+        self._pending_key = f"{namespace}stats:pending"
+        self._draining_key = f"{namespace}stats:draining"
+        self._batch_key = f"{namespace}stats:draining:id"
+        self._totals_key = f"{namespace}stats:totals"
+        self._lock_key = f"{namespace}stats:drain-lock"
+        self._claim = redis.register_script(_CLAIM_LUA)
+        self._release = redis.register_script(_RELEASE_LUA)
+        self._task: asyncio.Task[None] | None = None
+
+    async def record_views(self, profile_ids: Iterable[int], viewer_id: int) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for profile_id in profile_ids:
+            if profile_id == viewer_id:
+                continue
+            pipe.hincrby(self._pending_key, f"{profile_id}:views", 1)
+            pipe.pfadd(self._viewers_key(profile_id), viewer_id)
+        if pipe.command_stack:
+            await pipe.execute()
+
+    async def record_like(self, profile_id: int, liker_id: int) -> bool:
+        """Count a like once per liker (within `like_ttl`); False when already counted."""
+        if profile_id == liker_id:
+            return False
+        marker = f"{self.namespace}stats:liked:{profile_id}:{liker_id}"
+        if not await self.redis.set(marker, 1, nx=True, ex=self.like_ttl):
+            return False
+        await self.redis.hincrby(self._pending_key, f"{profile_id}:likes", 1)
+        return True
+
+    async def get(self, profile_id: int) -> ProfileStatsView:
+        """Stored totals plus the not yet drained delta, from Redis only (Postgres on a cold cache)."""
+        fields = [f"{profile_id}:{name}" for name in FIELDS]
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hmget(self._totals_key, fields)
+        pipe.hmget(self._draining_key, fields)
+        pipe.hmget(self._pending_key, fields)
+        pipe.pfcount(self._viewers_key(profile_id))
+        totals, draining, pending, unique_viewers = await pipe.execute()
+        if totals[0] is None and totals[1] is None:
+            totals = await self._load_totals(profile_id)
+        counts = [sum(int(part[index] or 0) for part in (totals, draining, pending)) for index in range(len(FIELDS))]
+        return ProfileStatsView(views=counts[0], likes=counts[1], unique_viewers=int(unique_viewers))
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.drain()
+        except DatabaseUnavailable:
+            logger.warning("Database unavailable, profile counters stay in Redis until the next start")
+
+    async def drain(self) -> int:
+        """Apply pending increments to `profile_stats`; returns the number of profiles updated."""
+        token = uuid.uuid4().hex
+        if not await self.redis.set(self._lock_key, token, nx=True, ex=max(int(self.interval * 3), 30)):
+            return 0
+        try:
+            batch_id = await self._claim(
+                keys=[self._pending_key, self._draining_key, self._batch_key], args=[uuid.uuid4().hex]
+            )
+            if batch_id is None:
+                return 0
+            raw = await self.redis.hgetall(self._draining_key)
+            deltas: dict[int, dict[str, int]] = {}
+            for field, value in raw.items():
+                profile_id, name = _text(field).split(":", 1)
+                deltas.setdefault(int(profile_id), dict.fromkeys(FIELDS, 0))[name] = int(value)
+            viewed = [profile_id for profile_id, delta in deltas.items() if delta["views"]]
+            unique = {}
+            if viewed:
+                pipe = self.redis.pipeline(transaction=False)
+                for profile_id in viewed:
+                    pipe.pfcount(self._viewers_key(profile_id))
+                unique = dict(zip(viewed, await pipe.execute()))
+
+            async with session_scope(self.session_factory) as session:
+                await self._apply(session, _text(batch_id), deltas, unique)
+                result = await session.execute(
+                    select(ProfileStats.profile_id, ProfileStats.views, ProfileStats.likes).where(
+                        ProfileStats.profile_id == any_(bindparam("ids", list(deltas), type_=ARRAY(BigInteger)))
+                    )
+                )
+                totals = {f"{row.profile_id}:{name}": getattr(row, name) for row in result for name in FIELDS}
+
+            pipe = self.redis.pipeline(transaction=True)
+            if totals:
+                pipe.hset(self._totals_key, mapping=totals)
+            pipe.delete(self._draining_key, self._batch_key)
+            await pipe.execute()
+            self.drained += len(deltas)
+            return len(deltas)
+        finally:
+            await self._release(keys=[self._lock_key], args=[token])
+
+    async def _apply(
+        self,
+        session: AsyncSession,
+        batch_id: str,
+        deltas: dict[int, dict[str, int]],
+        unique: dict[int, int],
+    ) -> None:
+        claimed = await session.execute(
+            insert(CounterBatch).values(id=batch_id).on_conflict_do_nothing().returning(CounterBatch.id)
+        )
+        if claimed.scalar_one_or_none() is None:
+            logger.info("Counter batch %s was already applied", batch_id)
+            return
+        await session.execute(
+            delete(CounterBatch).where(CounterBatch.drained_at < func.now() - text("interval '1 day'"))
+        )
+        ids = list(deltas)
+        # unnest() of one array per column keeps the statement at four parameters for any batch size.
+        source = (
+            func.unnest(
+                bindparam("delta_ids", ids, type_=ARRAY(BigInteger)),
+                bindparam("delta_views", [deltas[profile_id]["views"] for profile_id in ids], type_=ARRAY(BigInteger)),
+                bindparam("delta_likes", [deltas[profile_id]["likes"] for profile_id in ids], type_=ARRAY(BigInteger)),
+                bindparam("delta_unique", [unique.get(profile_id, 0) for profile_id in ids], type_=ARRAY(Integer)),
+            )
+            .table_valued("profile_id", "views", "likes", "unique_viewers")
+            .render_derived(name="delta")
+        )
+        # Deltas of profiles deleted meanwhile are dropped by the join.
+        stmt = insert(ProfileStats).from_select(
+            ["profile_id", "views", "likes", "unique_viewers"],
+            select(source.c.profile_id, source.c.views, source.c.likes, source.c.unique_viewers).join(
+                User, User.id == source.c.profile_id
+            ),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProfileStats.profile_id],
+            set_={
+                "views": ProfileStats.views + stmt.excluded.views,
+                "likes": ProfileStats.likes + stmt.excluded.likes,
+                "unique_viewers": func.greatest(ProfileStats.unique_viewers, stmt.excluded.unique_viewers),
+                "updated_at": func.now(),
+            },
+        )
+        await session.execute(stmt)
+
+    async def _load_totals(self, profile_id: int) -> list[int]:
+        async with session_scope(self.session_factory) as session:
+            row = (
+                await session.execute(
+                    select(ProfileStats.views, ProfileStats.likes).where(ProfileStats.profile_id == profile_id)
+                )
+            ).one_or_none()
+        totals = [row.views, row.likes] if row else [0, 0]
+        # HSETNX: a drain finishing meanwhile has already published newer totals.
+        pipe = self.redis.pipeline(transaction=False)
+        for name, value in zip(FIELDS, totals):
+            pipe.hsetnx(self._totals_key, f"{profile_id}:{name}", value)
+        await pipe.execute()
+        return totals
+
+    def _viewers_key(self, profile_id: int) -> str:
+        return f"{self.namespace}stats:viewers:{profile_id}"
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                drained = await self.drain()
+                if drained:
+                    logger.debug("Drained counters of %d profiles", drained)
+            except DatabaseUnavailable:
+                logger.warning("Database unavailable, profile counters stay in Redis")
+            except Exception:
+                logger.exception("Profile counter drain failed")
+
+
+def _text(value: bytes | str) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value
@@ -1,26 +1,76 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import logging
+from difflib import SequenceMatcher
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Iterable, Mapping
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from bot.db.models import Game
+from bot.db.breaker import DatabaseUnavailable
+from bot.db.models import Game, GamePlayers
+from bot.db.session import session_scope
+from bot.services.changes import record_change
 
+logger = logging.getLogger(__name__)
 
-async def seed_games(session: AsyncSession, data_path: Path) -> None:
+
+def rank_games(
+    query: str,
+    catalog: Iterable[Mapping[str, Any]],
+    limit: int = 20,
+    min_score: float = 0.2,
+) -> list[Mapping[str, Any]]:
+    """Fuzzy-match a search query against catalog names and aliases, best first; ties go to popular games."""
+    query = query.strip().lower()
+
+    def similarity(value: str) -> float:
+        if not value:
+            return 0.0
+        return SequenceMatcher(None, query, value).ratio()
+
+    scored = []
+    for game in catalog:
+        name = str(game.get("name", "")).lower()
+        alias = str(game.get("alias", "")).lower()
+        score = max(similarity(name), similarity(alias))
+        if query in name:
+            score += 0.35
+        if alias and query in alias:
+            score += 0.25
+        if name.startswith(query):
+            score += 0.2
+        if alias and alias.startswith(query):
+            score += 0.1
+        scored.append((score, game))
+
+    scored = [item for item in scored if item[0] >= min_score]
+    scored.sort(key=lambda x: (round(x[0], 1), x[1].get("players", 0)), reverse=True)
+    return [game for _, game in scored[:limit]]
+
+
+def load_catalog(data_path: Path) -> list[dict[str, Any]]:
     if not data_path.exists():
+        return []
+    return json.loads(data_path.read_text(encoding="utf-8"))
+
+
+async def seed_games(session: AsyncSession, catalog: Iterable[Mapping[str, Any]]) -> None:
+    items = [item for item in catalog if item.get("alias")]
+    if not items:
         return
-    raw = json.loads(data_path.read_text(encoding="utf-8"))
-    for item in raw:
-        alias = item.get("alias")
-        if not alias:
-            continue
-        exists = await session.scalar(select(Game).where(Game.alias == alias))
-        if exists:
+    result = await session.scalars(select(Game.alias).where(Game.alias.in_([item["alias"] for item in items])))
+    known = set(result.all())
+    added = False
+    for item in items:
+        alias = item["alias"]
+        if alias in known:
             continue
+        known.add(alias)
+        added = True
         session.add(
             Game(
                 name=item.get("name") or alias,
@@ -28,11 +78,63 @@ async def seed_games(session: AsyncSession, data_path: Path) -> None:
                 category=item.get("category"),
             )
         )
-    await session.flush()
+    if added:
+        await session.flush()
+        await record_change(session, "games")
+
+
+def _by_popularity(stmt: Any) -> Any:
+    players = func.coalesce(GamePlayers.players, 0)
+    return stmt.outerjoin(GamePlayers, GamePlayers.game_id == Game.id).order_by(players.desc(), Game.name)
+
+
+class GameCatalog:
+    """Per-bot copy of the game list, most played first, shared by all onboarding flows of that bot."""
+
+    def __init__(self) -> None:
+        self.items: list[dict[str, Any]] = []
+        self.by_id: dict[int, dict[str, Any]] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    async def refresh(self, session: AsyncSession) -> None:
+        # One row per game whatever the number of players: counts come from `game_players`.
+        stmt = _by_popularity(
+            select(Game.id, Game.name, Game.alias, func.coalesce(GamePlayers.players, 0).label("players"))
+        )
+        result = await session.execute(stmt)
+        self.items = [
+            {"id": row.id, "name": row.name, "alias": row.alias, "players": row.players} for row in result
+        ]
+        self.by_id = {item["id"]: item for item in self.items}
+
+    async def start(self, session_factory: async_sessionmaker[AsyncSession], interval: float) -> None:
+        if interval > 0:
+            self._task = asyncio.create_task(self._run(session_factory, interval))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def reload(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """`refresh` in its own session, keeping the previous list when it fails."""
+        try:
+            async with session_scope(session_factory) as session:
+                await self.refresh(session)
+        except DatabaseUnavailable:
+            logger.warning("Database unavailable, keeping the previous game catalog")
+        except Exception:
+            logger.exception("Game catalog refresh failed")
+
+    async def _run(self, session_factory: async_sessionmaker[AsyncSession], interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.reload(session_factory)
 
 
 async def list_games(session: AsyncSession) -> list[Game]:
-    result = await session.execute(select(Game).order_by(Game.name))
+    result = await session.execute(_by_popularity(select(Game)))
     return list(result.scalars().all())
 
 
@@ -0,0 +1,118 @@
+"""Several bot tokens served by one process over a shared DB engine, Redis and game table.
+
+The primary bot (BOT_TOKEN) keeps the default schema and unprefixed Redis keys; every extra
+bot gets its own schema for user tables and a `{bot_id}:` prefix for Redis keys. Game popularity
+differs per bot, so each one keeps its own catalog ordering.
+"""
+
+from __future__ import annotations
+
+import resource
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.config import BotSpec, Settings
+from bot.db.routing import SessionRouter
+from bot.services.avatars import AvatarIndex
+from bot.services.chat import ChatRelay
+from bot.services.counters import ProfileCounters
+from bot.services.games import GameCatalog
+from bot.services.inline_search import InlineSearch
+from bot.services.matchmaking import MatchQueue
+from bot.services.profile_cache import ProfileCache
+from bot.services.profile_edit import ProfileEditor
+from bot.services.retry_queue import WriteRetryQueue
+from bot.utils.storage import fsm_memory_report
+
+
+def bot_namespace(spec: BotSpec, primary: bool) -> str:
+    return "" if primary else f"{spec.bot_id}:"
+
+
+def bot_schema(spec: BotSpec, primary: bool) -> str | None:
+    return None if primary else f"bot_{spec.bot_id}"
+
+
+@dataclass
+class BotUsage:
+    updates: int = 0
+    errors: int = 0
+    busy: float = 0.0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+
+
+@dataclass
+class HostedBot:
+    spec: BotSpec
+    bot: Bot
+    settings: Settings
+    namespace: str
+    schema: str | None
+    session_factory: async_sessionmaker[AsyncSession]
+    session_router: SessionRouter
+    chat_relay: ChatRelay
+    match_queue: MatchQueue
+    profile_cache: ProfileCache
+    write_queue: WriteRetryQueue
+    inline_search: InlineSearch
+    profile_counters: ProfileCounters
+    game_catalog: GameCatalog
+    avatar_index: AvatarIndex
+    profile_editor: ProfileEditor
+    usage: BotUsage = field(default_factory=BotUsage)
+
+    @property
+    def bot_id(self) -> int:
+        return self.spec.bot_id
+
+
+@dataclass
+class BotReport:
+    bot_id: int
+    language: str
+    updates: int
+    errors: int
+    busy: float
+    in_flight: int
+    peak_in_flight: int
+    chat_pairs: int
+    waiting: int
+    fsm_keys: int
+    fsm_bytes: int
+    queued_writes: int
+
+    @property
+    def avg_ms(self) -> float:
+        return self.busy / self.updates * 1000 if self.updates else 0.0
+
+
+async def usage_report(hosted: list[HostedBot], redis: Redis) -> list[BotReport]:
+    reports = []
+    for item in hosted:
+        fsm = await fsm_memory_report(redis, prefix=f"{item.namespace}fsm")
+        reports.append(
+            BotReport(
+                bot_id=item.bot_id,
+                language=item.settings.default_language,
+                updates=item.usage.updates,
+                errors=item.usage.errors,
+                busy=item.usage.busy,
+                in_flight=item.usage.in_flight,
+                peak_in_flight=item.usage.peak_in_flight,
+                chat_pairs=item.chat_relay.active_pairs,
+                waiting=int(await redis.zcard(f"{item.namespace}mm:waiting")),
+                fsm_keys=sum(usage.keys for usage in fsm.values()),
+                fsm_bytes=sum(usage.bytes for usage in fsm.values()),
+                queued_writes=await item.write_queue.depth(),
+            )
+        )
+    return reports
+
+
+def peak_rss_kib() -> int:
+    """Peak resident memory of the whole process (shared by all hosted bots)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
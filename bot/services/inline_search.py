@@ -0,0 +1,115 @@
+"""Inline-mode (`@bot query`) search over games and registered players.
+
+Result pages are cached in Redis by normalized query and offset, so repeated and
+popular queries never reach the database. Players are paged with a keyset cursor on
+the (unique) nickname; games come from the in-memory catalog on the first page only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from redis.asyncio import Redis
+
+from bot.db.routing import SessionRouter
+from bot.db.session import session_scope
+from bot.services.games import GameCatalog, rank_games
+from bot.services.profile_cache import ProfileSnapshot, SnapshotGame
+from bot.services.users import search_players
+
+PLAYER_CURSOR = "p:"
+MAX_QUERY_LENGTH = 64
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive form used as the cache key; a leading @ is ignored."""
+    return " ".join(text.lower().split()).lstrip("@")[:MAX_QUERY_LENGTH]
+
+
+@dataclass
+class InlinePage:
+    games: list[dict[str, Any]] = field(default_factory=list)
+    players: list[ProfileSnapshot] = field(default_factory=list)
+    next_offset: str = ""
+
+
+class InlineSearch:
+    """Cached, paged inline results; per-user typing bursts collapse into one lookup."""
+
+    def __init__(
+        self,
+        redis: Redis,
+        catalog: GameCatalog,
+        page_size: int = 20,
+        game_limit: int = 5,
+        ttl: int = 60,
+        settle_delay: float = 0.3,
+        namespace: str = "",
+    ) -> None:
+        self.redis = redis
+        self.catalog = catalog
+        self.page_size = page_size
+        self.game_limit = game_limit
+        self.ttl = ttl
+        self.settle_delay = settle_delay
+        self.namespace = namespace
+        self._latest: dict[int, object] = {}
+
+    async def cached(self, query: str, offset: str) -> InlinePage | None:
+        raw = await self.redis.get(self._key(query, offset))
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        players = []
+        for item in data["players"]:
+            games = [SnapshotGame(**game) for game in item.pop("games", [])]
+            players.append(ProfileSnapshot(**item, games=games))
+        return InlinePage(games=data["games"], players=players, next_offset=data["next_offset"])
+
+    async def settle(self, user_id: int) -> bool:
+        """Wait out the typing burst; False when a newer query from the same user arrived meanwhile."""
+        token = object()
+        self._latest[user_id] = token
+        await asyncio.sleep(self.settle_delay)
+        if self._latest.get(user_id) is not token:
+            return False
+        del self._latest[user_id]
+        return True
+
+    async def search(self, session_router: SessionRouter, user_id: int, query: str, offset: str) -> InlinePage:
+        page = InlinePage()
+        if not offset:
+            page.games = [
+                {"id": game["id"], "name": game["name"], "alias": game["alias"]}
+                for game in rank_games(query, self.catalog.items, limit=self.game_limit)
+            ]
+        after = offset[len(PLAYER_CURSOR):] if offset.startswith(PLAYER_CURSOR) else None
+        async with session_scope(session_router.for_read(user_id)) as session:
+            users = await search_players(session, query, after=after, limit=self.page_size)
+        page.players = [ProfileSnapshot.from_user(user) for user in users]
+        if len(users) == self.page_size:
+            page.next_offset = f"{PLAYER_CURSOR}{users[-1].roblox_nick}"
+        payload = {
+            "games": page.games,
+            "players": [asdict(player) for player in page.players],
+            "next_offset": page.next_offset,
+        }
+        await self.redis.set(self._key(query, offset), json.dumps(payload, ensure_ascii=False), ex=self.ttl)
+        return page
+
+    async def forget_player(self, *nicks: str) -> None:
+        """Drop cached first pages of every query that lists a player with one of these nicknames.
+
+        Later pages are keyed by cursor, not by player, and expire with the TTL.
+        """
+        keys = {self._key(normalize_query(nick[:length]), "") for nick in nicks for length in range(1, len(nick) + 1)}
+        if keys:
+            await self.redis.delete(*keys)
+
+    def _key(self, query: str, offset: str) -> str:
+        digest = hashlib.sha1(f"{query}\0{offset}".encode()).hexdigest()
+        return f"{self.namespace}inline:{digest}"
@@ -0,0 +1,321 @@
+"""Quick-match queue for /chat bucketed by game, language and age band."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from bisect import bisect_right
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Iterable
+
+from redis.asyncio import Redis
+
+from bot.services.chat import ChatRelay
+
+logger = logging.getLogger(__name__)
+
+AGE_BANDS = (8, 13, 16, 18, 25)
+ADULT_AGE = 18
+MAX_WAIT_SAMPLES = 500
+
+# Runs as one atomic step: drop stale heads, pick the longest-waiting other user across the
+# candidate buckets, then dequeue both; otherwise (optionally) enqueue the caller.
+# Per-user bucket sets are addressed by name (ARGV[5] is the key namespace), so this assumes a
+# non-cluster Redis.
+_MATCH_LUA = """
+local uid = ARGV[1]
+local now = tonumber(ARGV[2])
+local cutoff = tonumber(ARGV[3])
+local enqueue = ARGV[4] == '1'
+local ns = ARGV[5]
+local self_score = redis.call('ZSCORE', ns .. 'mm:waiting', uid)
+if not enqueue and not self_score then
+  return false
+end
+local best, best_score, best_key
+for _, key in ipairs(KEYS) do
+  redis.call('ZREMRANGEBYSCORE', key, '-inf', cutoff)
+  local head = redis.call('ZRANGE', key, 0, 1, 'WITHSCORES')
+  for i = 1, #head, 2 do
+    if head[i] ~= uid then
+      local score = tonumber(head[i + 1])
+      if not best_score or score < best_score then
+        best, best_score, best_key = head[i], score, key
+      end
+      break
+    end
+  end
+end
+if best then
+  for _, member in ipairs({best, uid}) do
+    local own = ns .. 'mm:u:' .. member
+    for _, bucket in ipairs(redis.call('SMEMBERS', own)) do
+      redis.call('ZREM', bucket, member)
+    end
+    redis.call('DEL', own)
+    redis.call('ZREM', ns .. 'mm:waiting', member)
+  end
+  return {best, best_key, tostring(best_score), tostring(self_score or now)}
+end
+if enqueue then
+  redis.call('ZADD', ns .. 'mm:waiting', 'NX', now, uid)
+  local since = redis.call('ZSCORE', ns .. 'mm:waiting', uid)
+  for i = 6, #ARGV do
+    redis.call('ZADD', ARGV[i], 'NX', since, uid)
+    redis.call('SADD', ns .. 'mm:u:' .. uid, ARGV[i])
+    redis.call('SADD', ns .. 'mm:buckets', ARGV[i])
+  end
+end
+return false
+"""
+
+
+def age_band(age: int) -> int:
+    return max(0, bisect_right(AGE_BANDS, age) - 1)
+
+
+def neighbour_bands(band: int) -> list[int]:
+    """The band itself and its neighbours, never mixing minors with adults."""
+    adult = AGE_BANDS[band] >= ADULT_AGE
+    return [
+        candidate
+        for candidate in (band - 1, band, band + 1)
+        if 0 <= candidate < len(AGE_BANDS) and (AGE_BANDS[candidate] >= ADULT_AGE) == adult
+    ]
+
+
+def bucket_key(game_id: int, language: str, band: int, namespace: str = "") -> str:
+    return f"{namespace}mm:q:{game_id}:{language}:{band}"
+
+
+def parse_bucket(key: str) -> tuple[int, str, int]:
+    game_id, language, band = key.rsplit(":", 3)[1:]
+    return int(game_id), language, int(band)
+
+
+@dataclass
+class QueueEntry:
+    user_id: int
+    game_ids: list[int]
+    languages: list[str]
+    age: int
+    locale: str
+
+
+@dataclass
+class BucketStats:
+    bucket: str
+    depth: int
+    matches: int
+    p50: float | None
+    p90: float | None
+    p99: float | None
+
+
+class MatchQueue:
+    def __init__(
+        self,
+        redis: Redis,
+        chat_relay: ChatRelay,
+        widen_band_after: float = 15.0,
+        widen_game_after: float = 45.0,
+        max_wait: float = 600.0,
+        tick: float = 3.0,
+        namespace: str = "",
+    ) -> None:
+        self.redis = redis
+        self.chat_relay = chat_relay
+        self.widen_band_after = widen_band_after
+        self.widen_game_after = widen_game_after
+        self.max_wait = max_wait
+        self.tick = tick
+        self.namespace = namespace
+        self._waiting_key = f"{namespace}mm:waiting"
+        self._buckets_key = f"{namespace}mm:buckets"
+        self._script = redis.register_script(_MATCH_LUA)
+        self._waits: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=MAX_WAIT_SAMPLES))
+        self._task: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._widen_loop())
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def join(self, entry: QueueEntry) -> bool:
+        """Match immediately if possible, otherwise wait in the user's own buckets."""
+        band = age_band(entry.age)
+        await self.redis.hset(
+            self._meta_key(entry.user_id),
+            mapping={
+                "games": ",".join(str(game_id) for game_id in entry.game_ids),
+                "languages": ",".join(entry.languages),
+                "band": band,
+                "locale": entry.locale,
+            },
+        )
+        own = self._buckets(entry.game_ids, entry.languages, [band])
+        return await self._try_match(entry.user_id, own, own_buckets=own)
+
+    async def leave(self, user_id: int) -> None:
+        buckets = await self.redis.smembers(self._user_key(user_id))
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for bucket in buckets:
+                pipe.zrem(bucket, user_id)
+            pipe.zrem(self._waiting_key, user_id)
+            pipe.delete(self._user_key(user_id), self._meta_key(user_id))
+            await pipe.execute()
+
+    async def report(self) -> list[BucketStats]:
+        buckets = sorted(_text(bucket) for bucket in await self.redis.smembers(self._buckets_key))
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for bucket in buckets:
+                pipe.zcard(bucket)
+            depths = await pipe.execute()
+        stats = []
+        for bucket, depth in zip(buckets, depths):
+            waits = sorted(self._waits.get(bucket, ()))
+            if not depth and not waits:
+                continue
+            stats.append(
+                BucketStats(
+                    bucket=bucket,
+                    depth=int(depth),
+                    matches=len(waits),
+                    p50=_percentile(waits, 0.5),
+                    p90=_percentile(waits, 0.9),
+                    p99=_percentile(waits, 0.99),
+                )
+            )
+        return stats
+
+    async def _try_match(
+        self,
+        user_id: int,
+        candidates: list[str],
+        own_buckets: list[str] | None = None,
+        since: float | None = None,
+    ) -> bool:
+        """True when `user_id` ended up in a chat; `since` keeps the original wait when re-queued."""
+        now = time.time()
+        enqueue = own_buckets is not None
+        result = await self._script(
+            keys=candidates,
+            args=[user_id, since or now, now - self.max_wait, int(enqueue), self.namespace, *(own_buckets or [])],
+        )
+        if not result:
+            return False
+        partner_id, bucket = int(_text(result[0])), _text(result[1])
+        partner_since, own_since = float(_text(result[2])), float(_text(result[3]))
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hget(self._meta_key(user_id), "locale")
+            pipe.hget(self._meta_key(partner_id), "locale")
+            own_locale, partner_locale = await pipe.execute()
+        default = _text(own_locale) or _text(partner_locale) or ""
+        pair = await self.chat_relay.open_pair(
+            user_id,
+            partner_id,
+            {user_id: _text(own_locale) or default, partner_id: _text(partner_locale) or default},
+        )
+        if pair is None:
+            # One of them cancelled, restarted or was deleted while queued; the other keeps waiting.
+            matched = False
+            for member, member_since in ((partner_id, partner_since), (user_id, own_since)):
+                if await self.chat_relay.searching(member):
+                    requeued = await self._requeue(member, member_since)
+                    matched = matched or (member == user_id and requeued)
+                else:
+                    await self.leave(member)
+            return matched
+        self._waits[bucket].append(now - partner_since)
+        self._waits[bucket].append(now - own_since)
+        await self.redis.delete(self._meta_key(user_id), self._meta_key(partner_id))
+        return True
+
+    async def _requeue(self, user_id: int, since: float) -> bool:
+        meta = await self.redis.hgetall(self._meta_key(user_id))
+        if not meta:
+            return False
+        games = [int(game_id) for game_id in (_text(meta.get(b"games")) or "").split(",") if game_id]
+        languages = (_text(meta.get(b"languages")) or "").split(",")
+        own = self._buckets(games, languages, [int(_text(meta.get(b"band")) or 0)])
+        return await self._try_match(user_id, own, own_buckets=own, since=since)
+
+    async def _widen_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self._widen()
+            except Exception:
+                logger.exception("Matchmaking widening failed")
+
+    async def _widen(self) -> None:
+        now = time.time()
+        for member in await self.redis.zrangebyscore(self._waiting_key, "-inf", now - self.max_wait):
+            await self._expire(int(member))
+
+        waiting = await self.redis.zrangebyscore(
+            self._waiting_key, "-inf", now - self.widen_band_after, withscores=True
+        )
+        active_buckets: list[str] | None = None
+        for member, since in waiting:
+            user_id = int(member)
+            meta = await self.redis.hgetall(self._meta_key(user_id))
+            if not meta:
+                continue
+            languages = (_text(meta.get(b"languages")) or "").split(",")
+            bands = neighbour_bands(int(_text(meta.get(b"band")) or 0))
+            if now - since >= self.widen_game_after:
+                if active_buckets is None:
+                    active_buckets = [_text(bucket) for bucket in await self.redis.smembers(self._buckets_key)]
+                candidates = [
+                    bucket
+                    for bucket in active_buckets
+                    if parse_bucket(bucket)[1] in languages and parse_bucket(bucket)[2] in bands
+                ]
+            else:
+                games = [int(game_id) for game_id in (_text(meta.get(b"games")) or "").split(",") if game_id]
+                candidates = self._buckets(games, languages, bands)
+            await self._try_match(user_id, candidates)
+
+    async def _expire(self, user_id: int) -> None:
+        locale = _text(await self.redis.hget(self._meta_key(user_id), "locale"))
+        await self.leave(user_id)
+        if not await self.chat_relay.searching(user_id):
+            # Left the search some other way; whatever state they are in now is not ours to clear.
+            return
+        await self.chat_relay.state(user_id).clear()
+        await self.chat_relay.notify(user_id, "chat_search_timeout", locale)
+
+    def _buckets(self, game_ids: Iterable[int], languages: Iterable[str], bands: Iterable[int]) -> list[str]:
+        return [
+            bucket_key(game_id, language, band, self.namespace)
+            for game_id in game_ids
+            for language in languages
+            for band in bands
+        ]
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.namespace}mm:u:{user_id}"
+
+    def _meta_key(self, user_id: int) -> str:
+        return f"{self.namespace}mm:meta:{user_id}"
+
+
+def _percentile(values: list[float], quantile: float) -> float | None:
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(quantile * len(values)))]
+
+
+def _text(value: bytes | str | None) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value or ""
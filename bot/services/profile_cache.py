@@ -0,0 +1,167 @@
+"""Profile snapshots in Redis, served while the database is unavailable.
+
+With a change feed attached, a bounded in-process copy of recently read profiles answers
+`load_profile` without a query; the feed drops entries that other processes change.
+"""
+
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from redis.asyncio import Redis
+
+from bot.db.breaker import DatabaseUnavailable
+from bot.db.models import User
+from bot.db.routing import SessionRouter
+from bot.db.session import session_scope
+from bot.services.schemas import RegistrationData
+from bot.services.users import get_user
+
+
+@dataclass
+class SnapshotGame:
+    id: int
+    name: str
+
+
+@dataclass
+class ProfileSnapshot:
+    """Just enough of `User` for `format_profile` and the /chat queue entry."""
+
+    id: int
+    username: str | None
+    roblox_nick: str
+    age: int
+    languages: list[str]
+    description: str | None
+    photo_id: str | None
+    games: list[SnapshotGame] = field(default_factory=list)
+
+    @classmethod
+    def from_user(cls, user: User) -> ProfileSnapshot:
+        return cls(
+            id=user.id,
+            username=user.username,
+            roblox_nick=user.roblox_nick,
+            age=user.age,
+            languages=list(user.languages or []),
+            description=user.description,
+            photo_id=user.photo_id,
+            games=[SnapshotGame(game.id, game.name) for game in user.games],
+        )
+
+    @classmethod
+    def from_registration(cls, payload: RegistrationData, game_names: dict[int, str]) -> ProfileSnapshot:
+        return cls(
+            id=payload.tg_id,
+            username=payload.username,
+            roblox_nick=payload.roblox_nick,
+            age=payload.age,
+            languages=list(payload.languages),
+            description=payload.description,
+            photo_id=payload.photo_id,
+            games=[SnapshotGame(game_id, game_names.get(game_id, "?")) for game_id in payload.game_ids],
+        )
+
+
+class ProfileCache:
+    def __init__(self, redis: Redis, ttl: int = 7 * 86400, namespace: str = "", local_size: int = 0) -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self.namespace = namespace
+        self.local_size = local_size
+        # Only trusted while a change feed is connected; see `set_local`.
+        self.local_enabled = False
+        self._local: OrderedDict[int, ProfileSnapshot] = OrderedDict()
+        # Bumped by every invalidation so that a read racing with one is not kept locally.
+        self.epoch = 0
+
+    async def get(self, user_id: int) -> ProfileSnapshot | None:
+        raw = await self.redis.get(self._key(user_id))
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        games = [SnapshotGame(**game) for game in data.pop("games", [])]
+        return ProfileSnapshot(**data, games=games)
+
+    async def put(self, profile: User | ProfileSnapshot, epoch: int | None = None) -> None:
+        """Store the snapshot; it is also kept locally when read from the database at `epoch`."""
+        snapshot = profile if isinstance(profile, ProfileSnapshot) else ProfileSnapshot.from_user(profile)
+        await self.redis.set(self._key(snapshot.id), json.dumps(asdict(snapshot), ensure_ascii=False), ex=self.ttl)
+        if epoch is not None and epoch == self.epoch and self.local_enabled and self.local_size > 0:
+            self._local[snapshot.id] = snapshot
+            self._local.move_to_end(snapshot.id)
+            if len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+        else:
+            # Written by this process (the change event that follows decides what is current) or read
+            # from a replica that may lag behind the feed.
+            self._local.pop(snapshot.id, None)
+
+    async def patch(self, user_id: int, **changes: Any) -> ProfileSnapshot | None:
+        """Apply changed fields to the cached snapshot; None, and nothing written, when it is not cached."""
+        snapshot = await self.get(user_id)
+        if snapshot is None:
+            return None
+        for name, value in changes.items():
+            setattr(snapshot, name, value)
+        await self.put(snapshot)
+        return snapshot
+
+    async def delete(self, user_id: int) -> None:
+        self._local.pop(user_id, None)
+        await self.redis.delete(self._key(user_id))
+
+    def local(self, user_id: int) -> ProfileSnapshot | None:
+        if not self.local_enabled:
+            return None
+        snapshot = self._local.get(user_id)
+        if snapshot is not None:
+            self._local.move_to_end(user_id)
+        return snapshot
+
+    def forget_local(self, user_id: int | None = None) -> None:
+        """Drop one locally kept profile, or all of them."""
+        self.epoch += 1
+        if user_id is None:
+            self._local.clear()
+        else:
+            self._local.pop(user_id, None)
+
+    def set_local(self, enabled: bool) -> None:
+        # Whatever was kept before the switch may have missed change events.
+        self.local_enabled = enabled
+        self.forget_local()
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.namespace}profile:{user_id}"
+
+
+async def load_profile(
+    session_router: SessionRouter,
+    profile_cache: ProfileCache,
+    user_id: int,
+) -> tuple[User | ProfileSnapshot | None, bool]:
+    """Profile from the database, or the cached snapshot when it is unavailable.
+
+    The second item is True when the answer comes from the cache (degraded mode). A locally kept
+    snapshot is current as far as the change feed knows, so it is not degraded. Only primary
+    reads are kept locally: a lagging replica may still return a row the feed already replaced.
+    """
+    snapshot = profile_cache.local(user_id)
+    if snapshot is not None:
+        return snapshot, False
+    epoch = profile_cache.epoch
+    factory = session_router.for_read(user_id)
+    try:
+        async with session_scope(factory) as session:
+            user = await get_user(session, user_id)
+    except DatabaseUnavailable:
+        return await profile_cache.get(user_id), True
+    if user is not None:
+        await profile_cache.put(user, epoch=epoch if factory is session_router.primary else None)
+    return user, False
+
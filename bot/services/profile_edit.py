@@ -0,0 +1,107 @@
+"""Single-field profile edits.
+
+Each edit is one UPDATE of one column (or a `user_games` diff for games) instead of the full
+`upsert_user` rewrite, and touches only what shows that field: the cached snapshot is patched
+in place, inline result pages listing the player (keyed by nickname prefix, so a nick change
+also drops those of the old nick) are dropped, and a new photo is sent to the avatar pipeline
+(a removed one leaves the duplicate index).
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from aiogram import Bot
+from sqlalchemy.exc import IntegrityError
+
+from bot.db.models import User
+from bot.db.routing import SessionRouter
+from bot.db.session import session_scope
+from bot.services.avatars import AvatarIndex, AvatarPipeline
+from bot.services.games import GameCatalog
+from bot.services.inline_search import InlineSearch
+from bot.services.profile_cache import ProfileCache, ProfileSnapshot, SnapshotGame, load_profile
+from bot.services.users import update_user_field, update_user_games
+
+# Editable field -> User column (and ProfileSnapshot attribute); games are edited through `set_games`.
+COLUMNS = {
+    "nick": "roblox_nick",
+    "age": "age",
+    "language": "languages",
+    "bio": "description",
+    "photo": "photo_id",
+}
+
+
+class ProfileEditor:
+    def __init__(
+        self,
+        session_router: SessionRouter,
+        profile_cache: ProfileCache,
+        inline_search: InlineSearch,
+        game_catalog: GameCatalog,
+        avatar_pipeline: AvatarPipeline,
+        avatar_index: AvatarIndex,
+    ) -> None:
+        self.session_router = session_router
+        self.profile_cache = profile_cache
+        self.inline_search = inline_search
+        self.game_catalog = game_catalog
+        self.avatar_pipeline = avatar_pipeline
+        self.avatar_index = avatar_index
+
+    async def set_field(
+        self,
+        bot: Bot,
+        user_id: int,
+        name: str,
+        value: Any,
+        nick: str,
+    ) -> User | ProfileSnapshot | None:
+        """Store one field of the profile whose current nickname is `nick`; None when the profile is gone.
+
+        Raises IntegrityError when a new nickname is taken.
+        """
+        column = COLUMNS[name]
+        async with session_scope(self.session_router.for_write(user_id)) as session:
+            if not await update_user_field(session, user_id, column, value):
+                return None
+        await self.inline_search.forget_player(nick, value if name == "nick" else nick)
+        if name == "photo":
+            if value:
+                self.avatar_pipeline.submit(self.avatar_index, bot, user_id, value)
+            else:
+                await self.avatar_index.forget(user_id)
+        return await self._refreshed(user_id, **{column: value})
+
+    async def set_games(
+        self,
+        user_id: int,
+        before: list[int],
+        after: list[int],
+        nick: str,
+    ) -> User | ProfileSnapshot | None:
+        added = [game_id for game_id in after if game_id not in before]
+        removed = [game_id for game_id in before if game_id not in after]
+        if added or removed:
+            try:
+                async with session_scope(self.session_router.for_write(user_id)) as session:
+                    await update_user_games(session, user_id, added, removed)
+            except IntegrityError:
+                # The profile was deleted while its games were being picked.
+                return None
+            await self.inline_search.forget_player(nick)
+        games = [
+            SnapshotGame(game_id, self.game_catalog.by_id[game_id]["name"])
+            for game_id in after
+            if game_id in self.game_catalog.by_id
+        ]
+        return await self._refreshed(user_id, games=games)
+
+    async def _refreshed(self, user_id: int, **changes: Any) -> User | ProfileSnapshot | None:
+        snapshot = await self.profile_cache.patch(user_id, **changes)
+        if snapshot is not None:
+            return snapshot
+        # Cold cache: one read, which also caches the full snapshot again.
+        user, _degraded = await load_profile(self.session_router, self.profile_cache, user_id)
+        return user
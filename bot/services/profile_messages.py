@@ -4,18 +4,21 @@ from aiogram.types import Message
 
 from bot.db.models import User
 from bot.keyboards.profile import profile_actions_keyboard
+from bot.services.counters import ProfileStatsView
+from bot.services.profile_cache import ProfileSnapshot
 from bot.utils.formatting import format_profile
 from bot.utils.i18n import Translator
 
 
 async def send_profile_message(
     target: Message,
-    user: User,
+    user: User | ProfileSnapshot,
     translator: Translator,
     locale: str,
     with_actions: bool = True,
+    stats: ProfileStatsView | None = None,
 ) -> None:
-    text = format_profile(user, translator, locale)
+    text = format_profile(user, translator, locale, stats=stats)
     markup = profile_actions_keyboard(translator, locale) if with_actions else None
 
     if user.photo_id:
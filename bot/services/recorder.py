@@ -0,0 +1,217 @@
+"""Opt-in recording of incoming updates for realistic load replay.
+
+Updates are anonymized and appended to one gzip-compressed JSONL file per UTC day; every flush
+adds a gzip member, so the file stays valid when the process stops mid-day. Each line is
+`{"t": arrival unix time, "bot": bot id, "u": update}`.
+
+Anonymization keeps what decides the handler path and its cost (update kinds, commands,
+callback data shape, text length and script, digits of short numeric answers such as ages) and
+replaces everything identifying: user/chat ids map to keyed pseudonyms that are stable within
+one salt (including ids embedded in callback data and inline result ids, such as `like:<id>`),
+names and file ids are hashed, free text is scrambled letter by letter (identical words
+scramble identically), contacts and locations are dropped.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+ID_OWNERS = frozenset({"from", "chat", "user", "sender_chat", "forward_from", "forward_from_chat", "via_bot"})
+ID_FIELDS = frozenset({"user_id", "user_chat_id", "chat_id", "user_ids"})
+DATA_FIELDS = frozenset({"data", "callback_data"})
+# Callback data and inline result prefixes whose numbers are catalog ids, not Telegram ids.
+CATALOG_PREFIXES = frozenset({"game", "g"})
+NAME_FIELDS = frozenset({"first_name", "last_name", "username", "title", "bio"})
+TEXT_FIELDS = frozenset({"text", "caption", "query"})
+FILE_FIELDS = frozenset({"file_id", "file_unique_id"})
+DROPPED_FIELDS = frozenset({"contact", "location", "venue", "phone_number", "url", "link_preview_options"})
+_LATIN = "abcdefghijklmnopqrstuvwxyz"
+_CYRILLIC = "абвгдежзийклмнопрстуфхцчшщъыьэюя"
+_NUMBER = re.compile(r"-?\d+")
+_RESULT_ID = re.compile(r"([A-Za-z_]*)(-?\d+)")
+
+
+@dataclass
+class RecordedUpdate:
+    ts: float
+    bot_id: int
+    update: dict[str, Any]
+
+
+class Anonymizer:
+    def __init__(self, salt: bytes) -> None:
+        self.salt = salt
+
+    def update(self, data: dict[str, Any]) -> dict[str, Any]:
+        return self._walk(data, parent="")
+
+    def pseudo_id(self, value: int) -> int:
+        pseudo = int.from_bytes(self._digest(str(abs(value)))[:6], "big") or 1
+        return -pseudo if value < 0 else pseudo
+
+    def scramble(self, text: str) -> str:
+        if text.isdigit() and len(text) <= 3:
+            return text
+        if text.startswith("/"):
+            command, sep, rest = text.partition(" ")
+            return command + sep + self.scramble(rest) if rest else command
+        return " ".join(self._scramble_word(word) for word in text.split(" "))
+
+    def callback_data(self, data: str) -> str:
+        """`like:123` -> `like:<pseudonym>`; numbers after a catalog prefix are kept."""
+        prefix, *parts = data.split(":")
+        if prefix in CATALOG_PREFIXES:
+            return data
+        return ":".join([prefix, *(self._pseudo_number(part) for part in parts)])
+
+    def result_id(self, result_id: str) -> str:
+        match = _RESULT_ID.fullmatch(result_id)
+        if match is None or match.group(1) in CATALOG_PREFIXES:
+            return result_id
+        return match.group(1) + str(self.pseudo_id(int(match.group(2))))
+
+    def _pseudo_number(self, part: str) -> str:
+        return str(self.pseudo_id(int(part))) if _NUMBER.fullmatch(part) else part
+
+    def _walk(self, value: Any, parent: str) -> Any:
+        if isinstance(value, list):
+            return [self._walk(item, parent) for item in value]
+        if not isinstance(value, dict):
+            return value
+        result = {}
+        for key, item in value.items():
+            if key in DROPPED_FIELDS:
+                continue
+            if isinstance(item, int) and (key in ID_FIELDS or (key == "id" and _owns_id(value, parent))):
+                result[key] = self.pseudo_id(item)
+            elif key in ID_FIELDS and isinstance(item, list):
+                result[key] = [self.pseudo_id(part) if isinstance(part, int) else part for part in item]
+            elif key in DATA_FIELDS and isinstance(item, str):
+                result[key] = self.callback_data(item)
+            elif key == "result_id" and isinstance(item, str):
+                result[key] = self.result_id(item)
+            elif key in NAME_FIELDS and isinstance(item, str):
+                result[key] = f"anon_{self._digest(item).hex()[:8]}"
+            elif key in TEXT_FIELDS and isinstance(item, str):
+                result[key] = self.scramble(item)
+            elif key in FILE_FIELDS and isinstance(item, str):
+                result[key] = self._digest(item).hex()
+            else:
+                result[key] = self._walk(item, key)
+        return result
+
+    def _scramble_word(self, word: str) -> str:
+        if not word:
+            return word
+        stream = self._digest(word)
+        chars = []
+        for index, char in enumerate(word):
+            byte = stream[index % len(stream)] + index
+            if char.isdigit():
+                replaced = str(byte % 10)
+            elif char.isascii() and char.isalpha():
+                replaced = _LATIN[byte % len(_LATIN)]
+            elif char.isalpha():
+                replaced = _CYRILLIC[byte % len(_CYRILLIC)]
+            else:
+                replaced = char
+            chars.append(replaced.upper() if char.isupper() else replaced)
+        return "".join(chars)
+
+    def _digest(self, value: str) -> bytes:
+        return hmac.new(self.salt, value.encode(), hashlib.sha256).digest()
+
+
+def _owns_id(value: dict[str, Any], parent: str) -> bool:
+    """A User (`is_bot`) or Chat (`type`) object, wherever it is nested."""
+    return parent in ID_OWNERS or "is_bot" in value or "type" in value
+
+
+class UpdateRecorder:
+    """Buffers raw updates in memory; a background task anonymizes and writes them off the loop."""
+
+    def __init__(
+        self,
+        directory: Path,
+        salt: bytes | None = None,
+        capacity: int = 10_000,
+        flush_interval: float = 2.0,
+    ) -> None:
+        self.directory = directory
+        self.anonymizer = Anonymizer(salt or os.urandom(32))
+        self.flush_interval = flush_interval
+        self.recorded = 0
+        self.dropped = 0
+        self._buffer: deque[tuple[float, int, Update]] = deque(maxlen=capacity)
+        self._task: asyncio.Task[None] | None = None
+
+    def record(self, bot_id: int, update: Update) -> None:
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((time.time(), bot_id, update))
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        batch = list(self._buffer)
+        self._buffer.clear()
+        try:
+            await asyncio.to_thread(self._write, batch)
+            self.recorded += len(batch)
+        except Exception:
+            logger.exception("Failed to write %d recorded updates", len(batch))
+
+    def _write(self, batch: list[tuple[float, int, Update]]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        day = datetime.fromtimestamp(batch[0][0], timezone.utc).strftime("%Y-%m-%d")
+        lines = []
+        for ts, bot_id, update in batch:
+            data = self.anonymizer.update(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+            lines.append(json.dumps({"t": round(ts, 4), "bot": bot_id, "u": data}, ensure_ascii=False))
+        with gzip.open(self.directory / f"updates-{day}.jsonl.gz", "at", encoding="utf-8") as handle:
+            handle.write("\n".join(lines) + "\n")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+def read_recording(paths: list[Path]) -> Iterator[RecordedUpdate]:
+    """Recorded updates from the given files (or directories of them) in file name order."""
+    files: list[Path] = []
+    for path in paths:
+        files.extend(sorted(path.glob("updates-*.jsonl.gz")) if path.is_dir() else [path])
+    for file in files:
+        with gzip.open(file, "rt", encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    item = json.loads(line)
+                    yield RecordedUpdate(ts=item["t"], bot_id=item["bot"], update=item["u"])
@@ -0,0 +1,155 @@
+"""Durable Redis queue of profile writes made while the database was unavailable."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import asdict
+from typing import Any
+
+from redis.asyncio import Redis
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.db.breaker import DatabaseUnavailable
+from bot.db.session import session_scope
+from bot.services.profile_cache import ProfileCache
+from bot.services.schemas import RegistrationData
+from bot.services.users import delete_user, upsert_user
+
+logger = logging.getLogger(__name__)
+
+
+class WriteRetryQueue:
+    """Replays queued writes in order once the database answers again.
+
+    Items move to a per-node processing list while applied, so a crash mid-write leaves them
+    there. Every node keeps a heartbeat key alive; on start, and then once per heartbeat period,
+    it puts back its own list and the lists of nodes whose heartbeat has expired. Both operations
+    are idempotent.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        session_factory: async_sessionmaker[AsyncSession],
+        profile_cache: ProfileCache,
+        interval: float = 10.0,
+        namespace: str = "",
+        node_id: str | None = None,
+    ) -> None:
+        self.redis = redis
+        self.session_factory = session_factory
+        self.profile_cache = profile_cache
+        self.interval = interval
+        self.replayed = 0
+        self.rejected = 0
+        self.node_id = node_id or uuid.uuid4().hex[:12]
+        self._queue_key = f"{namespace}db:retry"
+        self._processing_prefix = f"{namespace}db:retry:processing:"
+        self._alive_prefix = f"{namespace}db:retry:alive:"
+        self._processing_key = f"{self._processing_prefix}{self.node_id}"
+        self._heartbeat_ttl = max(int(interval * 3), 30)
+        self._task: asyncio.Task[None] | None = None
+
+    async def upsert_user(self, payload: RegistrationData) -> None:
+        await self._push({"op": "upsert_user", "payload": asdict(payload)})
+
+    async def delete_user(self, user_id: int) -> None:
+        await self._push({"op": "delete_user", "user_id": user_id})
+
+    async def depth(self) -> int:
+        return int(await self.redis.llen(self._queue_key))
+
+    async def start(self) -> None:
+        await self._heartbeat()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self.redis.delete(f"{self._alive_prefix}{self.node_id}")
+
+    async def reclaim(self) -> int:
+        """Put back writes left in processing lists by this node or by nodes that are gone."""
+        reclaimed = 0
+        async for raw_key in self.redis.scan_iter(match=f"{self._processing_prefix}*"):
+            key = raw_key.decode() if isinstance(raw_key, bytes) else raw_key
+            node = key[len(self._processing_prefix) :]
+            if node != self.node_id and await self.redis.exists(f"{self._alive_prefix}{node}"):
+                continue
+            while await self.redis.lmove(key, self._queue_key, "LEFT", "RIGHT") is not None:
+                reclaimed += 1
+        if reclaimed:
+            logger.warning("Reclaimed %d queued writes left by stopped nodes", reclaimed)
+        return reclaimed
+
+    async def replay(self) -> int:
+        """Apply queued writes until the queue is empty or the database fails again."""
+        applied = 0
+        while True:
+            raw = await self.redis.lmove(self._queue_key, self._processing_key, "RIGHT", "LEFT")
+            if raw is None:
+                return applied
+            try:
+                await self._apply(json.loads(raw))
+            except DatabaseUnavailable:
+                await self.redis.lmove(self._processing_key, self._queue_key, "LEFT", "RIGHT")
+                return applied
+            except IntegrityError:
+                self.rejected += 1
+                logger.warning("Dropping queued write rejected by the database: %s", raw, exc_info=True)
+            except Exception:
+                self.rejected += 1
+                logger.exception("Dropping queued write that failed to apply: %s", raw)
+            await self.redis.lpop(self._processing_key)
+            applied += 1
+            self.replayed += 1
+            await self._heartbeat()
+
+    async def _apply(self, item: dict[str, Any]) -> None:
+        if item["op"] == "upsert_user":
+            payload = RegistrationData(**item["payload"])
+            try:
+                async with session_scope(self.session_factory) as session:
+                    await upsert_user(session, payload)
+            except IntegrityError:
+                # The nickname was taken meanwhile; the optimistic snapshot is no longer true.
+                await self.profile_cache.delete(payload.tg_id)
+                raise
+        elif item["op"] == "delete_user":
+            async with session_scope(self.session_factory) as session:
+                await delete_user(session, item["user_id"])
+        else:
+            raise ValueError(f"unknown queued operation {item['op']!r}")
+
+    async def _push(self, item: dict[str, Any]) -> None:
+        await self.redis.lpush(self._queue_key, json.dumps(item, ensure_ascii=False))
+
+    async def _heartbeat(self) -> None:
+        await self.redis.set(f"{self._alive_prefix}{self.node_id}", "1", ex=self._heartbeat_ttl)
+
+    async def _run(self) -> None:
+        # A node that crashes for good is only noticed once its heartbeat expires, so look again
+        # every heartbeat period rather than only at start.
+        reclaimed_at = float("-inf")
+        while True:
+            if time.monotonic() - reclaimed_at >= self._heartbeat_ttl:
+                reclaimed_at = time.monotonic()
+                try:
+                    await self.reclaim()
+                except Exception:
+                    logger.exception("Failed to reclaim queued writes")
+            try:
+                await self._heartbeat()
+                if await self.replay():
+                    logger.info("Replayed queued writes, %d left", await self.depth())
+            except Exception:
+                logger.exception("Write retry queue failed")
+            await asyncio.sleep(self.interval)
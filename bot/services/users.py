@@ -1,28 +1,50 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Iterable
+from typing import Any, Iterable
 import logging
 
-from sqlalchemy import delete, select, update
+from sqlalchemy import BigInteger, delete, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from bot.db.models import Game, User
+from bot.db.models import Game, User, user_games_table
+from bot.services.changes import record_change
 from bot.services.schemas import RegistrationData
 
 logger = logging.getLogger(__name__)
 
 
 async def get_user(session: AsyncSession, tg_id: int) -> User | None:
-    try:
-        result = await session.execute(
-            select(User).where(User.id == tg_id).options(selectinload(User.games))
+    result = await session.execute(
+        select(User).where(User.id == tg_id).options(selectinload(User.games))
+    )
+    return result.scalar_one_or_none()
+
+
+async def search_players(
+    session: AsyncSession,
+    query: str,
+    after: str | None = None,
+    limit: int = 20,
+) -> list[User]:
+    """Players whose nickname starts with `query`, in nickname order after the `after` cursor."""
+    stmt = (
+        select(User)
+        .where(
+            User.is_deleted.is_(False),
+            # Same expression as ix_users_roblox_nick_lower, so the prefix match can use it.
+            func.lower(User.roblox_nick).startswith(query.lower(), autoescape=True),
         )
-        return result.scalar_one_or_none()
-    except Exception:
-        logger.exception("Failed to get user from DB", extra={"tg_id": tg_id})
-        return None
+        .order_by(User.roblox_nick)
+        .limit(limit)
+        .options(selectinload(User.games))
+    )
+    if after is not None:
+        stmt = stmt.where(User.roblox_nick > after)
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
 
 
 async def upsert_user(session: AsyncSession, payload: RegistrationData) -> User:
@@ -52,6 +74,7 @@ async def upsert_user(session: AsyncSession, payload: RegistrationData) -> User:
         session.add(user)
 
     await session.flush()
+    await record_change(session, "user", payload.tg_id)
     return user
 
 
@@ -61,9 +84,44 @@ async def delete_user(session: AsyncSession, tg_id: int) -> bool:
         return False
     await session.delete(user)
     await session.flush()
+    await record_change(session, "user", tg_id)
     return True
 
 
+async def update_user_field(session: AsyncSession, tg_id: int, column: str, value: Any) -> bool:
+    """One UPDATE of a single column of a live profile; False when there is none."""
+    result = await session.execute(
+        update(User)
+        .where(User.id == tg_id, User.is_deleted.is_(False))
+        .values({column: value})
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        return False
+    await record_change(session, "user", tg_id)
+    return True
+
+
+async def update_user_games(session: AsyncSession, tg_id: int, added: Iterable[int], removed: Iterable[int]) -> None:
+    """Apply a selection diff to `user_games`: at most one DELETE and one INSERT, nothing for an empty diff."""
+    removed, added = list(removed), list(added)
+    if removed:
+        await session.execute(
+            delete(user_games_table).where(
+                user_games_table.c.user_id == tg_id, user_games_table.c.game_id.in_(removed)
+            )
+        )
+    if added:
+        # Ids of games removed from the catalog meanwhile are skipped rather than failing the edit.
+        await session.execute(
+            insert(user_games_table)
+            .from_select(["user_id", "game_id"], select(literal(tg_id, BigInteger), Game.id).where(Game.id.in_(added)))
+            .on_conflict_do_nothing()
+        )
+    if removed or added:
+        await record_change(session, "user", tg_id)
+
+
 async def touch_user(session: AsyncSession, tg_id: int) -> None:
     await session.execute(
         update(User)
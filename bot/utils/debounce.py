@@ -0,0 +1,75 @@
+"""Coalescing of repeated Telegram edits to the same message."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+EditAction = Callable[[], Awaitable[Any]]
+
+
+class EditDebouncer:
+    """Runs only the latest scheduled edit per key, at most once per `window` seconds."""
+
+    def __init__(self, window: float = 0.4) -> None:
+        self.window = window
+        self.requested = 0
+        self.executed = 0
+        self.failed = 0
+        self._pending: dict[Hashable, EditAction] = {}
+        self._tasks: dict[Hashable, asyncio.Task[None]] = {}
+
+    @property
+    def saved(self) -> int:
+        return self.requested - self.executed - len(self._pending)
+
+    def schedule(self, key: Hashable, action: EditAction) -> None:
+        self.requested += 1
+        self._pending[key] = action
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._run(key))
+
+    async def flush(self) -> None:
+        """Cancel timers and run every pending edit right away."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        pending, self._pending = self._pending, {}
+        for action in pending.values():
+            if await self._execute(action):
+                # No time left to wait out a rate limit; the edit is given up.
+                self.executed += 1
+
+    async def _run(self, key: Hashable) -> None:
+        try:
+            while key in self._pending:
+                await asyncio.sleep(self.window)
+                action = self._pending.pop(key)
+                retry_after = await self._execute(action)
+                if retry_after:
+                    self._pending.setdefault(key, action)
+                    await asyncio.sleep(retry_after)
+        finally:
+            self._tasks.pop(key, None)
+
+    async def _execute(self, action: EditAction) -> float | None:
+        """Run one edit; a rate-limited one returns the wait and is not counted as executed yet."""
+        try:
+            await action()
+        except TelegramRetryAfter as exc:
+            self.failed += 1
+            return float(exc.retry_after)
+        except TelegramBadRequest as exc:
+            self.failed += 1
+            logger.debug("Debounced edit rejected: %s", exc)
+        except Exception:
+            self.failed += 1
+            logger.exception("Debounced edit failed")
+        self.executed += 1
+        return None
@@ -1,14 +1,22 @@
 from __future__ import annotations
 
 from bot.db.models import User
+from bot.services.counters import ProfileStatsView
+from bot.services.profile_cache import ProfileSnapshot
 from bot.utils.i18n import Translator
 
 
-def format_profile(user: User, tr: Translator, locale: str) -> str:
+def format_profile(
+    user: User | ProfileSnapshot,
+    tr: Translator,
+    locale: str,
+    title_key: str = "profile_title",
+    stats: ProfileStatsView | None = None,
+) -> str:
     languages = ", ".join(user.languages) if user.languages else "-"
     games = ", ".join(game.name for game in user.games) if user.games else "-"
     lines = [
-        f"<b>{tr.t('profile_title', locale)}</b>",
+        f"<b>{tr.t(title_key, locale)}</b>",
         tr.t("profile_username", locale, username=user.username or "—"),
         tr.t("profile_nick", locale, roblox_nick=user.roblox_nick),
         tr.t("profile_age", locale, age=user.age),
@@ -19,4 +27,8 @@ def format_profile(user: User, tr: Translator, locale: str) -> str:
         lines.append(tr.t("profile_bio", locale, bio=user.description))
     else:
         lines.append(tr.t("profile_no_bio", locale))
+    if stats is not None:
+        lines.append(
+            tr.t("profile_stats", locale, views=stats.views, unique=stats.unique_viewers, likes=stats.likes)
+        )
     return "\n".join(lines)
@@ -45,7 +45,22 @@ MESSAGES: dict[str, dict[str, str]] = {
         "profile_no_bio": "О себе: не заполнено",
         "profile_buttons_edit": "Редактировать",
         "profile_buttons_delete": "Удалить профиль",
-        "edit_coming_soon": "Редактирование появится позже. Пока можно перезапустить регистрацию через /start.",
+        "profile_buttons_like": "❤️ Нравится",
+        "profile_stats": "👁 {views} просмотров ({unique} уникальных) · ❤️ {likes}",
+        "profile_liked": "Лайк засчитан!",
+        "profile_like_repeat": "Ты уже лайкал этот профиль.",
+        "edit_choose": "Что изменить?",
+        "edit_field_nick": "Ник",
+        "edit_field_age": "Возраст",
+        "edit_field_language": "Язык",
+        "edit_field_games": "Режимы",
+        "edit_field_bio": "О себе",
+        "edit_field_photo": "Фото",
+        "edit_ask_bio": "Напиши новое описание (до 300 символов) или нажми «Удалить».",
+        "edit_ask_photo": "Пришли новое фото или нажми «Удалить».",
+        "edit_remove": "Удалить",
+        "edit_saved": "Изменения сохранены.",
+        "edit_busy": "Сначала заверши текущее действие: /stop — для чата, /cancel — для остального.",
         "profile_deleted": "Профиль удалён. Можно пройти регистрацию заново: /start.",
         "already_registered": "Похоже, профиль уже есть. Можешь обновить через /start или открыть /profile.",
         "main_menu_hint": "Чем займёмся? /browse — лента игроков, /search — подбор по фильтрам, /chat — быстрый чат.",
@@ -59,6 +74,31 @@ MESSAGES: dict[str, dict[str, str]] = {
         "games_empty": "Список режимов пуст. Добавьте данные в data/games.json.",
         "help": "Команды: /start — регистрация, /profile — профиль, /browse — лента, /search — поиск, /chat — быстрый чат, /cancel — отменить текущий шаг.",
         "nick_taken": "Этот ник уже используется. Попробуй другой.",
+        "degraded_profile": "⚠️ База данных временно недоступна — это сохранённая копия профиля.",
+        "degraded_unavailable": "Сервис временно недоступен. Попробуй чуть позже.",
+        "degraded_saved": "База данных временно недоступна: изменения сохранены и будут записаны автоматически.",
+        "inline_share_profile": "Поделиться своим профилем",
+        "inline_profile_title": "Профиль игрока",
+        "inline_player_description": "{age} лет · {games}",
+        "inline_game_description": "Позвать тиммейтов в этот режим",
+        "inline_game_message": "🎮 <b>{name}</b> — ищу тиммейтов! Пиши в личку.",
+        "inline_register": "Создать профиль",
+        "chat_searching": "Ищу собеседника… /stop — отменить поиск.",
+        "chat_search_cancelled": "Поиск собеседника отменён.",
+        "chat_matched": "Собеседник найден! Пиши — сообщения пересылаются анонимно. /stop — завершить чат.",
+        "chat_already_active": "Ты уже в чате. /stop — завершить.",
+        "chat_ended": "Чат завершён.",
+        "chat_partner_left": "Собеседник завершил чат. /chat — найти нового.",
+        "chat_idle_ended": "Чат закрыт из-за неактивности. /chat — найти нового собеседника.",
+        "chat_not_active": "Сейчас нет активного чата. /chat — найти собеседника.",
+        "chat_search_timeout": "Пока никого не нашлось. Попробуй /chat чуть позже.",
+        "admin_slow_disabled": "Профилирование выключено (PROFILING_ENABLED=false).",
+        "admin_slow_empty": "Пока нет профилированных апдейтов.",
+        "admin_slow_missing": "Нет записи с таким номером.",
+        "admin_fsm_empty": "В Redis нет FSM-ключей.",
+        "admin_queues_empty": "Очереди подбора пусты.",
+        "admin_funnel_empty": "Событий регистрации пока нет.",
+        "admin_avatars_disabled": "Обработка аватаров выключена (AVATAR_WORKERS=0 или не установлен Pillow).",
     },
     "en": {
         "start_greeting": "Hi, {username}! I’ll help you find Roblox teammates. Let’s set up your profile.",
@@ -89,7 +129,22 @@ MESSAGES: dict[str, dict[str, str]] = {
         "profile_no_bio": "About: not provided",
         "profile_buttons_edit": "Edit",
         "profile_buttons_delete": "Delete profile",
-        "edit_coming_soon": "Editing is coming later. You can restart onboarding with /start.",
+        "profile_buttons_like": "❤️ Like",
+        "profile_stats": "👁 {views} views ({unique} unique) · ❤️ {likes}",
+        "profile_liked": "Liked!",
+        "profile_like_repeat": "You have already liked this profile.",
+        "edit_choose": "What would you like to change?",
+        "edit_field_nick": "Nickname",
+        "edit_field_age": "Age",
+        "edit_field_language": "Language",
+        "edit_field_games": "Games",
+        "edit_field_bio": "Bio",
+        "edit_field_photo": "Photo",
+        "edit_ask_bio": "Send a new bio (up to 300 characters) or tap “Remove”.",
+        "edit_ask_photo": "Send a new photo or tap “Remove”.",
+        "edit_remove": "Remove",
+        "edit_saved": "Changes saved.",
+        "edit_busy": "Finish what you are doing first: /stop for a chat, /cancel for anything else.",
         "profile_deleted": "Profile deleted. You can onboard again via /start.",
         "already_registered": "Looks like you already have a profile. You can refresh it with /start or view it via /profile.",
         "main_menu_hint": "What next? /browse — player feed, /search — filtered match, /chat — quick chat.",
@@ -103,5 +158,30 @@ MESSAGES: dict[str, dict[str, str]] = {
         "games_empty": "The game list is empty. Add entries to data/games.json.",
         "help": "Commands: /start — onboarding, /profile — profile, /browse — feed, /search — search, /chat — quick chat, /cancel — cancel current step.",
         "nick_taken": "This nickname is already taken. Try another one.",
+        "degraded_profile": "⚠️ The database is temporarily unavailable — this is a saved copy of your profile.",
+        "degraded_unavailable": "The service is temporarily unavailable. Please try again a bit later.",
+        "degraded_saved": "The database is temporarily unavailable: your changes are saved and will be applied automatically.",
+        "inline_share_profile": "Share my profile",
+        "inline_profile_title": "Player profile",
+        "inline_player_description": "{age} y.o. · {games}",
+        "inline_game_description": "Invite teammates to this mode",
+        "inline_game_message": "🎮 <b>{name}</b> — looking for teammates! Message me.",
+        "inline_register": "Create a profile",
+        "chat_searching": "Looking for a partner… /stop to cancel.",
+        "chat_search_cancelled": "Partner search cancelled.",
+        "chat_matched": "Partner found! Messages are relayed anonymously. /stop to end the chat.",
+        "chat_already_active": "You are already in a chat. /stop to end it.",
+        "chat_ended": "Chat ended.",
+        "chat_partner_left": "Your partner left the chat. /chat to find a new one.",
+        "chat_idle_ended": "Chat closed due to inactivity. /chat to find a new partner.",
+        "chat_not_active": "You have no active chat. /chat to find a partner.",
+        "chat_search_timeout": "Nobody found yet. Try /chat again a bit later.",
+        "admin_slow_disabled": "Profiling is disabled (PROFILING_ENABLED=false).",
+        "admin_slow_empty": "No profiled updates yet.",
+        "admin_slow_missing": "No record with that number.",
+        "admin_fsm_empty": "No FSM keys in Redis.",
+        "admin_queues_empty": "Match queues are empty.",
+        "admin_funnel_empty": "No onboarding events yet.",
+        "admin_avatars_disabled": "Avatar processing is off (AVATAR_WORKERS=0 or Pillow is not installed).",
     },
 }
@@ -0,0 +1,42 @@
+"""CPU-bound avatar work, run in worker processes by `bot.services.avatars`.
+
+Kept free of bot imports so a spawned worker only loads Pillow.
+"""
+
+from __future__ import annotations
+
+from io import BytesIO
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+    ImageOps = None
+
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+
+
+def imaging_available() -> bool:
+    return Image is not None
+
+
+def process_avatar(data: bytes, thumbnail_size: int) -> tuple[int, bytes]:
+    """64-bit difference hash (unsigned) and a JPEG thumbnail no larger than `thumbnail_size` square."""
+    with Image.open(BytesIO(data)) as source:
+        # Lets the JPEG decoder downscale by DCT scaling instead of decoding the full photo.
+        source.draft("RGB", (thumbnail_size, thumbnail_size))
+        image = ImageOps.exif_transpose(source).convert("RGB")
+
+    gray = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+    pixels = gray.tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for column in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+
+    image.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=80, optimize=True)
+    return value, buffer.getvalue()
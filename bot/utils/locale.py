@@ -1,12 +1,12 @@
 from __future__ import annotations
 
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, InlineQuery, Message
 
 from bot.utils.i18n import AVAILABLE_LOCALES
 
 
 def resolve_locale(
-    event: Message | CallbackQuery,
+    event: Message | CallbackQuery | InlineQuery,
     default: str = "ru",
     user_locale: str | None = None,
 ) -> str:
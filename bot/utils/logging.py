@@ -1,8 +1,132 @@
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Optional
 
+update_id_var: ContextVar[Optional[int]] = ContextVar("log_update_id", default=None)
+user_id_var: ContextVar[Optional[int]] = ContextVar("log_user_id", default=None)
+handler_var: ContextVar[Optional[str]] = ContextVar("log_handler", default=None)
 
-def setup_logging(level: int = logging.INFO) -> None:
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
-    )
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+_CONTEXT_ATTRS = ("update_id", "user_id", "handler", "suppressed")
+
+
+class ContextFilter(logging.Filter):
+    """Copies update context from contextvars onto the record before it leaves the event loop."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.update_id = update_id_var.get()
+        record.user_id = user_id_var.get()
+        record.handler = handler_var.get()
+        return True
+
+
+class ExceptionSampler(logging.Filter):
+    """Lets through `burst` records with the same exception signature per `window` seconds.
+
+    Suppressed records are counted and reported on the next record that passes.
+    """
+
+    def __init__(self, burst: int = 5, window: float = 60.0) -> None:
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._seen: dict[tuple[Any, ...], list[float]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not record.exc_info or self.burst <= 0:
+            return True
+        exc_type = record.exc_info[0]
+        key = (record.name, record.msg, exc_type.__name__ if exc_type else None)
+        now = time.monotonic()
+        window_start, count, suppressed = self._seen.get(key, (now, 0, 0))
+        if now - window_start >= self.window:
+            window_start, count = now, 0
+        if count >= self.burst:
+            self._seen[key] = [window_start, count, suppressed + 1]
+            return False
+        self._seen[key] = [window_start, count + 1, 0]
+        record.suppressed = suppressed
+        if len(self._seen) > 1000:
+            self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.window}
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: records are dropped when the queue is full."""
+
+    def __init__(self, log_queue: "queue.Queue[Any]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge args here; traceback and JSON formatting happen on the listener thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for attr in _CONTEXT_ATTRS:
+            value = getattr(record, attr, None)
+            if value:
+                payload[attr] = value
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in _CONTEXT_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    json_format: bool = True,
+    queue_size: int = 10_000,
+    exc_burst: int = 5,
+    exc_window: float = 60.0,
+) -> logging.handlers.QueueListener:
+    """Route all logging through a bounded queue drained by a listener thread.
+
+    Call `.stop()` on the returned listener at shutdown to flush pending records.
+    """
+    stream = logging.StreamHandler()
+    if json_format:
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s - %(message)s"))
+
+    log_queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(ExceptionSampler(exc_burst, exc_window))
+
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,201 @@
+"""Sampling profiler and SQL recorder for per-update diagnostics."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from types import FrameType
+from typing import Any, AsyncIterator, Callable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+_PARAM_RE = re.compile(r"\$\d+(?:::\w+)?|%\(\w+\)s|%s")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WS_RE = re.compile(r"\s+")
+
+_current_record: ContextVar["ProfileRecord | None"] = ContextVar("profile_record", default=None)
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize SQL so that queries differing only by parameters compare equal."""
+    shape = _PARAM_RE.sub("?", statement)
+    shape = _IN_LIST_RE.sub("(?)", shape)
+    return _WS_RE.sub(" ", shape).strip()
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{os.path.basename(code.co_filename)}:{name}"
+
+
+@dataclass
+class ProfileRecord:
+    name: str
+    update_id: int | None = None
+    duration: float = 0.0
+    queries: list[str] = field(default_factory=list)
+    repeats: dict[str, int] = field(default_factory=dict)
+    stacks: Counter[str] = field(default_factory=Counter)
+    anchor: FrameType | None = field(default=None, repr=False)
+
+    def collapsed_stacks(self) -> str:
+        """Stacks in the collapsed `frame;frame;frame count` format used by flamegraph tools."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def report(self) -> str:
+        lines = [
+            f"handler: {self.name}",
+            f"update_id: {self.update_id}",
+            f"duration_ms: {self.duration * 1000:.1f}",
+            f"queries: {len(self.queries)}",
+        ]
+        for shape, count in self.repeats.items():
+            lines.append(f"repeated x{count}: {shape}")
+        lines.append("")
+        lines.extend(self.queries)
+        lines.append("")
+        lines.append(self.collapsed_stacks())
+        return "\n".join(lines)
+
+
+class UpdateProfiler:
+    """Samples a fraction of updates, recording SQL and stack samples for each."""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        sample_rate: float = 0.05,
+        keep_slowest: int = 20,
+        repeat_threshold: int = 3,
+        interval: float = 0.005,
+        sample_stacks: bool = True,
+    ) -> None:
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.keep_slowest = keep_slowest
+        self.repeat_threshold = repeat_threshold
+        self.interval = interval
+        self.sample_stacks = sample_stacks
+        self.listeners: list[Callable[[ProfileRecord], None]] = []
+        self.sampled = 0
+        self.flagged = 0
+        self._slowest: list[tuple[float, int, ProfileRecord]] = []
+        self._seq = itertools.count()
+        self._active: dict[int, ProfileRecord] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._loop_thread_id: int | None = None
+
+    def attach(self, engine: AsyncEngine) -> None:
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def should_sample(self) -> bool:
+        return self.enabled and random.random() < self.sample_rate
+
+    def slowest(self) -> list[ProfileRecord]:
+        return [record for _, _, record in sorted(self._slowest, key=lambda item: item[0], reverse=True)]
+
+    @asynccontextmanager
+    async def track(self, name: str, update_id: int | None = None) -> AsyncIterator[ProfileRecord]:
+        record = ProfileRecord(name=name, update_id=update_id)
+        if not self.enabled:
+            yield record
+            return
+        if self.sample_stacks:
+            task = asyncio.current_task()
+            coro = task.get_coro() if task else None
+            record.anchor = getattr(coro, "cr_frame", None)
+            self._ensure_sampler()
+            with self._lock:
+                self._active[id(record)] = record
+            self._wakeup.set()
+        token = _current_record.set(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.duration = time.perf_counter() - started
+            with self._lock:
+                self._active.pop(id(record), None)
+            _current_record.reset(token)
+            record.anchor = None
+            self._finish(record)
+
+    def _finish(self, record: ProfileRecord) -> None:
+        self.sampled += 1
+        shapes = Counter(statement_shape(query) for query in record.queries)
+        record.repeats = {shape: count for shape, count in shapes.items() if count >= self.repeat_threshold}
+        if record.repeats:
+            self.flagged += 1
+            logger.warning(
+                "Repeated statements in %s (update %s): %s",
+                record.name,
+                record.update_id,
+                "; ".join(f"x{count} {shape[:120]}" for shape, count in record.repeats.items()),
+            )
+        entry = (record.duration, next(self._seq), record)
+        if len(self._slowest) < self.keep_slowest:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and entry[0] > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+        for listener in self.listeners:
+            listener(record)
+
+    def _on_execute(self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        record = _current_record.get()
+        if record is not None:
+            record.queries.append(statement)
+
+    def _ensure_sampler(self) -> None:
+        if self._thread is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample_loop, name="update-profiler", daemon=True)
+        self._thread.start()
+
+    def _sample_loop(self) -> None:
+        while True:
+            with self._lock:
+                active = list(self._active.values())
+                if not active:
+                    self._wakeup.clear()
+            if not active:
+                self._wakeup.wait()
+                continue
+            time.sleep(self.interval)
+            frame = sys._current_frames().get(self._loop_thread_id)  # type: ignore[arg-type]
+            stack: list[FrameType] = []
+            while frame is not None:
+                stack.append(frame)
+                frame = frame.f_back
+            positions = {id(item): index for index, item in enumerate(stack)}
+            samples = []
+            for record in active:
+                anchor = record.anchor
+                index = positions.get(id(anchor)) if anchor is not None else None
+                if index is None:
+                    continue
+                samples.append((record, ";".join(_frame_label(item) for item in reversed(stack[: index + 1]))))
+            # The loop thread reads `stacks` once a record is finished (removed from `_active`
+            # under the same lock), so only records still active are updated.
+            with self._lock:
+                for record, collapsed in samples:
+                    if self._active.get(id(record)) is record:
+                        record.stacks[collapsed] += 1
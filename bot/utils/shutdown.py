@@ -0,0 +1,64 @@
+"""Ordered, timed shutdown: drain in-flight handlers, flush buffers, dispose pools."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+ShutdownStep = Callable[[], Awaitable[object]]
+
+
+class ShutdownCoordinator:
+    def __init__(self, drain_timeout: float = 20.0) -> None:
+        self.drain_timeout = drain_timeout
+        self.in_flight = 0
+        self.durations: dict[str, float] = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._steps: list[tuple[str, ShutdownStep]] = []
+
+    @asynccontextmanager
+    async def track(self) -> AsyncIterator[None]:
+        self.in_flight += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if self.in_flight == 0:
+                self._idle.set()
+
+    def add_step(self, name: str, step: ShutdownStep) -> None:
+        """Steps run in registration order after the drain; register flushes before disposals."""
+        self._steps.append((name, step))
+
+    async def run(self) -> None:
+        started = time.perf_counter()
+        await self._measure("drain", self._drain())
+        for name, step in self._steps:
+            await self._measure(name, step())
+        total = time.perf_counter() - started
+        phases = ", ".join(f"{name}={elapsed * 1000:.0f}ms" for name, elapsed in self.durations.items())
+        logger.info("Shutdown finished in %.0f ms (%s)", total * 1000, phases)
+
+    async def _drain(self) -> None:
+        if self.in_flight:
+            logger.info("Waiting for %d in-flight handlers", self.in_flight)
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Drain deadline reached with %d handlers still running", self.in_flight)
+
+    async def _measure(self, name: str, awaitable: Awaitable[object]) -> None:
+        started = time.perf_counter()
+        try:
+            await awaitable
+        except Exception:
+            logger.exception("Shutdown step %s failed", name)
+        finally:
+            self.durations[name] = time.perf_counter() - started
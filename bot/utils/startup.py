@@ -0,0 +1,74 @@
+"""Startup phase timing and readiness reporting."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class StartupTimer:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    async def measure(self, name: str, awaitable: Awaitable[T]) -> T:
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases[name] = elapsed
+            logger.info("Startup phase %s took %.1f ms", name, elapsed * 1000)
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        phases = ", ".join(f"{name}={elapsed * 1000:.0f}ms" for name, elapsed in self.phases.items())
+        return f"total={self.total() * 1000:.0f}ms ({phases})"
+
+
+class ReadinessProbe:
+    """Minimal HTTP probe: `/live` is always 200, anything else is 200 only once ready."""
+
+    def __init__(self) -> None:
+        self.ready = False
+        self._server: asyncio.AbstractServer | None = None
+
+    def set_ready(self, value: bool) -> None:
+        self.ready = value
+        logger.info("Readiness changed: %s", "ready" if value else "not ready")
+
+    async def serve(self, host: str, port: int) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def close(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=2)
+            parts = request_line.decode("latin-1").split()
+            path = parts[1] if len(parts) > 1 else "/"
+            ok = path == "/live" or self.ready
+            status = "200 OK" if ok else "503 Service Unavailable"
+            body = b"ok\n" if ok else b"starting\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,163 @@
+"""Redis FSM storage with refreshed TTLs and compact value encoding."""
+
+from __future__ import annotations
+
+import logging
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Literal, Optional
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+from redis.asyncio import Redis
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+_MSGPACK = b"\x01"
+_MSGPACK_ZLIB = b"\x02"
+_JSON_ZLIB = b"\x03"
+
+
+class HostedKeyBuilder(DefaultKeyBuilder):
+    """Prefixes FSM keys of every bot but the primary one with `{bot_id}:`, keeping existing keys intact."""
+
+    def __init__(self, primary_bot_id: int, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.primary_bot_id = primary_bot_id
+
+    def build(self, key: StorageKey, part: Literal["data", "state", "lock"]) -> str:
+        built = super().build(key, part)
+        if key.bot_id == self.primary_bot_id:
+            return built
+        return f"{key.bot_id}:{built}"
+
+
+class CompactRedisStorage(RedisStorage):
+    """RedisStorage that refreshes key TTLs on reads and stores data as (compressed) msgpack.
+
+    Plain JSON values written by the stock RedisStorage are still readable.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        ttl: Optional[int] = None,
+        encoding: str = "msgpack",
+        compress_threshold: int = 0,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(redis, state_ttl=ttl, data_ttl=ttl, **kwargs)
+        self.ttl = ttl
+        self.compress_threshold = compress_threshold
+        self.use_msgpack = encoding == "msgpack" and msgpack is not None
+        if encoding == "msgpack" and msgpack is None:
+            logger.warning("msgpack is not installed, FSM data falls back to JSON")
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        if self.use_msgpack:
+            raw, marker = msgpack.packb(data, use_bin_type=True), _MSGPACK
+        else:
+            raw, marker = self.json_dumps(data).encode("utf-8"), b""
+        if self.compress_threshold and len(raw) >= self.compress_threshold:
+            return (_MSGPACK_ZLIB if self.use_msgpack else _JSON_ZLIB) + zlib.compress(raw)
+        return marker + raw
+
+    def decode(self, value: bytes | str) -> Dict[str, Any]:
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        marker, body = value[:1], value[1:]
+        if marker == _MSGPACK:
+            return msgpack.unpackb(body, raw=False)
+        if marker == _MSGPACK_ZLIB:
+            return msgpack.unpackb(zlib.decompress(body), raw=False)
+        if marker == _JSON_ZLIB:
+            return self.json_loads(zlib.decompress(body).decode("utf-8"))
+        return self.json_loads(value.decode("utf-8"))
+
+    async def close(self) -> None:
+        # The Redis client is shared with other subsystems; ShutdownCoordinator closes it
+        # after in-flight handlers have drained (aiogram calls this first on shutdown).
+        pass
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state_key = self.key_builder.build(key, "state")
+        if not self.ttl:
+            value = await self.redis.get(state_key)
+        else:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.getex(state_key, ex=self.ttl)
+                pipe.expire(self.key_builder.build(key, "data"), self.ttl)
+                value, _ = await pipe.execute()
+        if isinstance(value, bytes):
+            return value.decode("utf-8")
+        return value
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        redis_key = self.key_builder.build(key, "data")
+        if not data:
+            await self.redis.delete(redis_key)
+            return
+        await self.redis.set(redis_key, self.encode(data), ex=self.ttl)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        redis_key = self.key_builder.build(key, "data")
+        if self.ttl:
+            value = await self.redis.getex(redis_key, ex=self.ttl)
+        else:
+            value = await self.redis.get(redis_key)
+        if value is None:
+            return {}
+        return self.decode(value)
+
+
+@dataclass
+class FsmUsage:
+    keys: int = 0
+    bytes: int = 0
+
+
+async def fsm_memory_report(redis: Redis, prefix: str = "fsm", batch: int = 500) -> dict[str, FsmUsage]:
+    """Group FSM keys by their current state and sum `MEMORY USAGE` per group."""
+    sizes: dict[str, int] = {}
+    states: dict[str, str] = {}
+    pending: list[bytes | str] = []
+
+    async def flush() -> None:
+        names = [_key_name(key) for key in pending]
+        state_names = [name for name in names if name.endswith(":state")]
+        async with redis.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.memory_usage(name)
+            for name in state_names:
+                pipe.get(name)
+            results = await pipe.execute()
+        for name, size in zip(names, results[: len(names)]):
+            sizes[name] = int(size or 0)
+        for name, value in zip(state_names, results[len(names) :]):
+            if value is not None:
+                states[name.rsplit(":", 1)[0]] = _key_name(value)
+        pending.clear()
+
+    async for key in redis.scan_iter(match=f"{prefix}:*", count=batch):
+        pending.append(key)
+        if len(pending) >= batch:
+            await flush()
+    if pending:
+        await flush()
+
+    report: dict[str, FsmUsage] = {}
+    for name, size in sizes.items():
+        base = name.rsplit(":", 1)[0]
+        usage = report.setdefault(states.get(base, "<none>"), FsmUsage())
+        usage.keys += 1
+        usage.bytes += size
+    return report
+
+
+def _key_name(key: bytes | str) -> str:
+    return key.decode("utf-8") if isinstance(key, bytes) else key
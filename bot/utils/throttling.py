@@ -0,0 +1,84 @@
+"""Per-user token buckets kept in process memory or shared through Redis."""
+
+from __future__ import annotations
+
+import time
+
+from redis.asyncio import Redis
+
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+-- Server time, so replicas with skewed clocks refill shared buckets at the same rate.
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return allowed
+"""
+
+
+class TokenBucketLimiter:
+    """Buckets are `(tokens, updated_at)` tuples per bot namespace and user; full buckets are evicted periodically."""
+
+    def __init__(self, rate: float, capacity: float, sweep_interval: float = 60.0) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.sweep_interval = sweep_interval
+        self.throttled = 0
+        self._buckets: dict[tuple[str, int], tuple[float, float]] = {}
+        self._last_sweep = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def allow(self, user_id: int, namespace: str = "") -> bool:
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+        key = (namespace, user_id)
+        tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self.throttled += 1
+            return False
+        self._buckets[key] = (tokens - 1, now)
+        return True
+
+    def sweep(self, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        refill = self.capacity / self.rate
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < refill
+        }
+        self._last_sweep = now
+
+
+class RedisTokenBucketLimiter:
+    """Same bucket semantics, evaluated atomically in Redis so replicas share limits."""
+
+    def __init__(self, redis: Redis, name: str, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self.throttled = 0
+        self._script = redis.register_script(_TOKEN_BUCKET_LUA)
+
+    async def allow(self, user_id: int, namespace: str = "") -> bool:
+        allowed = await self._script(
+            keys=[f"{namespace}throttle:{self.name}:{user_id}"],
+            args=[self.rate, self.capacity],
+        )
+        if not allowed:
+            self.throttled += 1
+        return bool(allowed)
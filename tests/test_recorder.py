@@ -0,0 +1,71 @@
+import json
+
+from bot.services.recorder import Anonymizer
+
+LIKER_ID = 5123456789
+PROFILE_ID = 6234567890
+JOINED_ID = 7345678901
+
+
+def like_update() -> dict:
+    liker = {"id": LIKER_ID, "is_bot": False, "first_name": "Alice", "username": "alice"}
+    return {
+        "update_id": 1,
+        "callback_query": {
+            "id": "4382bfdwdsb323b2d9",
+            "from": liker,
+            "chat_instance": "-123",
+            "data": f"like:{PROFILE_ID}",
+            "message": {
+                "message_id": 10,
+                "date": 1700000000,
+                "chat": {"id": LIKER_ID, "type": "private", "first_name": "Alice"},
+                "text": "Bob, 17",
+                "reply_markup": {
+                    "inline_keyboard": [[{"text": "Like", "callback_data": f"like:{PROFILE_ID}"}]],
+                },
+                "new_chat_members": [{"id": JOINED_ID, "is_bot": False, "first_name": "Carol"}],
+                "left_chat_member": {"id": JOINED_ID, "is_bot": False, "first_name": "Carol"},
+            },
+        },
+    }
+
+
+def test_like_callback_keeps_no_raw_ids() -> None:
+    anonymizer = Anonymizer(b"salt")
+    result = anonymizer.update(like_update())
+
+    dumped = json.dumps(result)
+    for raw in (LIKER_ID, PROFILE_ID, JOINED_ID):
+        assert str(raw) not in dumped
+    callback = result["callback_query"]
+    assert callback["data"] == f"like:{anonymizer.pseudo_id(PROFILE_ID)}"
+    button = callback["message"]["reply_markup"]["inline_keyboard"][0][0]
+    assert button["callback_data"] == callback["data"]
+
+
+def test_chosen_inline_result_and_shared_user() -> None:
+    anonymizer = Anonymizer(b"salt")
+    result = anonymizer.update(
+        {
+            "update_id": 2,
+            "chosen_inline_result": {
+                "result_id": f"u{PROFILE_ID}",
+                "from": {"id": LIKER_ID, "is_bot": False, "first_name": "Alice"},
+                "query": "bob",
+            },
+            "message": {"users_shared": {"request_id": 1, "user_ids": [JOINED_ID]}, "user_chat_id": LIKER_ID},
+        }
+    )
+
+    dumped = json.dumps(result)
+    for raw in (LIKER_ID, PROFILE_ID, JOINED_ID):
+        assert str(raw) not in dumped
+    assert result["chosen_inline_result"]["result_id"] == f"u{anonymizer.pseudo_id(PROFILE_ID)}"
+
+
+def test_catalog_ids_are_kept() -> None:
+    anonymizer = Anonymizer(b"salt")
+    assert anonymizer.callback_data("game:12") == "game:12"
+    assert anonymizer.callback_data("games:done") == "games:done"
+    assert anonymizer.result_id("g12") == "g12"